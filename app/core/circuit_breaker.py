@@ -0,0 +1,85 @@
+import time
+from typing import Any, Dict, Optional
+
+class CircuitBreaker:
+    """Tracks backend health and short-circuits calls while it is down.
+
+    closed    - calls go through; `failure_threshold` consecutive failures open the circuit
+    open      - calls are refused until `reset_timeout` has passed
+    half_open - one probe call is let through; success closes, failure re-opens
+    
+    Observers (health checks, metrics, routing decisions) read `is_open`, which
+    never changes state; only code that actually runs the probe calls
+    try_acquire_probe(), so a scrape can't use up the probe meant for real work.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+        
+        # Counters
+        self.total_failures = 0
+        self.times_opened = 0
+        self.rejected = 0
+    
+    def try_acquire_probe(self) -> bool:
+        """Whether a call should be attempted now; while the circuit is not closed this
+        hands out the single half-open probe, so callers must then make the call"""
+        if self.state == self.CLOSED:
+            return True
+        
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.probe_started_at = None
+        
+        if self.state == self.HALF_OPEN:
+            # Let one probe through; allow another if the last one never reported back
+            if self.probe_started_at is None or now - self.probe_started_at >= self.reset_timeout:
+                self.probe_started_at = now
+                return True
+        
+        self.rejected += 1
+        return False
+    
+    def record_success(self):
+        if self.state != self.CLOSED:
+            print(f"✅ {self.name} circuit closed - backend recovered")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+    
+    def record_failure(self):
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            print(f"⚠️ {self.name} circuit opened after {self.consecutive_failures} failures")
+        elif self.state == self.OPEN:
+            self.opened_at = time.monotonic()
+    
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
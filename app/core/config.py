@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 class Settings(BaseSettings):
     # PostgreSQL
@@ -7,10 +7,18 @@ class Settings(BaseSettings):
     
     # Firebase
     FIREBASE_CREDENTIALS_PATH: str = "./firebase-credentials.json"
+    FIREBASE_DATABASE_URL: str = "https://novrintech-data-fall-back-default-rtdb.firebaseio.com"
+    FIREBASE_MAX_CONNECTIONS: int = 20  # pooled connections and max concurrent requests
+    FIREBASE_TIMEOUT: float = 10.0  # seconds per request
+    FIREBASE_EMULATOR: Optional[str] = None  # "memory" (in-process) or "http" (FIREBASE_DATABASE_URL, no auth)
+    FIREBASE_EMULATOR_LATENCY: float = 0.0  # seconds, in-process emulator only
+    FIREBASE_EMULATOR_JITTER: float = 0.0  # extra random seconds
+    FIREBASE_EMULATOR_FAILURE_RATE: float = 0.0  # fraction of requests that fail
     
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+    WEB_CONCURRENCY: int = 1  # worker processes (uvicorn --workers reads the same variable)
     DEBUG: bool = False
     
     # Company API (for frontend)
@@ -20,6 +28,67 @@ class Settings(BaseSettings):
     # Database Performance
     DB_POOL_SIZE: int = 10
     DB_MAX_OVERFLOW: int = 20
+    DB_CONNECT_TIMEOUT: float = 5.0  # seconds, so outages fail fast instead of hanging
+    
+    # PostgreSQL Circuit Breaker (reads fail over to Firebase, writes are queued)
+    DB_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    DB_CIRCUIT_RESET_TIMEOUT: float = 10.0  # seconds before a half-open probe
+    DB_WRITE_QUEUE_MAX: int = 10000
+    
+    # API Key Auth (disabled for testing: requests then use the default app)
+    API_KEY_AUTH_ENABLED: bool = False
+    
+    # API Key Auth Cache (in-process, per worker)
+    API_KEY_CACHE_ENABLED: bool = True
+    API_KEY_CACHE_MAX_ENTRIES: int = 10000
+    API_KEY_CACHE_TTL: int = 60  # seconds; bounds how long other workers honour a revoked key
+    API_KEY_CACHE_NEGATIVE_TTL: int = 10  # seconds to remember unknown keys
+    
+    # Rate Limiting (GCRA; apps.rate_limit_* override the default per app)
+    RATE_LIMIT_REQUESTS: int = 100
+    RATE_LIMIT_WINDOW: float = 60  # seconds
+    RATE_LIMIT_ROUTES: Dict[str, Tuple[int, float]] = {}  # path prefix -> (requests, seconds), JSON in env
+    RATE_LIMIT_SWEEP_INTERVAL: float = 60  # seconds between idle-key evictions
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per worker), "shared_memory" (per host) or "postgres"
+    RATE_LIMIT_SHM_NAME: str = "novrintech_rate_limit"
+    RATE_LIMIT_SHM_SLOTS: int = 65536  # 16 bytes each
+    RATE_LIMIT_SYNC_INTERVAL: float = 0.25  # seconds between postgres backend flushes
+    
+    # Request Logging (buffered, written in bulk)
+    REQUEST_LOG_SAMPLE_RATE: float = 1.0  # fraction of requests logged
+    REQUEST_LOG_BUFFER_SIZE: int = 10000  # rows held in memory; more are dropped
+    REQUEST_LOG_BATCH_SIZE: int = 500  # rows per INSERT; a full batch triggers a flush
+    REQUEST_LOG_FLUSH_INTERVAL: float = 1.0  # seconds
+    REQUEST_LOG_RETENTION_DAYS: int = 30  # daily partitions older than this are dropped
+    REQUEST_LOG_PARTITIONS_AHEAD: int = 3  # days of partitions created in advance
+    REQUEST_LOG_ROLLUP_RETENTION_DAYS: int = 365  # hourly rollups are kept longer
+    REQUEST_LOG_MAINTENANCE_INTERVAL: float = 300.0  # seconds between partition/rollup runs
+    
+    # Prometheus metrics at /metrics (per worker process)
+    METRICS_ENABLED: bool = True
+    
+    # Data Read Cache (in-process; only used with a single worker, see data_cache)
+    DATA_CACHE_ENABLED: bool = True
+    DATA_CACHE_MAX_ENTRIES: int = 10000
+    DATA_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 64MB
+    DATA_CACHE_TTL: int = 60  # seconds
+    
+    # Hedged Reads (race Firebase against slow PostgreSQL reads, opt-in)
+    READ_HEDGING_ENABLED: bool = False
+    READ_HEDGE_PERCENTILE: float = 95.0  # hedge once PostgreSQL is slower than this percentile
+    READ_HEDGE_DEFAULT_DELAY: float = 0.1  # seconds, until enough latency samples exist
+    READ_HEDGE_MIN_DELAY: float = 0.01  # seconds
+    READ_HEDGE_WINDOW: int = 1000  # recent PostgreSQL read latencies kept
+    
+    # Firebase Replication (outbox drained by a background worker)
+    REPLICATION_ENABLED: bool = True
+    REPLICATION_BATCH_SIZE: int = 100
+    REPLICATION_POLL_INTERVAL: float = 1.0  # seconds
+    REPLICATION_BATCH_WINDOW: float = 0.05  # seconds to let a write burst accumulate before flushing
+    REPLICATION_RETRY_DELAY: float = 5.0  # seconds; first backoff for a failing key, doubled per attempt
+    REPLICATION_MAX_RETRY_DELAY: float = 300.0  # backoff cap, seconds
+    REPLICATION_MAX_ATTEMPTS: int = 10  # failed pushes before a key moves to replication_dead_letters
+    REPLICATION_CLAIM_TIMEOUT: float = 300.0  # seconds a drain holds claimed keys before others may retry them
     
     # Keep-Alive
     KEEP_ALIVE_ENABLED: bool = True
@@ -1,6 +1,12 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.config import settings
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.metrics import db_pool_wait
 from urllib.parse import urlparse, urlunparse
 
 # Async engine only (asyncpg) - works perfectly with Python 3.13 and Neon
@@ -31,6 +37,15 @@ def convert_to_asyncpg_url(database_url: str) -> str:
     
     return urlunparse(new_parsed)
 
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each checkout takes (db_pool_wait_seconds)"""
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.observe(time.perf_counter() - start)
+
 async_database_url = convert_to_asyncpg_url(settings.DATABASE_URL)
 print(f"🔗 Neon Database URL: {async_database_url}")
 
@@ -38,16 +53,48 @@ print(f"🔗 Neon Database URL: {async_database_url}")
 async_engine = create_async_engine(
     async_database_url, 
     echo=False,  # Set to True for debugging SQL queries
+    poolclass=TimedQueuePool,
     pool_size=5,  # Smaller pool for Neon
     max_overflow=10,  # Smaller overflow for Neon
     pool_pre_ping=True,  # Important for Neon - checks connections
     pool_recycle=3600,  # Recycle connections every hour
+    connect_args={"timeout": settings.DB_CONNECT_TIMEOUT},
     # SSL is handled automatically by asyncpg for Neon
 )
 AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
 
+# Health tracking for the Postgres engine; routes check it before touching the database
+postgres_circuit = CircuitBreaker(
+    "PostgreSQL",
+    failure_threshold=settings.DB_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.DB_CIRCUIT_RESET_TIMEOUT
+)
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _record_db_success(conn, cursor, statement, parameters, context, executemany):
+    if postgres_circuit.is_open or postgres_circuit.consecutive_failures:
+        postgres_circuit.record_success()
+
+@event.listens_for(async_engine.sync_engine, "do_connect")
+def _connect_with_circuit(dialect, conn_rec, cargs, cparams):
+    # Connect errors (refused, timeout) are raised outside handle_error, so count them here
+    try:
+        return dialect.connect(*cargs, **cparams)
+    except Exception:
+        postgres_circuit.record_failure()
+        raise
+
+@event.listens_for(async_engine.sync_engine, "handle_error")
+def _record_db_failure(context):
+    # Only connectivity problems count; constraint or syntax errors mean the database is up
+    original = context.original_exception
+    if (context.is_disconnect
+            or isinstance(context.sqlalchemy_exception, OperationalError)
+            or isinstance(original, (OSError, TimeoutError))):
+        postgres_circuit.record_failure()
+
 async def get_async_db():
     """Dependency for async database sessions"""
     async with AsyncSessionLocal() as session:
@@ -60,9 +107,13 @@ async def init_db():
     """Initialize database tables (async)"""
     try:
         print("🗄️ Initializing database tables...")
-        from app.models import app_model, data_model, file_model
+        from app.models import app_model, data_model, file_model, replication_model, rate_limit_model, stats_model
+        from app.core.migrations import lock_migrations, run_migrations
         async with async_engine.begin() as conn:
+            # Serialise workers booting together, from create_all through the migrations
+            await lock_migrations(conn)
             await conn.run_sync(Base.metadata.create_all)
+            await run_migrations(conn)
         print("✅ Database tables initialized successfully")
     except Exception as e:
         print(f"❌ Database initialization error: {e}")
@@ -0,0 +1,19 @@
+import hashlib
+from typing import Any
+from fastapi import Request
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag from the parts identifying a resource version"""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag (weak comparison, RFC 7232 section 3.2)"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
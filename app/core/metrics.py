@@ -0,0 +1,196 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format (0.0.4).
+
+A small registry of counters, gauges and histograms with labels, served at
+/metrics. Values live in the worker process that records them, so with several
+workers each one reports its own series (scrape them individually or run one).
+Gauges that mirror service state are refreshed by collectors when scraped.
+"""
+import math
+from typing import Awaitable, Callable, Dict, Iterator, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """(sample name, formatted labels, value) for every series"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    """Monotonic count; names should end in _total"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: str):
+        """Mirror a total a service already keeps"""
+        self._values[self._key(labels)] = value
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, _format_labels(self.labelnames, key), value
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count per label set"""
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> ([count per bucket], sum, count)
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        bucket_labels = self.labelnames + ("le",)
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", _format_labels(bucket_labels, key + (_format_value(bound),)), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Awaitable[None]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Awaitable[None]]):
+        """Run `collector` before each render, e.g. to refresh gauges from service state"""
+        self._collectors.append(collector)
+
+    async def collect(self):
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception as e:
+                # A failing source leaves its last values in place
+                print(f"⚠️ Metrics collector error: {e}")
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Global registry
+registry = MetricsRegistry()
+
+# HTTP
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template, method and status",
+    ("route", "method", "status")
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "Requests currently being handled")
+
+# PostgreSQL connection pool
+db_pool_size = registry.gauge("db_pool_size", "Connections the pool keeps open")
+db_pool_checked_out = registry.gauge("db_pool_checked_out", "Connections currently checked out")
+db_pool_overflow = registry.gauge("db_pool_overflow", "Connections open beyond pool_size")
+db_pool_wait = registry.histogram(
+    "db_pool_wait_seconds", "Time to get a connection from the pool (waiting for one or opening one)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# Firebase
+firebase_requests = registry.counter(
+    "firebase_requests_total", "Firebase REST requests by method and result", ("method", "result")
+)
+replication_queue_depth = registry.gauge("replication_queue_depth", "Keys waiting in replication_outbox")
+replication_changes = registry.counter(
+    "replication_changes_total", "Keys replicated to Firebase by outcome", ("outcome",)
+)
+write_queue_depth = registry.gauge("write_queue_depth", "Writes queued while PostgreSQL is unavailable")
+write_queue_rejected = registry.counter("write_queue_rejected_total", "Writes refused because the queue was full")
+
+# Rate limiting
+rate_limit_rejections = registry.counter("rate_limit_rejections_total", "Requests rejected with 429")
+
+# Request logs
+request_log_rows = registry.counter(
+    "request_log_rows_total", "Request log rows by outcome", ("outcome",)
+)
+
+# Keep-alive
+keep_alive_pings = registry.counter("keep_alive_pings_total", "Keep-alive pings by result", ("result",))
+keep_alive_ping_duration = registry.histogram(
+    "keep_alive_ping_duration_seconds", "Keep-alive ping round trip",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0)
+)
@@ -0,0 +1,294 @@
+"""
+Idempotent schema migrations for tables that already exist.
+
+Base.metadata.create_all only creates missing tables, so indexes and
+constraints added to existing models are applied here on startup.
+Every migration must be safe to run on every boot.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import settings
+
+# pg_advisory_xact_lock key, so worker processes starting together migrate one at a time
+MIGRATIONS_LOCK_ID = 724011
+
+async def lock_migrations(conn: AsyncConnection):
+    """Wait for any other process migrating the schema; released when the transaction ends"""
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
+
+async def _relation_exists(conn: AsyncConnection, name: str) -> bool:
+    """Check whether a table or index exists"""
+    result = await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})
+    return result.scalar() is not None
+
+async def _trigger_exists(conn: AsyncConnection, table: str, name: str) -> bool:
+    """Check whether a table has a trigger"""
+    result = await conn.execute(
+        text("SELECT 1 FROM pg_trigger WHERE tgrelid = to_regclass(:table) AND tgname = :name"),
+        {"table": table, "name": name}
+    )
+    return result.scalar() is not None
+
+async def add_data_store_unique_key(conn: AsyncConnection):
+    """Compact duplicate (app_id, data_key) rows and add the unique index"""
+    if await _relation_exists(conn, "uq_data_store_app_key"):
+        return
+    
+    print("🗄️ Compacting duplicate data_store keys...")
+    # Keep the most recently updated row per key
+    result = await conn.execute(text("""
+        DELETE FROM data_store d
+        USING (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY app_id, data_key
+                ORDER BY updated_at DESC, created_at DESC, id DESC
+            ) AS rn
+            FROM data_store
+        ) ranked
+        WHERE d.id = ranked.id AND ranked.rn > 1
+    """))
+    print(f"✅ Removed {result.rowcount} duplicate data_store rows")
+    
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_data_store_app_key "
+        "ON data_store (app_id, data_key)"
+    ))
+    print("✅ Created unique index uq_data_store_app_key")
+
+async def add_data_store_key_prefix_index(conn: AsyncConnection):
+    """Add the byte-ordered (app_id, data_key COLLATE "C") index for key listing"""
+    await conn.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_data_store_app_key_c '
+        'ON data_store (app_id, data_key COLLATE "C")'
+    ))
+
+async def convert_data_value_to_jsonb(conn: AsyncConnection):
+    """Convert data_store.data_value from JSON to JSONB and add its GIN index"""
+    result = await conn.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'data_store' AND column_name = 'data_value'
+    """))
+    if result.scalar() == "json":
+        print("🗄️ Converting data_store.data_value to JSONB...")
+        await conn.execute(text(
+            "ALTER TABLE data_store ALTER COLUMN data_value TYPE JSONB USING data_value::jsonb"
+        ))
+        print("✅ data_store.data_value is now JSONB")
+    
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_data_store_value_gin "
+        "ON data_store USING GIN (data_value jsonb_path_ops)"
+    ))
+
+async def add_replication_outbox_retry_columns(conn: AsyncConnection):
+    """Add the retry/backoff and claim columns to replication_outbox"""
+    await conn.execute(text(
+        "ALTER TABLE replication_outbox ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0"
+    ))
+    await conn.execute(text(
+        "ALTER TABLE replication_outbox ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP NOT NULL "
+        "DEFAULT (now() AT TIME ZONE 'UTC')"
+    ))
+    await conn.execute(text("ALTER TABLE replication_outbox ADD COLUMN IF NOT EXISTS claim_id UUID"))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_replication_outbox_next_attempt_at "
+        "ON replication_outbox (next_attempt_at)"
+    ))
+
+async def add_replication_outbox_trigger(conn: AsyncConnection):
+    """Queue every data_store change in replication_outbox, atomically with the write"""
+    await conn.execute(text("""
+        CREATE OR REPLACE FUNCTION replication_outbox_enqueue() RETURNS trigger AS $$
+        DECLARE
+            target RECORD;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                target := OLD;
+            ELSE
+                target := NEW;
+            END IF;
+            -- A new write resets the backoff; a claimed key stays claimed until its drain
+            -- releases it, so two drains never push the same key concurrently
+            INSERT INTO replication_outbox (app_id, data_key, enqueued_at, attempts, next_attempt_at)
+            VALUES (
+                target.app_id, target.data_key,
+                clock_timestamp() AT TIME ZONE 'UTC', 0, clock_timestamp() AT TIME ZONE 'UTC'
+            )
+            ON CONFLICT (app_id, data_key) DO UPDATE SET
+                enqueued_at = EXCLUDED.enqueued_at,
+                attempts = 0,
+                next_attempt_at = CASE
+                    WHEN replication_outbox.claim_id IS NULL THEN EXCLUDED.next_attempt_at
+                    ELSE replication_outbox.next_attempt_at
+                END;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    if await _trigger_exists(conn, "data_store", "data_store_replication"):
+        return
+    await conn.execute(text("""
+        CREATE TRIGGER data_store_replication
+        AFTER INSERT OR UPDATE OR DELETE ON data_store
+        FOR EACH ROW EXECUTE FUNCTION replication_outbox_enqueue()
+    """))
+
+async def add_app_rate_limit_columns(conn: AsyncConnection):
+    """Add the per-app rate limit columns to apps"""
+    await conn.execute(text("ALTER TABLE apps ADD COLUMN IF NOT EXISTS rate_limit_requests INTEGER"))
+    await conn.execute(text("ALTER TABLE apps ADD COLUMN IF NOT EXISTS rate_limit_window INTEGER"))
+
+async def add_request_log_duration(conn: AsyncConnection):
+    """Add request_logs.duration_ms"""
+    await conn.execute(text("ALTER TABLE request_logs ADD COLUMN IF NOT EXISTS duration_ms DOUBLE PRECISION"))
+
+async def add_request_log_sample_rate(conn: AsyncConnection):
+    """Add request_logs.sample_rate, so rollups can scale sampled rows back to request counts"""
+    await conn.execute(text("ALTER TABLE request_logs ADD COLUMN IF NOT EXISTS sample_rate DOUBLE PRECISION"))
+
+async def partition_request_logs(conn: AsyncConnection):
+    """Convert request_logs to a table partitioned by day and create the upcoming partitions
+    and the DEFAULT partition"""
+    from app.models.file_model import RequestLog
+    from app.services.request_log_maintenance import create_default_partition, create_partitions
+    
+    today = datetime.utcnow().date()
+    last_day = today + timedelta(days=settings.REQUEST_LOG_PARTITIONS_AHEAD)
+    result = await conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('request_logs')"))
+    if result.scalar() == "r":
+        print("🗄️ Partitioning request_logs by day...")
+        await conn.execute(text("ALTER TABLE request_logs RENAME TO request_logs_unpartitioned"))
+        await conn.execute(text("ALTER INDEX IF EXISTS request_logs_pkey RENAME TO request_logs_unpartitioned_pkey"))
+        await conn.execute(text(
+            "ALTER INDEX IF EXISTS ix_request_logs_app_id RENAME TO ix_request_logs_unpartitioned_app_id"
+        ))
+        await conn.run_sync(RequestLog.__table__.create)
+        
+        # Only rows inside the retention window are kept
+        cutoff = today - timedelta(days=settings.REQUEST_LOG_RETENTION_DAYS)
+        result = await conn.execute(text("SELECT min(timestamp) FROM request_logs_unpartitioned"))
+        oldest = result.scalar()
+        if oldest is not None:
+            await create_partitions(conn, max(oldest.date(), cutoff), last_day)
+        result = await conn.execute(text("""
+            INSERT INTO request_logs (id, app_id, endpoint, method, status_code, duration_ms, sample_rate, timestamp)
+            SELECT id, app_id, endpoint, method, status_code, duration_ms, sample_rate, timestamp
+            FROM request_logs_unpartitioned
+            WHERE timestamp >= :start AND timestamp < :end
+        """), {"start": cutoff, "end": last_day + timedelta(days=1)})
+        await conn.execute(text("DROP TABLE request_logs_unpartitioned"))
+        print(f"✅ request_logs is now partitioned by day ({result.rowcount} rows kept)")
+    
+    await create_partitions(conn, today, last_day)
+    await create_default_partition(conn)
+
+async def add_table_counters(conn: AsyncConnection):
+    """Keep table_counters current with statement-level triggers and seed missing counters"""
+    from app.models.stats_model import TABLE_COUNTER_SHARDS
+    
+    await conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION table_counters_add(counter TEXT, delta BIGINT) RETURNS void AS $$
+        BEGIN
+            IF delta <> 0 THEN
+                INSERT INTO table_counters (table_name, shard, row_count)
+                VALUES (counter, pg_backend_pid() % {TABLE_COUNTER_SHARDS}, delta)
+                ON CONFLICT (table_name, shard) DO UPDATE
+                SET row_count = table_counters.row_count + EXCLUDED.row_count;
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    # One counter update per statement, so batch inserts and deletes cost one row write
+    await conn.execute(text("""
+        CREATE OR REPLACE FUNCTION table_counters_rows() RETURNS trigger AS $$
+        DECLARE
+            delta BIGINT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT count(*) INTO delta FROM new_rows;
+            ELSE
+                SELECT -count(*) INTO delta FROM old_rows;
+            END IF;
+            PERFORM table_counters_add(TG_TABLE_NAME, delta);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    await conn.execute(text("""
+        CREATE OR REPLACE FUNCTION table_counters_apps() RETURNS trigger AS $$
+        DECLARE
+            total_delta BIGINT := 0;
+            active_delta BIGINT := 0;
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                SELECT count(*), count(*) FILTER (WHERE status = 'active')
+                INTO total_delta, active_delta FROM new_rows;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                SELECT total_delta - count(*), active_delta - count(*) FILTER (WHERE status = 'active')
+                INTO total_delta, active_delta FROM old_rows;
+            END IF;
+            PERFORM table_counters_add('apps', total_delta);
+            PERFORM table_counters_add('apps_active', active_delta);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    
+    triggers = [
+        ("apps", "INSERT", "NEW TABLE AS new_rows", "table_counters_apps"),
+        ("apps", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows", "table_counters_apps"),
+        ("apps", "DELETE", "OLD TABLE AS old_rows", "table_counters_apps"),
+        ("data_store", "INSERT", "NEW TABLE AS new_rows", "table_counters_rows"),
+        ("data_store", "DELETE", "OLD TABLE AS old_rows", "table_counters_rows"),
+        ("file_store", "INSERT", "NEW TABLE AS new_rows", "table_counters_rows"),
+        ("file_store", "DELETE", "OLD TABLE AS old_rows", "table_counters_rows"),
+    ]
+    for table, event, referencing, function in triggers:
+        trigger = f"{table}_count_{event.lower()}"
+        if await _trigger_exists(conn, table, trigger):
+            continue
+        await conn.execute(text(
+            f"CREATE TRIGGER {trigger} AFTER {event} ON {table} REFERENCING {referencing} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        ))
+    
+    # The lock holds off concurrent writes until commit, so the seed counts are exact
+    # (request_logs is counted by the request log services, not a trigger)
+    seeds = {
+        "apps": ("apps", "SELECT count(*) FROM apps"),
+        "apps_active": ("apps", "SELECT count(*) FROM apps WHERE status = 'active'"),
+        "data_store": ("data_store", "SELECT count(*) FROM data_store"),
+        "file_store": ("file_store", "SELECT count(*) FROM file_store"),
+        "request_logs": ("request_logs", "SELECT count(*) FROM request_logs"),
+    }
+    for counter, (table, count_sql) in seeds.items():
+        result = await conn.execute(
+            text("SELECT 1 FROM table_counters WHERE table_name = :counter LIMIT 1"), {"counter": counter}
+        )
+        if result.scalar() is None:
+            print(f"🗄️ Seeding {counter} row counter...")
+            await conn.execute(text(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE"))
+            await conn.execute(text(
+                f"INSERT INTO table_counters (table_name, shard, row_count) SELECT :counter, 0, ({count_sql})"
+            ), {"counter": counter})
+
+# Applied in order inside the init_db transaction
+MIGRATIONS = [
+    add_data_store_unique_key,
+    add_data_store_key_prefix_index,
+    convert_data_value_to_jsonb,
+    add_replication_outbox_retry_columns,
+    add_replication_outbox_trigger,
+    add_app_rate_limit_columns,
+    add_request_log_duration,
+    add_request_log_sample_rate,
+    partition_request_logs,
+    add_table_counters,
+]
+
+async def run_migrations(conn: AsyncConnection):
+    """Apply all migrations (async); the caller holds the lock_migrations lock"""
+    for migration in MIGRATIONS:
+        await migration(conn)
@@ -2,9 +2,18 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.database import init_db
-from app.routes import data_routes, file_routes, health, admin_routes
+from app.routes import data_routes, file_routes, health, admin_routes, metrics
 from app.middleware.api_key_auth import APIKeyMiddleware
+from app.middleware.rate_limiter import RateLimitMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.request_logger import RequestLoggerMiddleware
+from app.middleware.error_handler import ErrorHandlerMiddleware
 from app.services.keep_alive import keep_alive_service
+from app.services.replication_service import replication_worker
+from app.services.write_queue import write_queue
+from app.services.request_log_writer import request_log_writer
+from app.services.request_log_maintenance import request_log_maintenance
+from app.services.firebase_service import firebase_service
 
 app = FastAPI(
     title="Novrintech Data Fall Back API",
@@ -12,7 +21,18 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# CORS Configuration
+# Middleware added later wraps middleware added earlier, so requests pass through
+# ErrorHandler -> Metrics -> RequestLogger -> CORS -> APIKey -> RateLimit -> routes
+
+# Rate limiting, inside authentication so apps.rate_limit_* limits apply per app
+app.add_middleware(RateLimitMiddleware)
+
+# API Key Authentication Middleware (sets request.state.app_id); off by default while
+# testing, when routes act as the default app
+if settings.API_KEY_AUTH_ENABLED:
+    app.add_middleware(APIKeyMiddleware)
+
+# CORS Configuration (outside authentication so preflights and 401/429 responses get CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -21,8 +41,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# API Key Authentication Middleware (temporarily disabled for testing)
-# app.add_middleware(APIKeyMiddleware)
+# Request logging (outside auth and rate limiting so 401 and 429 responses are logged too)
+app.add_middleware(RequestLoggerMiddleware)
+
+# Request latency and in-flight metrics for /metrics (wraps the middleware added above)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Error handling, outermost so unhandled errors anywhere below become a JSON 500
+app.add_middleware(ErrorHandlerMiddleware)
 
 # Initialize database on startup
 @app.on_event("startup")
@@ -43,6 +70,18 @@ async def startup_event():
         # Create default app for testing if it doesn't exist
         await create_default_app_if_missing()
         
+        # Start Firebase replication worker
+        replication_worker.start()
+        
+        # Start replay of writes queued while PostgreSQL is unavailable
+        write_queue.start()
+        
+        # Start bulk writer for request logs
+        request_log_writer.start()
+        
+        # Start request log partition maintenance and hourly rollups
+        request_log_maintenance.start()
+        
         # Start keep-alive service
         keep_alive_service.start()
         print(f"🔄 Keep-alive service started (pings every 4 seconds)")
@@ -97,12 +136,19 @@ async def create_default_app_if_missing():
 async def shutdown_event():
     try:
         keep_alive_service.stop()
+        replication_worker.stop()
+        write_queue.stop()
+        await request_log_writer.stop()
+        request_log_maintenance.stop()
+        await firebase_service.close()
         print("🔄 Novrintech Data Fall Back API shutting down...")
     except Exception as e:
         print(f"❌ Shutdown error: {e}")
 
 # Include routers
 app.include_router(health.router, tags=["Health"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router, tags=["Metrics"])
 app.include_router(data_routes.router, prefix="/data", tags=["Data"])
 app.include_router(file_routes.router, prefix="/file", tags=["Files"])
 app.include_router(admin_routes.router, prefix="/admin", tags=["Admin"])
@@ -1,51 +1,74 @@
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Optional
 from app.core.database import AsyncSessionLocal
 from app.models.app_model import App, AppStatus
+from app.services.api_key_cache import api_key_cache, CachedApp
 
 # Public endpoints that don't require API key
-PUBLIC_ENDPOINTS = ["/", "/docs", "/redoc", "/openapi.json", "/health"]
+PUBLIC_ENDPOINTS = ["/", "/docs", "/redoc", "/openapi.json", "/health", "/metrics"]
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+# Admin routes check their own admin_key instead
+PUBLIC_PREFIXES = ("/admin/",)
+
+class APIKeyMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         # Skip auth for public endpoints
-        if request.url.path in PUBLIC_ENDPOINTS:
-            return await call_next(request)
+        if scope["type"] != "http" or scope["path"] in PUBLIC_ENDPOINTS or scope["path"].startswith(PUBLIC_PREFIXES):
+            await self.app(scope, receive, send)
+            return
         
         # Get API key from header
-        api_key = request.headers.get("X-API-KEY")
+        api_key = Headers(scope=scope).get("X-API-KEY")
         
         if not api_key:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="API key missing. Include X-API-KEY header."
-            )
+            await self._unauthorized(scope, receive, send, "API key missing. Include X-API-KEY header.")
+            return
+        
+        # Validate API key (cached, including unknown keys)
+        found, app = api_key_cache.get(api_key)
+        if not found:
+            app = await self._lookup(api_key)
+        
+        if not app or app.status != AppStatus.active.value:
+            await self._unauthorized(scope, receive, send, "Invalid or revoked API key")
+            return
+        
+        # Attach app_id to request state
+        state = scope.setdefault("state", {})
+        state["app_id"] = app.app_id
+        state["app_name"] = app.app_name
+        if app.rate_limit_requests and app.rate_limit_window:
+            state["rate_limit"] = (app.rate_limit_requests, app.rate_limit_window)
         
-        # Validate API key (async)
+        await self.app(scope, receive, send)
+    
+    async def _unauthorized(self, scope: Scope, receive: Receive, send: Send, detail: str):
+        response = JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": detail})
+        await response(scope, receive, send)
+    
+    async def _lookup(self, api_key: str) -> Optional[CachedApp]:
+        """Load an API key's app from the database and cache the result (async)"""
+        cache_epoch = api_key_cache.epoch
         async with AsyncSessionLocal() as db:
             try:
                 from sqlalchemy import select
                 result = await db.execute(
-                    select(App).where(
-                        App.api_key == api_key,
-                        App.status == AppStatus.active
-                    )
+                    select(
+                        App.id, App.app_name, App.status, App.rate_limit_requests, App.rate_limit_window
+                    ).where(App.api_key == api_key)
                 )
-                app = result.scalar_one_or_none()
-                
-                if not app:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid or revoked API key"
-                    )
-                
-                # Attach app_id to request state
-                request.state.app_id = str(app.id)
-                request.state.app_name = app.app_name
-                
+                row = result.one_or_none()
             finally:
                 await db.close()
         
-        response = await call_next(request)
-        return response
+        app = CachedApp(
+            str(row.id), row.app_name, AppStatus(row.status).value, row.rate_limit_requests, row.rate_limit_window
+        ) if row else None
+        api_key_cache.put(api_key, app, epoch=cache_epoch)
+        return app
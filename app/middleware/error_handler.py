@@ -1,16 +1,30 @@
-from fastapi import Request, HTTPException
+from fastapi import HTTPException
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 import traceback
 
 logger = logging.getLogger(__name__)
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class ErrorHandlerMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response_started = False
+        
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_wrapper)
         except HTTPException as e:
             # Let FastAPI handle HTTP exceptions normally
             raise e
@@ -19,12 +33,17 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
             logger.error(f"Unhandled error: {str(e)}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             
+            # Too late to replace a response that is already streaming
+            if response_started:
+                raise
+            
             # Return generic error response
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=500,
                 content={
                     "success": False,
                     "error": "Internal server error",
                     "message": "An unexpected error occurred. Please try again later."
                 }
-            )
\ No newline at end of file
+            )
+            await response(scope, receive, send)
@@ -0,0 +1,33 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import http_request_duration, http_requests_in_flight
+import time
+
+class MetricsMiddleware:
+    """Records in-flight requests and latency per route template, method and status"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter()
+        status_code = 500
+        
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # Unmatched paths share one label so scans can't create unbounded series
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - start_time, route=route, method=scope["method"], status=str(status_code)
+            )
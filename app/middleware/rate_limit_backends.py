@@ -0,0 +1,275 @@
+"""
+Storage backends for the GCRA rate limiter.
+
+Every backend stores one theoretical arrival time (TAT, unix seconds) per key
+and implements acquire(limits, now) -> retry_after:
+
+  memory        - per process (N workers allow N times the limit)
+  shared_memory - one table in a shared memory segment for all workers on a host
+  postgres      - per-process decisions reconciled through an UNLOGGED table
+                  with batched increments, for workers across hosts
+"""
+import asyncio
+import hashlib
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+Limit = Tuple[str, int, float]  # (key, max_requests, window_seconds)
+
+def gcra(tat: Optional[float], now: float, max_requests: int, window_seconds: float) -> Tuple[float, float]:
+    """Return (new_tat, retry_after) for one request; retry_after 0.0 means allowed"""
+    new_tat = max(tat or now, now) + window_seconds / max_requests
+    # Up to max_requests may arrive ahead of schedule (the burst)
+    allow_at = new_tat - window_seconds
+    return new_tat, max(allow_at - now, 0.0)
+
+class MemoryBackend:
+    """TATs in a dict; keys whose bucket has refilled are swept every `sweep_interval`"""
+    def __init__(self, sweep_interval: float = 60.0):
+        self.sweep_interval = sweep_interval
+        self.tats: Dict[str, float] = {}
+        self._next_sweep = time.time() + sweep_interval
+        self.evicted = 0
+    
+    def acquire(self, limits: List[Limit], now: float) -> float:
+        if now >= self._next_sweep:
+            self.sweep(now)
+        
+        updates = []
+        retry_after = 0.0
+        for key, max_requests, window_seconds in limits:
+            new_tat, retry = gcra(self.tats.get(key), now, max_requests, window_seconds)
+            retry_after = max(retry_after, retry)
+            updates.append((key, new_tat))
+        
+        if not retry_after:
+            for key, new_tat in updates:
+                self.tats[key] = new_tat
+        return retry_after
+    
+    def sweep(self, now: float):
+        """Drop keys whose bucket has refilled"""
+        idle = [key for key, tat in self.tats.items() if tat <= now]
+        for key in idle:
+            del self.tats[key]
+        self.evicted += len(idle)
+        self._next_sweep = now + self.sweep_interval
+
+class SharedMemoryBackend:
+    """Open-addressed hash table of (fingerprint, TAT) slots in a named shared memory
+    segment, shared by every worker process on the host.
+    
+    The table is split into SHARDS contiguous shards, each guarded by its own byte
+    of a lock file (fcntl record lock). Locks are taken non-blocking so the event
+    loop never waits on another worker; the critical section is a few probes, so
+    after LOCK_ATTEMPTS tries the request is not limited (fail open, counted in
+    `contended`).
+    
+    A slot whose TAT has passed is free, so idle keys are evicted implicitly while
+    probing. If no slot is free within PROBE_LIMIT probes the key is not limited
+    (fail open, counted in `overflows`).
+    """
+    SLOT = struct.Struct("<Qd")
+    PROBE_LIMIT = 16
+    SHARDS = 64
+    LOCK_ATTEMPTS = 100
+    ATTACH_TIMEOUT = 5.0
+    
+    def __init__(self, name: str, slots: int):
+        import fcntl
+        from multiprocessing import resource_tracker, shared_memory
+        self._fcntl = fcntl
+        self.shards = min(self.SHARDS, max(slots // self.PROBE_LIMIT, 1))
+        self.shard_slots = max(slots // self.shards, 1)
+        size = self.shards * self.shard_slots * self.SLOT.size
+        try:
+            self.segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self.segment = self._attach(shared_memory, name, size)
+        # The segment outlives any single worker; don't let the resource tracker unlink it
+        resource_tracker.unregister(self.segment._name, "shared_memory")
+        self.buffer = self.segment.buf
+        self._lock_fd = os.open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), os.O_CREAT | os.O_RDWR)
+        self.overflows = 0
+        self.contended = 0
+    
+    def _attach(self, shared_memory, name: str, size: int):
+        """Attach to a segment another worker created; it is empty (and can't be
+        mapped) until the creator has sized it, so retry until the size matches"""
+        deadline = time.monotonic() + self.ATTACH_TIMEOUT
+        while True:
+            try:
+                segment = shared_memory.SharedMemory(name=name)
+                if segment.size == size:
+                    return segment
+                segment.close()
+                error = ValueError(f"shared memory segment {name!r} is {segment.size} bytes, expected {size}")
+            except (FileNotFoundError, ValueError) as e:
+                error = e
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Could not attach rate limit segment {name!r}: {error}")
+            time.sleep(0.01)
+    
+    @staticmethod
+    def _fingerprint(key: str) -> int:
+        # 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+    
+    def _find_slot(self, fingerprint: int, now: float, taken: set) -> Tuple[Optional[int], Optional[float]]:
+        """(slot, tat) for the key within its shard, or a free slot with tat None"""
+        free = None
+        base = (fingerprint % self.shards) * self.shard_slots
+        start = (fingerprint // self.shards) % self.shard_slots
+        for probe in range(min(self.PROBE_LIMIT, self.shard_slots)):
+            slot = base + (start + probe) % self.shard_slots
+            slot_fingerprint, tat = self.SLOT.unpack_from(self.buffer, slot * self.SLOT.size)
+            if slot_fingerprint == fingerprint:
+                return slot, tat
+            if free is None and slot not in taken and (slot_fingerprint == 0 or tat <= now):
+                free = slot
+        return free, None
+    
+    def _lock(self, shards: List[int]) -> bool:
+        """Take every shard lock without blocking; all or none"""
+        for attempt in range(self.LOCK_ATTEMPTS):
+            held = []
+            try:
+                for shard in shards:
+                    self._fcntl.lockf(self._lock_fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB, 1, shard)
+                    held.append(shard)
+                return True
+            except OSError:
+                self._unlock(held)
+                os.sched_yield()
+        return False
+    
+    def _unlock(self, shards: List[int]):
+        for shard in shards:
+            self._fcntl.lockf(self._lock_fd, self._fcntl.LOCK_UN, 1, shard)
+    
+    def acquire(self, limits: List[Limit], now: float) -> float:
+        fingerprints = [self._fingerprint(key) for key, _, _ in limits]
+        # Sorted so that workers locking several shards don't keep colliding
+        shards = sorted({fingerprint % self.shards for fingerprint in fingerprints})
+        if not self._lock(shards):
+            self.contended += 1
+            return 0.0
+        try:
+            updates = []
+            taken = set()
+            retry_after = 0.0
+            for fingerprint, (key, max_requests, window_seconds) in zip(fingerprints, limits):
+                slot, tat = self._find_slot(fingerprint, now, taken)
+                if slot is None:
+                    self.overflows += 1
+                    continue
+                taken.add(slot)
+                new_tat, retry = gcra(tat, now, max_requests, window_seconds)
+                retry_after = max(retry_after, retry)
+                updates.append((slot, fingerprint, new_tat))
+            
+            if not retry_after:
+                for slot, fingerprint, new_tat in updates:
+                    self.SLOT.pack_into(self.buffer, slot * self.SLOT.size, fingerprint, new_tat)
+            return retry_after
+        finally:
+            self._unlock(shards)
+
+# Adds a batch of per-key increments (seconds of TAT) and returns the shared TATs
+FLUSH_SQL = text("""
+    INSERT INTO rate_limit_counters AS c (key, tat)
+    SELECT u.key, :now + u.delta
+    FROM unnest(CAST(:keys AS text[]), CAST(:deltas AS double precision[])) AS u(key, delta)
+    ON CONFLICT (key) DO UPDATE SET tat = GREATEST(c.tat, :now) + (EXCLUDED.tat - :now)
+    RETURNING key, tat
+""")
+
+class PostgresBackend(MemoryBackend):
+    """Decides locally like MemoryBackend, then every `sync_interval` flushes the
+    increments it admitted to rate_limit_counters in one statement and adopts the
+    shared TATs it gets back. Across workers a limit can overshoot by what they
+    admit within one sync interval.
+    
+    A key's pending increment is capped at its window (a fully drained bucket), so
+    increments kept through failed flushes during a database outage can't push the
+    shared TAT further ahead and lock clients out after it recovers.
+    """
+    def __init__(self, sweep_interval: float = 60.0, sync_interval: float = 0.25):
+        super().__init__(sweep_interval)
+        self.sync_interval = sync_interval
+        self.pending: Dict[str, float] = {}
+        # Window of each pending key, the cap for its increment
+        self.windows: Dict[str, float] = {}
+        self._next_table_sweep = time.time() + sweep_interval
+        self.task = None
+        
+        # Counters
+        self.flushes = 0
+        self.flush_errors = 0
+    
+    def acquire(self, limits: List[Limit], now: float) -> float:
+        retry_after = super().acquire(limits, now)
+        if not retry_after:
+            for key, max_requests, window_seconds in limits:
+                self.windows[key] = window_seconds
+                self._add_pending(key, window_seconds / max_requests)
+            if not self.task or self.task.done():
+                self.task = asyncio.get_running_loop().create_task(self.run())
+        return retry_after
+    
+    def _add_pending(self, key: str, delta: float):
+        self.pending[key] = min(self.pending.get(key, 0.0) + delta, self.windows[key])
+    
+    async def flush(self):
+        """Push pending increments and pull back the shared TATs (async)"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        windows, self.windows = self.windows, {}
+        now = time.time()
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    FLUSH_SQL, {"keys": list(pending), "deltas": list(pending.values()), "now": now}
+                )
+                rows = result.all()
+                if now >= self._next_table_sweep:
+                    await db.execute(text("DELETE FROM rate_limit_counters WHERE tat < :now"), {"now": now})
+                    self._next_table_sweep = now + self.sweep_interval
+                await db.commit()
+        except Exception as e:
+            # Keep the increments for the next flush
+            for key, delta in pending.items():
+                self.windows.setdefault(key, windows[key])
+                self._add_pending(key, delta)
+            self.flush_errors += 1
+            print(f"⚠️ Rate limit sync error: {e}")
+            return
+        
+        self.flushes += 1
+        for key, tat in rows:
+            # Shared TAT plus whatever this worker admitted since the flush started
+            self.tats[key] = max(self.tats.get(key, 0.0), tat + self.pending.get(key, 0.0))
+    
+    async def run(self):
+        """Flush until there is nothing left to sync"""
+        while self.pending:
+            await asyncio.sleep(self.sync_interval)
+            await self.flush()
+
+def create_backend(name: Optional[str] = None):
+    """Backend selected by RATE_LIMIT_BACKEND"""
+    name = name or settings.RATE_LIMIT_BACKEND
+    if name == "memory":
+        return MemoryBackend(settings.RATE_LIMIT_SWEEP_INTERVAL)
+    if name == "shared_memory":
+        return SharedMemoryBackend(settings.RATE_LIMIT_SHM_NAME, settings.RATE_LIMIT_SHM_SLOTS)
+    if name == "postgres":
+        return PostgresBackend(settings.RATE_LIMIT_SWEEP_INTERVAL, settings.RATE_LIMIT_SYNC_INTERVAL)
+    raise ValueError(f"Unknown rate limit backend: {name!r}")
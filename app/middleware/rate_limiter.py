@@ -1,47 +1,85 @@
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import rate_limit_rejections
+from app.middleware.rate_limit_backends import Limit, MemoryBackend, create_backend
+import math
 import time
-from collections import defaultdict, deque
-from typing import Dict, Deque
+from typing import Dict, List, Optional, Tuple
 
 class RateLimiter:
-    def __init__(self, max_requests: int = 100, window_seconds: int = 60):
+    """GCRA (generic cell rate algorithm), equivalent to a token bucket of
+    `max_requests` tokens refilled over `window_seconds`.
+    
+    Each key stores one float, its theoretical arrival time (TAT), in a pluggable
+    backend (see rate_limit_backends); keys whose bucket has refilled carry no
+    information and are evicted.
+    """
+    def __init__(self, max_requests: int = 100, window_seconds: float = 60, backend=None):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, Deque[float]] = defaultdict(deque)
-    
-    def is_allowed(self, key: str) -> bool:
-        now = time.time()
-        window_start = now - self.window_seconds
-        
-        # Clean old requests
-        while self.requests[key] and self.requests[key][0] < window_start:
-            self.requests[key].popleft()
+        self.backend = backend or MemoryBackend()
         
-        # Check if under limit
-        if len(self.requests[key]) < self.max_requests:
-            self.requests[key].append(now)
-            return True
+        # Counters
+        self.rejected = 0
+    
+    def acquire(self, limits: List[Limit]) -> float:
+        """Take one request from every (key, max_requests, window_seconds) limit
         
-        return False
+        All-or-nothing: returns 0.0 when allowed, otherwise the seconds until every
+        limit would allow it (nothing is consumed).
+        """
+        retry_after = self.backend.acquire(limits, time.time())
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+    
+    def is_allowed(self, key: str) -> bool:
+        return self.acquire([(key, self.max_requests, self.window_seconds)]) == 0.0
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, max_requests: int = 100, window_seconds: int = 60):
-        super().__init__(app)
-        self.rate_limiter = RateLimiter(max_requests, window_seconds)
+class RateLimitMiddleware:
+    """Per-client limit (per app when APIKeyMiddleware has identified it) plus optional
+    per-route limits, e.g. route_limits={"/file/upload": (10, 60)} (path prefix)"""
+    def __init__(self, app: ASGIApp, max_requests: Optional[int] = None, window_seconds: Optional[float] = None,
+                 route_limits: Optional[Dict[str, Tuple[int, float]]] = None):
+        self.app = app
+        self.rate_limiter = RateLimiter(
+            max_requests or settings.RATE_LIMIT_REQUESTS,
+            window_seconds or settings.RATE_LIMIT_WINDOW,
+            create_backend()
+        )
+        self.route_limits = route_limits if route_limits is not None else settings.RATE_LIMIT_ROUTES
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         # Skip rate limiting for health checks
-        if request.url.path in ["/health", "/", "/docs", "/redoc", "/openapi.json"]:
-            return await call_next(request)
+        if scope["type"] != "http" or scope["path"] in ["/health", "/metrics", "/", "/docs", "/redoc", "/openapi.json"]:
+            await self.app(scope, receive, send)
+            return
+        
+        # Use the app, API key or IP as identifier
+        state = scope.get("state", {})
+        client = scope.get("client")
+        client_id = state.get("app_id") or Headers(scope=scope).get("X-API-KEY", client[0] if client else "")
         
-        # Use API key or IP as identifier
-        client_id = request.headers.get("X-API-KEY", request.client.host)
+        # App-specific limit (apps.rate_limit_*) or the default
+        app_limit = state.get("rate_limit")
+        max_requests, window_seconds = app_limit or (self.rate_limiter.max_requests, self.rate_limiter.window_seconds)
+        limits = [(client_id, max_requests, window_seconds)]
+        for prefix, (route_requests, route_window) in self.route_limits.items():
+            if scope["path"].startswith(prefix):
+                limits.append((f"{client_id} {prefix}", route_requests, route_window))
         
-        if not self.rate_limiter.is_allowed(client_id):
-            raise HTTPException(
+        retry_after = self.rate_limiter.acquire(limits)
+        if retry_after:
+            rate_limit_rejections.inc()
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Try again later."
+                content={"detail": "Rate limit exceeded. Try again later."},
+                headers={"Retry-After": str(math.ceil(retry_after))}
             )
+            await response(scope, receive, send)
+            return
         
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send)
@@ -1,38 +1,37 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
-from app.models.file_model import RequestLog
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.request_log_writer import request_log_writer
 import time
-import uuid
 
-class RequestLoggerMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+class RequestLoggerMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Get app_id if available
-        app_id = getattr(request.state, 'app_id', None)
+        start_time = time.time()
+        status_code = 500
         
-        response = await call_next(request)
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Add response time header
+                process_time = time.time() - start_time
+                MutableHeaders(scope=message)["X-Process-Time"] = str(process_time)
+            await send(message)
         
-        # Log the request
         try:
-            db: Session = SessionLocal()
-            log_entry = RequestLog(
-                app_id=uuid.UUID(app_id) if app_id else None,
-                endpoint=str(request.url.path),
-                method=request.method,
-                status_code=str(response.status_code)
-            )
-            db.add(log_entry)
-            db.commit()
-            db.close()
-        except Exception as e:
-            # Don't fail the request if logging fails
-            print(f"Logging error: {e}")
-        
-        # Add response time header
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
\ No newline at end of file
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Buffered and written in bulk by the request log writer
+            duration_ms = (time.time() - start_time) * 1000
+            # Get app_id if the auth middleware set one
+            app_id = scope.get("state", {}).get("app_id")
+            # Log the route template (/data/read/{data_key}) so rollups group by endpoint, not key
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or scope["path"]
+            request_log_writer.log(app_id, endpoint, scope["method"], status_code, duration_ms)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum
+from sqlalchemy import Column, String, DateTime, Enum, Integer
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -17,3 +17,6 @@ class App(Base):
     api_key = Column(String, unique=True, nullable=False, index=True)
     status = Column(Enum(AppStatus), default=AppStatus.active, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Per-app rate limit; NULL uses RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW
+    rate_limit_requests = Column(Integer, nullable=True)
+    rate_limit_window = Column(Integer, nullable=True)  # seconds
@@ -1,15 +1,28 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 from datetime import datetime
 from app.core.database import Base
 
 class DataStore(Base):
     __tablename__ = "data_store"
+    __table_args__ = (
+        # One row per key per app - save_data upserts against this index
+        Index("uq_data_store_app_key", "app_id", "data_key", unique=True),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     app_id = Column(UUID(as_uuid=True), ForeignKey("apps.id"), nullable=False, index=True)
     data_key = Column(String, nullable=False, index=True)
-    data_value = Column(JSON, nullable=False)
+    data_value = Column(JSONB, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+# Byte-ordered key index for prefix scans and keyset pagination (see list_data_keys)
+Index("ix_data_store_app_key_c", DataStore.app_id, DataStore.data_key.collate("C"))
+
+# GIN index for containment (@>) and JSONPath (@?, @@) queries (see query_data)
+Index(
+    "ix_data_store_value_gin", DataStore.data_value,
+    postgresql_using="gin", postgresql_ops={"data_value": "jsonb_path_ops"}
+)
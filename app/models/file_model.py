@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Integer, BigInteger, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -15,11 +15,46 @@ class FileStore(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 class RequestLog(Base):
+    """One row per (sampled) request, range partitioned by day on timestamp.
+    
+    Daily partitions are created ahead and dropped after REQUEST_LOG_RETENTION_DAYS
+    by the request log maintenance service; rows without a daily partition land in
+    request_logs_default. The primary key has to include the partition key.
+    """
     __tablename__ = "request_logs"
+    __table_args__ = (
+        # Logs arrive in time order, so a BRIN index keeps hourly range scans cheap
+        Index("ix_request_logs_timestamp_brin", "timestamp", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     app_id = Column(UUID(as_uuid=True), ForeignKey("apps.id"), nullable=True, index=True)
     endpoint = Column(String, nullable=False)
     method = Column(String, nullable=False)
     status_code = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    duration_ms = Column(Float, nullable=True)
+    # Fraction of requests that were logged when this row was written (NULL: all of them)
+    sample_rate = Column(Float, nullable=True)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
+
+class RequestLogRollup(Base):
+    """Request counts and latency percentiles per hour, app, endpoint, method and status.
+    
+    Rebuilt from request_logs by the maintenance service, so admin analytics never
+    scan raw logs. Kept for REQUEST_LOG_ROLLUP_RETENTION_DAYS.
+    """
+    __tablename__ = "request_log_rollups"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    hour = Column(DateTime, nullable=False, index=True)
+    app_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    endpoint = Column(String, nullable=False)
+    method = Column(String, nullable=False)
+    status_code = Column(String, nullable=False)
+    request_count = Column(Integer, nullable=False)
+    duration_avg_ms = Column(Float, nullable=True)
+    duration_p50_ms = Column(Float, nullable=True)
+    duration_p95_ms = Column(Float, nullable=True)
+    duration_p99_ms = Column(Float, nullable=True)
+    duration_max_ms = Column(Float, nullable=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Float
+from app.core.database import Base
+
+class RateLimitCounter(Base):
+    """Rate limiter state shared by workers across hosts (RATE_LIMIT_BACKEND=postgres).
+
+    One GCRA theoretical arrival time per key. UNLOGGED: it is cheap to write and
+    losing it in a crash only resets the limits.
+    """
+    __tablename__ = "rate_limit_counters"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+    
+    key = Column(String, primary_key=True)
+    tat = Column(Float, nullable=False)  # unix seconds
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, DateTime, Integer, Text
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from app.core.database import Base
+
+class ReplicationOutbox(Base):
+    """Keys changed in PostgreSQL that still have to be replicated to Firebase.
+
+    Rows are written by the data_store_replication trigger in the same transaction
+    as the data write, one row per key, so the queue is bounded by the number of keys.
+    A key is due at next_attempt_at: failed pushes back off exponentially, and a
+    drain that has claimed a key (claim_id) holds it until then.
+    """
+    __tablename__ = "replication_outbox"
+    
+    app_id = Column(UUID(as_uuid=True), primary_key=True)
+    data_key = Column(String, primary_key=True)
+    enqueued_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    claim_id = Column(UUID(as_uuid=True), nullable=True)
+
+class ReplicationDeadLetter(Base):
+    """Keys that failed to replicate REPLICATION_MAX_ATTEMPTS times in a row.
+
+    They are no longer retried; the next write to the key queues it again, and a
+    successful push (or reconciliation) clears the entry.
+    """
+    __tablename__ = "replication_dead_letters"
+    
+    app_id = Column(UUID(as_uuid=True), primary_key=True)
+    data_key = Column(String, primary_key=True)
+    enqueued_at = Column(DateTime, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
+    failed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
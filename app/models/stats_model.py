@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Integer, BigInteger
+from app.core.database import Base
+
+# Counter rows per table are spread over this many shards (by backend pid) so
+# concurrent writers don't all update the same row
+TABLE_COUNTER_SHARDS = 16
+
+class TableCounter(Base):
+    """Row counts for admin /stats, kept current instead of running COUNT(*).
+
+    apps, data_store and file_store are counted by statement-level triggers (see
+    migrations.add_table_counters); request_logs by the request log writer and
+    maintenance service. A table's count is the sum of its shards.
+    """
+    __tablename__ = "table_counters"
+    
+    table_name = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    row_count = Column(BigInteger, nullable=False, default=0)
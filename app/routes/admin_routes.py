@@ -1,17 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select
-from app.core.database import get_async_db
+from sqlalchemy import func, select, text
+from app.core.database import get_async_db, postgres_circuit
 from app.models.app_model import App
-from app.models.data_model import DataStore
-from app.models.file_model import FileStore, RequestLog
-from typing import Dict, Any
+from app.models.file_model import RequestLogRollup
+from app.services.data_cache import data_cache
+from app.services.api_key_cache import api_key_cache
+from app.services.replication_service import replication_worker
+from app.services.write_queue import write_queue
+from app.services.read_hedging import read_hedger
+from app.services.reconciliation_service import reconciliation_service
+from app.services.request_log_writer import request_log_writer
+from app.services.request_log_maintenance import request_log_maintenance
+from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
+import uuid
 
 router = APIRouter()
 
 # Simple admin authentication (replace with proper auth in production)
 ADMIN_API_KEY = "admin_super_secret_key_change_this"
 
+class AppRateLimitRequest(BaseModel):
+    # Both null restores the default limit
+    rate_limit_requests: Optional[int] = Field(None, ge=1)
+    rate_limit_window: Optional[int] = Field(None, ge=1)  # seconds
+
 def verify_admin_key(admin_key: str = None):
     if admin_key != ADMIN_API_KEY:
         raise HTTPException(
@@ -19,43 +34,191 @@ def verify_admin_key(admin_key: str = None):
             detail="Invalid admin key"
         )
 
+# Every count from table_counters in one query (see TableCounter)
+COUNTER_STATS_SQL = text("""
+    SELECT
+        COALESCE(sum(row_count) FILTER (WHERE table_name = 'apps'), 0) AS total_apps,
+        COALESCE(sum(row_count) FILTER (WHERE table_name = 'apps_active'), 0) AS active_apps,
+        COALESCE(sum(row_count) FILTER (WHERE table_name = 'data_store'), 0) AS total_data_records,
+        COALESCE(sum(row_count) FILTER (WHERE table_name = 'file_store'), 0) AS total_files,
+        COALESCE(sum(row_count) FILTER (WHERE table_name = 'request_logs'), 0) AS total_requests
+    FROM table_counters
+""")
+
+# Planner estimates (as of the last ANALYZE/VACUUM) in one query; request_logs sums its partitions.
+# apps is tiny, so active apps still comes from its counter.
+APPROXIMATE_STATS_SQL = text("""
+    SELECT
+        (SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'apps'::regclass) AS total_apps,
+        (SELECT COALESCE(sum(row_count), 0) FROM table_counters WHERE table_name = 'apps_active') AS active_apps,
+        (SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'data_store'::regclass) AS total_data_records,
+        (SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'file_store'::regclass) AS total_files,
+        (
+            SELECT COALESCE(sum(GREATEST(c.reltuples, 0)), 0)::bigint
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'request_logs'::regclass
+        ) AS total_requests
+""")
+
 @router.get("/stats")
 async def get_system_stats(
     admin_key: str,
+    approximate: bool = False,
     db: AsyncSession = Depends(get_async_db)
 ):
-    """Get system statistics (admin only)"""
+    """Get system statistics (admin only)
+    
+    Counts come from trigger-maintained counters, or from the planner's row
+    estimates with approximate=true; neither scans the tables.
+    """
     verify_admin_key(admin_key)
     
-    # Count statistics
-    total_apps_result = await db.execute(select(func.count(App.id)))
-    total_apps = total_apps_result.scalar()
+    result = await db.execute(APPROXIMATE_STATS_SQL if approximate else COUNTER_STATS_SQL)
+    stats = result.mappings().one()
     
-    total_data_result = await db.execute(select(func.count(DataStore.id)))
-    total_data_records = total_data_result.scalar()
+    return {
+        "system_stats": {
+            "total_apps": int(stats["total_apps"]),
+            "active_apps": int(stats["active_apps"]),
+            "total_data_records": int(stats["total_data_records"]),
+            "total_files": int(stats["total_files"]),
+            "total_requests": int(stats["total_requests"])
+        },
+        "mode": "approximate" if approximate else "exact"
+    }
+
+@router.get("/cache/stats")
+async def get_cache_stats(admin_key: str):
+    """Get data read and API key cache counters (admin only)"""
+    verify_admin_key(admin_key)
     
-    total_files_result = await db.execute(select(func.count(FileStore.id)))
-    total_files = total_files_result.scalar()
+    return {
+        "data_cache": data_cache.get_stats(),
+        "api_key_cache": api_key_cache.get_stats()
+    }
+
+@router.get("/replication/stats")
+async def get_replication_stats(admin_key: str):
+    """Get Firebase replication queue depth, lag, retries and dead letters (admin only)"""
+    verify_admin_key(admin_key)
     
-    total_requests_result = await db.execute(select(func.count(RequestLog.id)))
-    total_requests = total_requests_result.scalar()
+    return {
+        "replication": await replication_worker.get_stats()
+    }
+
+@router.get("/circuit/stats")
+async def get_circuit_stats(admin_key: str):
+    """Get PostgreSQL circuit breaker state and queued writes (admin only)"""
+    verify_admin_key(admin_key)
     
-    # Active apps
-    active_apps_result = await db.execute(
-        select(func.count(App.id)).where(App.status == "active")
-    )
-    active_apps = active_apps_result.scalar()
+    return {
+        "postgresql_circuit": postgres_circuit.get_stats(),
+        "write_queue": write_queue.get_stats()
+    }
+
+@router.get("/hedging/stats")
+async def get_hedging_stats(admin_key: str):
+    """Get hedged read delay and win counts (admin only)"""
+    verify_admin_key(admin_key)
     
     return {
-        "system_stats": {
-            "total_apps": total_apps,
-            "active_apps": active_apps,
-            "total_data_records": total_data_records,
-            "total_files": total_files,
-            "total_requests": total_requests
+        "read_hedging": read_hedger.get_stats()
+    }
+
+@router.get("/request-logs/stats")
+async def get_request_log_stats(admin_key: str):
+    """Get request log buffer, sampling and drop counters (admin only)"""
+    verify_admin_key(admin_key)
+    
+    return {
+        "request_logs": request_log_writer.get_stats(),
+        "maintenance": request_log_maintenance.get_stats()
+    }
+
+@router.get("/analytics/requests")
+async def get_request_analytics(
+    admin_key: str,
+    hours: int = 24,
+    app_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Request counts and latency per endpoint over the last `hours`, from the hourly rollups (admin only)
+    
+    Latency percentiles are per hour, so p95/p99 here are the worst hourly values in the window.
+    """
+    verify_admin_key(admin_key)
+    
+    if hours < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="hours must be at least 1")
+    
+    since = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    total = func.sum(RequestLogRollup.request_count)
+    # Average of the hourly averages weighted by their request counts
+    weighted_avg = (
+        func.sum(RequestLogRollup.duration_avg_ms * RequestLogRollup.request_count)
+        / func.nullif(func.sum(RequestLogRollup.request_count).filter(RequestLogRollup.duration_avg_ms.isnot(None)), 0)
+    )
+    stmt = select(
+        RequestLogRollup.endpoint,
+        RequestLogRollup.method,
+        RequestLogRollup.status_code,
+        total,
+        weighted_avg,
+        func.max(RequestLogRollup.duration_p95_ms),
+        func.max(RequestLogRollup.duration_p99_ms),
+        func.max(RequestLogRollup.duration_max_ms)
+    ).where(RequestLogRollup.hour >= since).group_by(
+        RequestLogRollup.endpoint, RequestLogRollup.method, RequestLogRollup.status_code
+    ).order_by(total.desc())
+    if app_id:
+        try:
+            stmt = stmt.where(RequestLogRollup.app_id == uuid.UUID(app_id))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid app_id")
+    
+    result = await db.execute(stmt)
+    endpoints = [
+        {
+            "endpoint": endpoint,
+            "method": method,
+            "status_code": status_code,
+            "requests": requests,
+            "avg_ms": round(float(avg_ms), 3) if avg_ms is not None else None,
+            "p95_ms": round(p95_ms, 3) if p95_ms is not None else None,
+            "p99_ms": round(p99_ms, 3) if p99_ms is not None else None,
+            "max_ms": round(max_ms, 3) if max_ms is not None else None
         }
+        for endpoint, method, status_code, requests, avg_ms, p95_ms, p99_ms, max_ms in result.all()
+    ]
+    
+    return {
+        "since": since.isoformat(),
+        "app_id": app_id,
+        "total_requests": sum(row["requests"] for row in endpoints),
+        "endpoints": endpoints
     }
 
+@router.post("/reconcile")
+async def reconcile_firebase(
+    admin_key: str,
+    dry_run: bool = True,
+    app_id: Optional[str] = None
+):
+    """Compare Firebase against PostgreSQL and repair differing keys (admin only)
+    
+    Defaults to a dry run that only reports divergent keys. Repairs are queued in
+    replication_outbox and pushed by the replication worker.
+    """
+    verify_admin_key(admin_key)
+    
+    try:
+        return await reconciliation_service.reconcile_all(dry_run=dry_run, app_id=app_id)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
 @router.get("/apps")
 async def list_apps(
     admin_key: str,
@@ -100,8 +263,40 @@ async def revoke_app(
     
     app.status = "revoked"
     await db.commit()
+    api_key_cache.invalidate_app(str(app.id))
     
     return {
         "success": True,
         "message": f"App '{app.app_name}' has been revoked"
-    }
\ No newline at end of file
+    }
+
+@router.put("/apps/{app_id}/rate-limit")
+async def set_app_rate_limit(
+    app_id: str,
+    admin_key: str,
+    limit: AppRateLimitRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Set an app's rate limit (admin only)"""
+    verify_admin_key(admin_key)
+    
+    result = await db.execute(select(App).where(App.id == app_id))
+    app = result.scalar_one_or_none()
+    
+    if not app:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="App not found"
+        )
+    
+    app.rate_limit_requests = limit.rate_limit_requests
+    app.rate_limit_window = limit.rate_limit_window
+    await db.commit()
+    api_key_cache.invalidate_app(str(app.id))
+    
+    return {
+        "success": True,
+        "message": f"Rate limit for app '{app.app_name}' updated",
+        "rate_limit_requests": app.rate_limit_requests,
+        "rate_limit_window": app.rate_limit_window
+    }
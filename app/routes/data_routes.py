@@ -1,13 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
-from typing import Any, Dict
-from app.core.database import get_async_db
+from sqlalchemy.exc import DBAPIError, DataError
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Union
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db
+from app.core.http_cache import make_etag, etag_matches
 from app.services.async_postgres_service import AsyncPostgresService
 from app.services.sync_service import SyncService
+from app.services.data_cache import data_cache
+from app.services.replication_service import replication_worker
+from app.services.firebase_service import firebase_service
+from app.services.write_queue import write_queue
+from app.services.read_hedging import read_hedger, SECONDARY
+from app.services.json_patch import MERGE_PATCH, JSON_PATCH, PatchError, parse_field
 
 router = APIRouter()
 
+# Upper bound on rows per multi-row INSERT (asyncpg allows at most 32767 bind parameters)
+MAX_BATCH_SIZE = 1000
+
+# jsonb_build_object takes at most 100 arguments, two per projected field
+MAX_QUERY_FIELDS = 50
+
 class DataSaveRequest(BaseModel):
     data_key: str
     data_value: Dict[str, Any]
@@ -15,6 +32,78 @@ class DataSaveRequest(BaseModel):
 class DataUpdateRequest(BaseModel):
     data_value: Dict[str, Any]
 
+class DataBatchSaveRequest(BaseModel):
+    items: List[DataSaveRequest]
+
+class DataReadManyRequest(BaseModel):
+    data_keys: List[str]
+
+class DataQueryRequest(BaseModel):
+    contains: Optional[Dict[str, Any]] = None  # JSONB containment (@>)
+    jsonpath: Optional[str] = None  # JSONPath predicate (@?), e.g. '$.messages[*] ? (@.user == "alice")'
+    fields: Optional[List[str]] = Field(None, max_length=MAX_QUERY_FIELDS)  # dotted paths to project, e.g. ["user", "meta.version"]
+    prefix: str = ""
+    after: Optional[str] = None
+    limit: int = Field(100, ge=1, le=MAX_BATCH_SIZE)
+
+class DataIncrementRequest(BaseModel):
+    field: str  # dotted path, e.g. "stats.uploads"
+    amount: Union[int, float] = 1  # integers stay exact (no float rounding on large counters)
+
+class DataAppendRequest(BaseModel):
+    field: str  # dotted path to an array, e.g. "messages"
+    items: List[Any]
+
+def data_etag(app_id: str, data_key: str, updated_at) -> str:
+    """ETag for a data key version (updated_at changes on every write)"""
+    return make_etag(app_id, data_key, updated_at.isoformat())
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+def postgres_unavailable(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": str(int(settings.DB_CIRCUIT_RESET_TIMEOUT))}
+    )
+
+def invalid_input(error: DBAPIError) -> bool:
+    """Whether PostgreSQL rejected the statement's input (data exception or syntax error),
+    as opposed to failing itself (connection loss, timeouts, missing tables)"""
+    if isinstance(error, DataError):
+        return True
+    # asyncpg errors outside its mapped classes arrive as plain DBAPIError
+    sqlstate = getattr(error.orig, "sqlstate", None) or ""
+    return sqlstate.startswith("22") or sqlstate == "42601"
+
+async def hedged_get_data(app_id: str, data_key: str):
+    """PostgreSQL read for ReadHedger.race on its own session: a read that loses the race
+    finishes in the background, so it must not share the request's session"""
+    async with AsyncSessionLocal() as db:
+        return await AsyncPostgresService(db).get_data(app_id, data_key)
+
+def queue_writes(op: str, app_id: str, items: List[tuple]):
+    """Queue writes for PostgreSQL replay while its circuit is open"""
+    if write_queue.max_size - len(write_queue.pending) < len(items):
+        write_queue.rejected += len(items)
+        raise postgres_unavailable("PostgreSQL is unavailable and the write queue is full")
+    for data_key, data_value in items:
+        write_queue.enqueue(op, app_id, data_key, data_value)
+        data_cache.invalidate(app_id, data_key)
+
+def queued(firebase_message: str, firebase_synced: bool, **fields) -> JSONResponse:
+    """202 for writes queued for PostgreSQL, saying whether Firebase took them too"""
+    if firebase_synced:
+        message = f"{firebase_message}, PostgreSQL write queued"
+    else:
+        # Nowhere durable yet: only this worker's memory holds the write until it is replayed
+        message = "Firebase unavailable, PostgreSQL write queued in memory only until it can be replayed"
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"success": True, "queued": True, "firebase_synced": firebase_synced, "message": message, **fields}
+    )
+
 @router.post("/save")
 async def save_data(
     request: Request,
@@ -29,14 +118,20 @@ async def save_data(
         # Default app_id for testing when middleware is disabled
         app_id = "00000000-0000-0000-0000-000000000000"
     
+    # PostgreSQL unavailable: write to Firebase now and replay into PostgreSQL later
+    if write_queue.should_queue():
+        queue_writes("save", app_id, [(data.data_key, data.data_value)])
+        synced = await firebase_service.write_batch(app_id, {data.data_key: data.data_value})
+        return queued("Data saved to Firebase", synced, data_key=data.data_key)
+    
     postgres_service = AsyncPostgresService(db)
-    sync_service = SyncService(db)
     
     # Save to PostgreSQL
     result = await postgres_service.save_data(app_id, data.data_key, data.data_value)
+    data_cache.invalidate(app_id, data.data_key)
     
-    # Sync to Firebase
-    sync_service.sync_to_firebase(app_id, data.data_key, data.data_value)
+    # Replicate to Firebase in the background (queued by the data_store trigger)
+    replication_worker.notify()
     
     return {
         "success": True,
@@ -45,9 +140,58 @@ async def save_data(
         "data_key": data.data_key
     }
 
+@router.post("/batch/save")
+async def save_data_batch(
+    request: Request,
+    data: DataBatchSaveRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Save many keys to PostgreSQL in one transaction and sync to Firebase"""
+    # Handle app_id - use default if middleware is disabled
+    try:
+        app_id = request.state.app_id
+    except AttributeError:
+        # Default app_id for testing when middleware is disabled
+        app_id = "00000000-0000-0000-0000-000000000000"
+    
+    if len(data.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch too large: {len(data.items)} items (max {MAX_BATCH_SIZE})"
+        )
+    
+    items = [(item.data_key, item.data_value) for item in data.items]
+    
+    # PostgreSQL unavailable: write to Firebase now and replay into PostgreSQL later
+    if write_queue.should_queue():
+        queue_writes("save", app_id, items)
+        synced = await firebase_service.write_batch(app_id, dict(items))
+        return queued(f"{len(items)} data items saved to Firebase", synced, total=len(dict(items)))
+    
+    postgres_service = AsyncPostgresService(db)
+    
+    # Save to PostgreSQL (single multi-row INSERT)
+    results = await postgres_service.save_data_batch(app_id, items)
+    for data_key, _ in items:
+        data_cache.invalidate(app_id, data_key)
+    
+    # Replicate to Firebase in the background (queued by the data_store trigger)
+    replication_worker.notify()
+    
+    return {
+        "success": True,
+        "message": f"{len(results)} data items saved successfully",
+        "saved": [
+            {"data_id": str(result.id), "data_key": result.data_key}
+            for result in results
+        ],
+        "total": len(results)
+    }
+
 @router.get("/read/{data_key}")
 async def read_data(
     request: Request,
+    response: Response,
     data_key: str,
     db: AsyncSession = Depends(get_async_db)
 ):
@@ -62,10 +206,57 @@ async def read_data(
     postgres_service = AsyncPostgresService(db)
     sync_service = SyncService(db)
     
-    # Try PostgreSQL first
-    try:
-        result = await postgres_service.get_data(app_id, data_key)
-        if result:
+    # Serve from the in-process cache when possible
+    cached = data_cache.get(app_id, data_key)
+    if cached:
+        etag = data_etag(app_id, data_key, cached.updated_at)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return {
+            "success": True,
+            "source": "cache",
+            "data_key": data_key,
+            "data_value": cached.data_value,
+            "updated_at": cached.updated_at.isoformat()
+        }
+    
+    # Try PostgreSQL first, unless its circuit is open (or queued writes make Firebase newer)
+    if not write_queue.should_queue():
+        try:
+            # Conditional request: compare versions without loading the JSON payload
+            if request.headers.get("If-None-Match"):
+                updated_at = await postgres_service.get_data_version(app_id, data_key)
+                if updated_at:
+                    etag = data_etag(app_id, data_key, updated_at)
+                    if etag_matches(request, etag):
+                        return not_modified(etag)
+            
+            cache_epoch = data_cache.epoch
+            if read_hedger.enabled and firebase_service.is_initialized:
+                # Hedge: fire the Firebase read too if PostgreSQL is slower than usual
+                winner, result = await read_hedger.race(
+                    hedged_get_data(app_id, data_key),
+                    lambda: sync_service.get_from_firebase(app_id, data_key)
+                )
+                if winner == SECONDARY and result:
+                    return {
+                        "success": True,
+                        "source": "firebase_hedged",
+                        "data_key": data_key,
+                        "data_value": result
+                    }
+                if winner == SECONDARY:
+                    result = None  # PostgreSQL failed and Firebase has nothing either
+            else:
+                result = await postgres_service.get_data(app_id, data_key)
+            if not result:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Data with key '{data_key}' not found"
+                )
+            data_cache.put(app_id, data_key, result.data_value, result.updated_at, epoch=cache_epoch)
+            response.headers["ETag"] = data_etag(app_id, data_key, result.updated_at)
             return {
                 "success": True,
                 "source": "postgresql",
@@ -73,22 +264,170 @@ async def read_data(
                 "data_value": result.data_value,
                 "updated_at": result.updated_at.isoformat()
             }
-    except Exception as e:
-        # Fallback to Firebase
-        firebase_data = sync_service.get_from_firebase(app_id, data_key)
-        if firebase_data:
-            return {
-                "success": True,
-                "source": "firebase_fallback",
-                "data_key": data_key,
-                "data_value": firebase_data
-            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"⚠️ PostgreSQL read error, falling back to Firebase: {e}")
+    
+    # Fallback to Firebase
+    firebase_data = await sync_service.get_from_firebase(app_id, data_key)
+    if firebase_data:
+        return {
+            "success": True,
+            "source": "firebase_fallback",
+            "data_key": data_key,
+            "data_value": firebase_data
+        }
     
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Data with key '{data_key}' not found"
     )
 
+@router.post("/read-many")
+async def read_data_many(
+    request: Request,
+    data: DataReadManyRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Read many keys from PostgreSQL in one query with per-key Firebase fallback"""
+    # Handle app_id - use default if middleware is disabled
+    try:
+        app_id = request.state.app_id
+    except AttributeError:
+        # Default app_id for testing when middleware is disabled
+        app_id = "00000000-0000-0000-0000-000000000000"
+    
+    # Preserve request order while dropping duplicate keys
+    data_keys = list(dict.fromkeys(data.data_keys))
+    if len(data_keys) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many keys: {len(data_keys)} (max {MAX_BATCH_SIZE})"
+        )
+    
+    postgres_service = AsyncPostgresService(db)
+    sync_service = SyncService(db)
+    
+    found: Dict[str, Dict[str, Any]] = {}
+    
+    # Try PostgreSQL first, unless its circuit is open (or queued writes make Firebase newer)
+    if not write_queue.should_queue():
+        try:
+            records = await postgres_service.get_data_many(app_id, data_keys)
+            for data_key, record in records.items():
+                found[data_key] = {
+                    "source": "postgresql",
+                    "data_value": record.data_value,
+                    "updated_at": record.updated_at.isoformat()
+                }
+        except Exception as e:
+            print(f"⚠️ PostgreSQL multi-read error, falling back to Firebase: {e}")
+    
+    # Fallback to Firebase only for keys PostgreSQL did not return (concurrently)
+    missing = [data_key for data_key in data_keys if data_key not in found]
+    firebase_results = await asyncio.gather(
+        *(sync_service.get_from_firebase(app_id, data_key) for data_key in missing)
+    )
+    for data_key, firebase_data in zip(missing, firebase_results):
+        if firebase_data:
+            found[data_key] = {
+                "source": "firebase_fallback",
+                "data_value": firebase_data
+            }
+    
+    return {
+        "success": True,
+        "data": {data_key: found[data_key] for data_key in data_keys if data_key in found},
+        "missing": [data_key for data_key in data_keys if data_key not in found],
+        "total": len(found)
+    }
+
+@router.get("/keys")
+async def list_data_keys(
+    request: Request,
+    prefix: str = "",
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_BATCH_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List data keys by prefix, paginated with a keyset cursor"""
+    # Handle app_id - use default if middleware is disabled
+    try:
+        app_id = request.state.app_id
+    except AttributeError:
+        # Default app_id for testing when middleware is disabled
+        app_id = "00000000-0000-0000-0000-000000000000"
+    
+    postgres_service = AsyncPostgresService(db)
+    
+    # Fetch one extra row to know whether another page exists
+    rows = await postgres_service.list_data_keys(app_id, prefix, after, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return {
+        "success": True,
+        "keys": [
+            {"data_key": data_key, "updated_at": updated_at.isoformat()}
+            for data_key, updated_at in rows
+        ],
+        "next_cursor": rows[-1][0] if has_more else None,
+        "has_more": has_more
+    }
+
+@router.post("/query")
+async def query_data(
+    request: Request,
+    query: DataQueryRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Find data keys by JSON containment or JSONPath, evaluated in PostgreSQL"""
+    # Handle app_id - use default if middleware is disabled
+    try:
+        app_id = request.state.app_id
+    except AttributeError:
+        # Default app_id for testing when middleware is disabled
+        app_id = "00000000-0000-0000-0000-000000000000"
+    
+    postgres_service = AsyncPostgresService(db)
+    
+    # Fetch one extra row to know whether another page exists
+    try:
+        rows = await postgres_service.query_data(
+            app_id,
+            contains=query.contains,
+            jsonpath=query.jsonpath,
+            fields=query.fields,
+            prefix=query.prefix,
+            after=query.after,
+            limit=query.limit + 1
+        )
+    except DBAPIError as e:
+        # Malformed JSONPath expressions are rejected by PostgreSQL
+        if not invalid_input(e):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid query: {e.orig}"
+        )
+    has_more = len(rows) > query.limit
+    rows = rows[:query.limit]
+    
+    results = []
+    for data_key, updated_at, projection in rows:
+        entry = {"data_key": data_key, "updated_at": updated_at.isoformat()}
+        if query.fields:
+            entry["fields"] = projection
+        results.append(entry)
+    
+    return {
+        "success": True,
+        "results": results,
+        "next_cursor": rows[-1][0] if has_more else None,
+        "has_more": has_more
+    }
+
 @router.put("/update/{data_key}")
 async def update_data(
     request: Request,
@@ -104,11 +443,17 @@ async def update_data(
         # Default app_id for testing when middleware is disabled
         app_id = "00000000-0000-0000-0000-000000000000"
     
+    # PostgreSQL unavailable: write to Firebase now and replay into PostgreSQL later
+    if write_queue.should_queue():
+        queue_writes("update", app_id, [(data_key, data.data_value)])
+        synced = await firebase_service.write_batch(app_id, {data_key: data.data_value})
+        return queued("Data updated in Firebase", synced, data_key=data_key)
+    
     postgres_service = AsyncPostgresService(db)
-    sync_service = SyncService(db)
     
     # Update PostgreSQL
     result = await postgres_service.update_data(app_id, data_key, data.data_value)
+    data_cache.invalidate(app_id, data_key)
     
     if not result:
         raise HTTPException(
@@ -116,8 +461,8 @@ async def update_data(
             detail=f"Data with key '{data_key}' not found"
         )
     
-    # Sync to Firebase
-    sync_service.sync_to_firebase(app_id, data_key, data.data_value)
+    # Replicate to Firebase in the background (queued by the data_store trigger)
+    replication_worker.notify()
     
     return {
         "success": True,
@@ -126,6 +471,183 @@ async def update_data(
         "updated_at": result.updated_at.isoformat()
     }
 
+@router.patch("/update/{data_key}")
+async def patch_data(
+    request: Request,
+    data_key: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Partially update data in PostgreSQL and sync to Firebase
+
+    Send `application/merge-patch+json` (RFC 7386) or `application/json-patch+json`
+    (RFC 6902). The patch is applied in SQL, so only the change travels over the wire.
+    """
+    # Handle app_id - use default if middleware is disabled
+    try:
+        app_id = request.state.app_id
+    except AttributeError:
+        # Default app_id for testing when middleware is disabled
+        app_id = "00000000-0000-0000-0000-000000000000"
+    
+    try:
+        patch = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Patch body must be valid JSON"
+        )
+    
+    content_type = request.headers.get("Content-Type", "")
+    if "json-patch+json" in content_type or ("merge-patch+json" not in content_type and isinstance(patch, list)):
+        patch_format = JSON_PATCH
+    else:
+        patch_format = MERGE_PATCH
+    
+    # Applied in SQL only, so there is nothing to queue while PostgreSQL is down
+    if write_queue.should_queue():
+        raise postgres_unavailable("Patches need PostgreSQL, which is currently unavailable")
+    
+    postgres_service = AsyncPostgresService(db)
+    
+    # Patch PostgreSQL
+    try:
+        result = await postgres_service.patch_data(app_id, data_key, patch, patch_format)
+    except PatchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except DBAPIError as e:
+        # e.g. an array index that isn't a number; other errors are server errors
+        if not invalid_input(e):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Patch could not be applied: {e.orig}"
+        )
+    data_cache.invalidate(app_id, data_key)
+    
+    if not result:
+        if await postgres_service.get_data_version(app_id, data_key):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="JSON Patch could not be applied: a test operation failed or a path does not exist"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Data with key '{data_key}' not found"
+        )
+    
+    # Replicate to Firebase in the background (queued by the data_store trigger)
+    replication_worker.notify()
+    
+    return {
+        "success": True,
+        "message": "Data patched successfully",
+        "data_key": data_key,
+        "patch_format": patch_format,
+        "updated_at": result.updated_at.isoformat()
+    }
+
+@router.post("/incr/{data_key}")
+async def increment_data(
+    request: Request,
+    data_key: str,
+    data: DataIncrementRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Atomically increment a numeric field in PostgreSQL and sync it to Firebase"""
+    # Handle app_id - use default if middleware is disabled
+    try:
+        app_id = request.state.app_id
+    except AttributeError:
+        # Default app_id for testing when middleware is disabled
+        app_id = "00000000-0000-0000-0000-000000000000"
+    
+    try:
+        tokens = parse_field(data.field)
+    except PatchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # Whole numbers stay integers in the stored document
+    amount = data.amount
+    if isinstance(amount, float) and amount.is_integer():
+        amount = int(amount)
+    
+    # Applied in SQL only, so there is nothing to queue while PostgreSQL is down
+    if write_queue.should_queue():
+        raise postgres_unavailable("Increments need PostgreSQL, which is currently unavailable")
+    
+    postgres_service = AsyncPostgresService(db)
+    
+    # Increment in PostgreSQL (single upsert, no read-modify-write)
+    result = await postgres_service.increment_data(app_id, data_key, tokens, amount)
+    data_cache.invalidate(app_id, data_key)
+    
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Field '{data.field}' is not a number, or a parent of it is not an object"
+        )
+    value, updated_at = result
+    
+    # Replicate to Firebase in the background (queued by the data_store trigger)
+    replication_worker.notify()
+    
+    return {
+        "success": True,
+        "data_key": data_key,
+        "field": data.field,
+        "value": value,
+        "updated_at": updated_at.isoformat()
+    }
+
+@router.post("/append/{data_key}")
+async def append_data(
+    request: Request,
+    data_key: str,
+    data: DataAppendRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Atomically append items to an array field in PostgreSQL and sync them to Firebase"""
+    # Handle app_id - use default if middleware is disabled
+    try:
+        app_id = request.state.app_id
+    except AttributeError:
+        # Default app_id for testing when middleware is disabled
+        app_id = "00000000-0000-0000-0000-000000000000"
+    
+    try:
+        tokens = parse_field(data.field)
+    except PatchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # Applied in SQL only, so there is nothing to queue while PostgreSQL is down
+    if write_queue.should_queue():
+        raise postgres_unavailable("Appends need PostgreSQL, which is currently unavailable")
+    
+    postgres_service = AsyncPostgresService(db)
+    
+    # Append in PostgreSQL (single upsert, no read-modify-write)
+    result = await postgres_service.append_data(app_id, data_key, tokens, data.items)
+    data_cache.invalidate(app_id, data_key)
+    
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Field '{data.field}' is not an array, or a parent of it is not an object"
+        )
+    length, updated_at = result
+    
+    # Replicate to Firebase in the background (queued by the data_store trigger)
+    replication_worker.notify()
+    
+    return {
+        "success": True,
+        "data_key": data_key,
+        "field": data.field,
+        "appended": len(data.items),
+        "length": length,
+        "updated_at": updated_at.isoformat()
+    }
+
 @router.delete("/delete/{data_key}")
 async def delete_data(
     request: Request,
@@ -140,11 +662,17 @@ async def delete_data(
         # Default app_id for testing when middleware is disabled
         app_id = "00000000-0000-0000-0000-000000000000"
     
+    # PostgreSQL unavailable: delete from Firebase now and replay into PostgreSQL later
+    if write_queue.should_queue():
+        queue_writes("delete", app_id, [(data_key, None)])
+        synced = await firebase_service.write_batch(app_id, {data_key: None})
+        return queued("Data deleted from Firebase", synced, data_key=data_key)
+    
     postgres_service = AsyncPostgresService(db)
-    sync_service = SyncService(db)
     
     # Delete from PostgreSQL
     success = await postgres_service.delete_data(app_id, data_key)
+    data_cache.invalidate(app_id, data_key)
     
     if not success:
         raise HTTPException(
@@ -152,8 +680,8 @@ async def delete_data(
             detail=f"Data with key '{data_key}' not found"
         )
     
-    # Delete from Firebase
-    sync_service.delete_from_firebase(app_id, data_key)
+    # Replicate to Firebase in the background (queued by the data_store trigger)
+    replication_worker.notify()
     
     return {
         "success": True,
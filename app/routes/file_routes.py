@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_async_db
+from app.core.http_cache import make_etag, etag_matches
 from app.services.async_postgres_service import AsyncPostgresService
 from app.models.app_model import App, AppStatus
 import os
@@ -86,6 +87,7 @@ async def upload_file(
 @router.get("/read/{file_id}")
 async def read_file(
     request: Request,
+    response: Response,
     file_id: str,
     db: AsyncSession = Depends(get_async_db)
 ):
@@ -106,6 +108,12 @@ async def read_file(
             detail=f"File with ID '{file_id}' not found"
         )
     
+    # File metadata is immutable once uploaded
+    etag = make_etag(file_record.id, file_record.created_at.isoformat())
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     return {
         "success": True,
         "file_id": str(file_record.id),
@@ -118,6 +126,7 @@ async def read_file(
 @router.get("/list")
 async def list_files(
     request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     limit: int = 100,
     offset: int = 0
@@ -133,19 +142,27 @@ async def list_files(
     postgres_service = AsyncPostgresService(db)
     files = await postgres_service.list_files(app_id, limit, offset)
     
+    file_entries = [
+        {
+            "file_id": str(file.id),
+            "file_name": file.file_name,
+            "file_type": file.file_type,
+            "file_size": os.path.getsize(file.file_path) if os.path.exists(file.file_path) else 0,
+            "created_at": file.created_at.isoformat()
+        }
+        for file in files
+    ]
+    
+    # Content hash of the listing, so unchanged polls get 304
+    etag = make_etag(*(f"{entry['file_id']}:{entry['file_size']}" for entry in file_entries))
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     return {
         "success": True,
-        "files": [
-            {
-                "file_id": str(file.id),
-                "file_name": file.file_name,
-                "file_type": file.file_type,
-                "file_size": os.path.getsize(file.file_path) if os.path.exists(file.file_path) else 0,
-                "created_at": file.created_at.isoformat()
-            }
-            for file in files
-        ],
-        "total": len(files)
+        "files": file_entries,
+        "total": len(file_entries)
     }
 
 @router.get("/download/{file_id}")
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_async_db
+from app.core.database import get_async_db, postgres_circuit
 from app.services.firebase_service import firebase_service
+from app.services.write_queue import write_queue
 
 router = APIRouter()
 
@@ -11,13 +12,17 @@ async def health_check(db: AsyncSession = Depends(get_async_db)):
     
     # Check PostgreSQL
     postgres_status = "connected"
-    try:
-        from sqlalchemy import text
-        await db.execute(text("SELECT 1"))
-        print("✅ PostgreSQL health check passed")
-    except Exception as e:
-        postgres_status = f"error: {str(e)}"
-        print(f"❌ PostgreSQL health check failed: {e}")
+    if postgres_circuit.is_open:
+        # Don't wait on the connect timeout while the circuit is open
+        postgres_status = "circuit open"
+    else:
+        try:
+            from sqlalchemy import text
+            await db.execute(text("SELECT 1"))
+            print("✅ PostgreSQL health check passed")
+        except Exception as e:
+            postgres_status = f"error: {str(e)}"
+            print(f"❌ PostgreSQL health check failed: {e}")
     
     # Check Firebase
     firebase_status = "connected" if firebase_service.is_initialized else "not initialized"
@@ -29,5 +34,7 @@ async def health_check(db: AsyncSession = Depends(get_async_db)):
             "postgresql": postgres_status,
             "firebase": firebase_status
         },
+        "postgresql_circuit": postgres_circuit.state,
+        "queued_writes": len(write_queue.pending),
         "timestamp": "2024-12-22T00:00:00Z"
     }
@@ -0,0 +1,48 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func, select
+from app.core.database import AsyncSessionLocal, async_engine, postgres_circuit
+from app.core.metrics import (
+    registry, db_pool_size, db_pool_checked_out, db_pool_overflow, replication_queue_depth,
+    replication_changes, write_queue_depth, write_queue_rejected, request_log_rows
+)
+from app.models.replication_model import ReplicationOutbox
+from app.services.replication_service import replication_worker
+from app.services.request_log_writer import request_log_writer
+from app.services.write_queue import write_queue
+
+router = APIRouter()
+
+async def collect_pool_metrics():
+    pool = async_engine.pool
+    db_pool_size.set(pool.size())
+    db_pool_checked_out.set(pool.checkedout())
+    # QueuePool.overflow() is negative while fewer than pool_size connections are open
+    db_pool_overflow.set(max(pool.overflow(), 0))
+
+async def collect_queue_metrics():
+    write_queue_depth.set(len(write_queue.pending))
+    write_queue_rejected.set(write_queue.rejected)
+    replication_changes.set(replication_worker.pushed, outcome="pushed")
+    replication_changes.set(replication_worker.deleted, outcome="deleted")
+    replication_changes.set(replication_worker.failed, outcome="failed")
+    replication_changes.set(replication_worker.dead_lettered, outcome="dead_lettered")
+    request_log_rows.set(request_log_writer.written, outcome="written")
+    request_log_rows.set(request_log_writer.sampled_out, outcome="sampled_out")
+    request_log_rows.set(request_log_writer.dropped, outcome="dropped")
+    request_log_rows.set(request_log_writer.failed, outcome="failed")
+    
+    # Keep the last value rather than wait on a connect timeout
+    if not postgres_circuit.is_open:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(func.count()).select_from(ReplicationOutbox))
+            replication_queue_depth.set(result.scalar())
+
+registry.add_collector(collect_pool_metrics)
+registry.add_collector(collect_queue_metrics)
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    await registry.collect()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
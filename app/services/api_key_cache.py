@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from app.core.config import settings
+
+class CachedApp(NamedTuple):
+    """The App fields authentication needs"""
+    app_id: str
+    app_name: str
+    status: str
+    rate_limit_requests: Optional[int] = None
+    rate_limit_window: Optional[int] = None
+
+class APIKeyCache:
+    """LRU + TTL cache of API key -> app, including unknown keys (negative entries)
+
+    Entries are per worker process: after a revoke, other workers keep serving
+    their entry until it expires (at most `ttl_seconds`).
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float, negative_ttl_seconds: float,
+                 enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.enabled = enabled
+        # api_key -> (CachedApp or None for unknown keys, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Optional[CachedApp], float]]" = OrderedDict()
+        # Bumped on every invalidation so lookups that started earlier don't cache stale apps
+        self._epoch = 0
+
+        # Counters
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def get(self, api_key: str) -> Tuple[bool, Optional[CachedApp]]:
+        """Return (found, app); found with app None means the key is known to be invalid"""
+        if not self.enabled:
+            return False, None
+
+        entry = self._entries.get(api_key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[api_key]
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(api_key)
+        if entry[0] is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, entry[0]
+
+    def put(self, api_key: str, app: Optional[CachedApp], epoch: Optional[int] = None):
+        """Cache a lookup result (None for unknown keys) unless an invalidation happened since `epoch`"""
+        if not self.enabled or (epoch is not None and epoch != self._epoch):
+            return
+
+        ttl = self.ttl_seconds if app is not None else self.negative_ttl_seconds
+        self._entries[api_key] = (app, time.monotonic() + ttl)
+        self._entries.move_to_end(api_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_app(self, app_id: str):
+        """Drop every key of an app, e.g. after it is revoked"""
+        self._epoch += 1
+        stale = [api_key for api_key, (app, _) in self._entries.items() if app and app.app_id == app_id]
+        for api_key in stale:
+            del self._entries[api_key]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop all entries"""
+        self._epoch += 1
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "negative_ttl_seconds": self.negative_ttl_seconds,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+# Global instance
+api_key_cache = APIKeyCache(
+    max_entries=settings.API_KEY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.API_KEY_CACHE_TTL,
+    negative_ttl_seconds=settings.API_KEY_CACHE_NEGATIVE_TTL,
+    enabled=settings.API_KEY_CACHE_ENABLED
+)
@@ -1,26 +1,70 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, cast, func, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert, JSONPATH
 from app.models.data_model import DataStore
 from app.models.file_model import FileStore
-from typing import Dict, Any, Optional
+from app.services.json_patch import (
+    MERGE_PATCH, PatchError, merge_patch_expr, json_patch_step,
+    nested_document, increment_expr, append_expr, field_type_in
+)
+from typing import Dict, Any, Optional, List, Tuple, Union
+from datetime import datetime
 import uuid
 
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with prefix (code point order)"""
+    chars = list(prefix)
+    while chars:
+        code = ord(chars[-1]) + 1
+        if code == 0xD800:
+            code = 0xE000  # skip surrogates, which PostgreSQL can't store
+        if code <= 0x10FFFF:
+            chars[-1] = chr(code)
+            return "".join(chars)
+        chars.pop()
+    return None
+
 class AsyncPostgresService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
+    def _upsert_data_stmt(self, rows: List[Dict[str, Any]]):
+        """Build INSERT ... ON CONFLICT (app_id, data_key) DO UPDATE ... RETURNING"""
+        stmt = pg_insert(DataStore).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[DataStore.app_id, DataStore.data_key],
+            set_={
+                "data_value": stmt.excluded.data_value,
+                "updated_at": stmt.excluded.updated_at
+            }
+        ).returning(DataStore)
+    
     async def save_data(self, app_id: str, data_key: str, data_value: Dict[str, Any]) -> DataStore:
-        """Save data to PostgreSQL (async)"""
-        data_record = DataStore(
-            app_id=uuid.UUID(app_id),
-            data_key=data_key,
-            data_value=data_value
-        )
-        self.db.add(data_record)
+        """Save (upsert) data to PostgreSQL (async)"""
+        stmt = self._upsert_data_stmt([
+            {"app_id": uuid.UUID(app_id), "data_key": data_key, "data_value": data_value}
+        ])
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        data_record = result.scalar_one()
         await self.db.commit()
-        await self.db.refresh(data_record)
         return data_record
     
+    async def save_data_batch(self, app_id: str, items: List[Tuple[str, Dict[str, Any]]]) -> List[DataStore]:
+        """Upsert many key/value pairs with one multi-row INSERT in one transaction (async)"""
+        # ON CONFLICT cannot touch the same row twice in one statement, so the last value per key wins
+        latest = dict(items)
+        if not latest:
+            return []
+        app_uuid = uuid.UUID(app_id)
+        stmt = self._upsert_data_stmt([
+            {"app_id": app_uuid, "data_key": data_key, "data_value": data_value}
+            for data_key, data_value in latest.items()
+        ])
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        records = result.scalars().all()
+        await self.db.commit()
+        return records
+    
     async def get_data(self, app_id: str, data_key: str) -> Optional[DataStore]:
         """Get data from PostgreSQL (async)"""
         stmt = select(DataStore).where(
@@ -30,15 +74,189 @@ class AsyncPostgresService:
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
     
+    async def get_data_version(self, app_id: str, data_key: str) -> Optional[datetime]:
+        """Get only the updated_at version of a key, without loading data_value (async)"""
+        stmt = select(DataStore.updated_at).where(
+            DataStore.app_id == uuid.UUID(app_id),
+            DataStore.data_key == data_key
+        )
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+    
+    async def get_data_many(self, app_id: str, data_keys: List[str]) -> Dict[str, DataStore]:
+        """Get many keys from PostgreSQL with one indexed IN query (async)"""
+        if not data_keys:
+            return {}
+        stmt = select(DataStore).where(
+            DataStore.app_id == uuid.UUID(app_id),
+            DataStore.data_key.in_(data_keys)
+        )
+        result = await self.db.execute(stmt)
+        return {record.data_key: record for record in result.scalars().all()}
+    
+    async def list_data_keys(self, app_id: str, prefix: str = "", after: Optional[str] = None,
+                             limit: int = 100) -> List[Tuple[str, datetime]]:
+        """List (data_key, updated_at) in byte order using keyset pagination (async)"""
+        # COLLATE "C" matches ix_data_store_app_key_c, so prefix bounds, cursor and ORDER BY are all index range scans
+        key = DataStore.data_key.collate("C")
+        stmt = select(DataStore.data_key, DataStore.updated_at).where(
+            DataStore.app_id == uuid.UUID(app_id)
+        )
+        if prefix:
+            stmt = stmt.where(key >= prefix)
+            upper = _prefix_upper_bound(prefix)
+            if upper is not None:
+                stmt = stmt.where(key < upper)
+        if after is not None:
+            stmt = stmt.where(key > after)
+        stmt = stmt.order_by(key).limit(limit)
+        result = await self.db.execute(stmt)
+        return [(row.data_key, row.updated_at) for row in result]
+    
+    async def query_data(self, app_id: str, contains: Optional[Dict[str, Any]] = None,
+                         jsonpath: Optional[str] = None, fields: Optional[List[str]] = None,
+                         prefix: str = "", after: Optional[str] = None,
+                         limit: int = 100) -> List[Tuple[str, datetime, Optional[Dict[str, Any]]]]:
+        """Find keys whose JSONB value matches a containment filter and/or JSONPath (async)
+
+        Both filters are served by the GIN (jsonb_path_ops) index. `fields` are dotted
+        paths projected server-side, so only the requested parts of each document are returned.
+        """
+        key = DataStore.data_key.collate("C")
+        columns = [DataStore.data_key, DataStore.updated_at]
+        if fields:
+            projection = []
+            for field in fields:
+                projection.extend([field, DataStore.data_value[tuple(field.split("."))]])
+            columns.append(func.jsonb_build_object(*projection).label("projection"))
+        
+        stmt = select(*columns).where(DataStore.app_id == uuid.UUID(app_id))
+        if contains is not None:
+            stmt = stmt.where(DataStore.data_value.contains(contains))
+        if jsonpath is not None:
+            stmt = stmt.where(DataStore.data_value.op("@?")(cast(cast(jsonpath, String), JSONPATH)))
+        if prefix:
+            stmt = stmt.where(key >= prefix)
+            upper = _prefix_upper_bound(prefix)
+            if upper is not None:
+                stmt = stmt.where(key < upper)
+        if after is not None:
+            stmt = stmt.where(key > after)
+        stmt = stmt.order_by(key).limit(limit)
+        
+        result = await self.db.execute(stmt)
+        return [
+            (row.data_key, row.updated_at, row.projection if fields else None)
+            for row in result
+        ]
+    
     async def update_data(self, app_id: str, data_key: str, data_value: Dict[str, Any]) -> Optional[DataStore]:
-        """Update data in PostgreSQL (async)"""
-        data_record = await self.get_data(app_id, data_key)
-        if data_record:
-            data_record.data_value = data_value
-            await self.db.commit()
-            await self.db.refresh(data_record)
+        """Update data in PostgreSQL with one UPDATE ... RETURNING (async)"""
+        stmt = update(DataStore).where(
+            DataStore.app_id == uuid.UUID(app_id),
+            DataStore.data_key == data_key
+        ).values(data_value=data_value).returning(DataStore)
+        result = await self.db.execute(
+            stmt,
+            execution_options={"populate_existing": True, "synchronize_session": False}
+        )
+        data_record = result.scalar_one_or_none()
+        await self.db.commit()
         return data_record
     
+    async def patch_data(self, app_id: str, data_key: str, patch: Any,
+                         patch_format: str = MERGE_PATCH) -> Optional[DataStore]:
+        """Apply a merge patch or JSON Patch inside PostgreSQL with one UPDATE ... RETURNING (async)
+
+        Returns None when the key doesn't exist, a JSON Patch "test" operation fails
+        or an operation's path doesn't exist.
+        """
+        where = (
+            DataStore.app_id == uuid.UUID(app_id),
+            DataStore.data_key == data_key
+        )
+        if patch_format == MERGE_PATCH:
+            stmt = update(DataStore).where(*where).values(
+                data_value=merge_patch_expr(DataStore.data_value, patch)
+            )
+        else:
+            if not isinstance(patch, list):
+                raise PatchError("JSON Patch must be an array of operations")
+            # Chain one CTE per operation so each step references the previous document once.
+            # FOR UPDATE makes the first step wait for concurrent writers and read the latest
+            # committed document; a plain subquery would patch the statement's snapshot.
+            step = select(DataStore.data_value.label("document")).where(*where).with_for_update().cte(
+                "patch_step_0"
+            )
+            for i, operation in enumerate(patch, 1):
+                document, condition = json_patch_step(step.c.document, operation)
+                next_step = select(document.label("document")).select_from(step)
+                if condition is not None:
+                    next_step = next_step.where(condition)
+                step = next_step.cte(f"patch_step_{i}")
+            patched = select(step.c.document)
+            stmt = update(DataStore).where(*where, patched.exists()).values(
+                data_value=patched.scalar_subquery()
+            )
+        
+        result = await self.db.execute(
+            stmt.returning(DataStore),
+            execution_options={"populate_existing": True, "synchronize_session": False}
+        )
+        data_record = result.scalar_one_or_none()
+        await self.db.commit()
+        return data_record
+    
+    async def _upsert_field(self, app_id: str, data_key: str, initial: Dict[str, Any],
+                            new_value, condition, returned) -> Optional[Tuple[Any, datetime]]:
+        """INSERT `initial` or update the existing row to `new_value` when `condition` holds, in one statement"""
+        stmt = pg_insert(DataStore).values(
+            app_id=uuid.UUID(app_id),
+            data_key=data_key,
+            data_value=initial
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DataStore.app_id, DataStore.data_key],
+            set_={"data_value": new_value, "updated_at": stmt.excluded.updated_at},
+            where=condition
+        ).returning(returned.label("result"), DataStore.updated_at)
+        result = await self.db.execute(stmt)
+        row = result.one_or_none()
+        await self.db.commit()
+        return (row.result, row.updated_at) if row else None
+    
+    async def increment_data(self, app_id: str, data_key: str, tokens: List[str],
+                             amount: Union[int, float]) -> Optional[Tuple[Any, datetime]]:
+        """Atomically add `amount` to a numeric field, creating the key/field if missing (async)
+
+        Returns (new_value, updated_at), or None when the field holds a non-number or a
+        parent of it is not an object.
+        """
+        column = DataStore.data_value
+        return await self._upsert_field(
+            app_id, data_key,
+            initial=nested_document(tokens, amount),
+            new_value=increment_expr(column, tokens, amount),
+            condition=field_type_in(column, tokens, "number", "null"),
+            returned=column[tuple(tokens)]
+        )
+    
+    async def append_data(self, app_id: str, data_key: str, tokens: List[str],
+                          items: List[Any]) -> Optional[Tuple[int, datetime]]:
+        """Atomically append `items` to an array field, creating the key/field if missing (async)
+
+        Returns (new_length, updated_at), or None when the field holds a non-array or a
+        parent of it is not an object.
+        """
+        column = DataStore.data_value
+        return await self._upsert_field(
+            app_id, data_key,
+            initial=nested_document(tokens, items),
+            new_value=append_expr(column, tokens, items),
+            condition=field_type_in(column, tokens, "array", "null"),
+            returned=func.jsonb_array_length(column[tuple(tokens)])
+        )
+    
     async def delete_data(self, app_id: str, data_key: str) -> bool:
         """Delete data from PostgreSQL (async)"""
         stmt = delete(DataStore).where(
@@ -50,16 +268,16 @@ class AsyncPostgresService:
         return result.rowcount > 0
     
     async def save_file_metadata(self, app_id: str, file_name: str, file_path: str, file_type: str) -> FileStore:
-        """Save file metadata to PostgreSQL (async)"""
-        file_record = FileStore(
+        """Save file metadata to PostgreSQL with one INSERT ... RETURNING (async)"""
+        stmt = pg_insert(FileStore).values(
             app_id=uuid.UUID(app_id),
             file_name=file_name,
             file_path=file_path,
             file_type=file_type
-        )
-        self.db.add(file_record)
+        ).returning(FileStore)
+        result = await self.db.execute(stmt)
+        file_record = result.scalar_one()
         await self.db.commit()
-        await self.db.refresh(file_record)
         return file_record
     
     async def get_file_metadata(self, app_id: str, file_id: str) -> Optional[FileStore]:
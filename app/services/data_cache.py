@@ -0,0 +1,128 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from app.core.config import settings
+
+class CachedData(NamedTuple):
+    """Snapshot of a DataStore row as served from the cache"""
+    data_value: Dict[str, Any]
+    updated_at: datetime
+
+class DataCache:
+    """LRU + TTL read-through cache for data keys, bounded by entry count and bytes"""
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        # (app_id, data_key) -> (CachedData, expires_at, size_bytes)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[CachedData, float, int]]" = OrderedDict()
+        self._total_bytes = 0
+        # Bumped on every invalidation so reads that started earlier don't repopulate stale values
+        self._epoch = 0
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+    
+    def get(self, app_id: str, data_key: str) -> Optional[CachedData]:
+        """Return a cached value, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+        
+        key = (app_id, data_key)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        cached, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return cached
+    
+    def put(self, app_id: str, data_key: str, data_value: Dict[str, Any], updated_at: datetime,
+            epoch: Optional[int] = None) -> CachedData:
+        """Cache a value read from PostgreSQL unless a write happened since `epoch`"""
+        cached = CachedData(data_value, updated_at)
+        if not self.enabled or (epoch is not None and epoch != self._epoch):
+            return cached
+        
+        size = len(json.dumps(data_value, default=str))
+        if size > self.max_bytes:
+            return cached
+        
+        key = (app_id, data_key)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (cached, time.monotonic() + self.ttl_seconds, size)
+        self._total_bytes += size
+        
+        # Evict least recently used entries until both bounds hold
+        while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        
+        return cached
+    
+    def invalidate(self, app_id: str, data_key: str):
+        """Drop a key after a write"""
+        self._epoch += 1
+        if self._remove((app_id, data_key)):
+            self.invalidations += 1
+    
+    def clear(self):
+        """Drop all entries"""
+        self._epoch += 1
+        self._entries.clear()
+        self._total_bytes = 0
+    
+    def _remove(self, key: Tuple[str, str]) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._total_bytes -= entry[2]
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+# Global instance. Writes only invalidate this process's entries, so with several
+# workers the others would serve stale values until the TTL: the cache is off then.
+data_cache = DataCache(
+    max_entries=settings.DATA_CACHE_MAX_ENTRIES,
+    max_bytes=settings.DATA_CACHE_MAX_BYTES,
+    ttl_seconds=settings.DATA_CACHE_TTL,
+    enabled=settings.DATA_CACHE_ENABLED and settings.WEB_CONCURRENCY <= 1
+)
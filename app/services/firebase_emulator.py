@@ -0,0 +1,203 @@
+"""
+Local stand-in for the Firebase Realtime Database REST API.
+
+Used by FirebaseService when FIREBASE_EMULATOR is set:
+  memory - requests are served in-process by a FirebaseEmulator
+  http   - requests go to FIREBASE_DATABASE_URL without auth, e.g. a server started with
+           python -m app.services.firebase_emulator --port 9000 --latency 0.05 --failure-rate 0.1
+
+Supports GET (with shallow=true), PUT, PATCH (multi-location) and DELETE on paths,
+ETags (X-Firebase-ETag on reads, if-match on writes) and injectable latency and
+failure rates. Like the RTDB, writes with keys containing
+. # $ [ ] and multi-location updates with overlapping paths are rejected (HTTP 400)
+without applying any of the change.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+from aiohttp import web
+
+class EmulatedFailure(RuntimeError):
+    """Raised for requests the emulator was told to fail"""
+    pass
+
+class PreconditionFailed(RuntimeError):
+    """Raised for writes whose if-match ETag no longer matches the location"""
+    pass
+
+# Characters the RTDB doesn't allow in keys
+FORBIDDEN_KEY_CHARS = set(".#$[]")
+
+def _split(path: str) -> List[str]:
+    return [part for part in path.strip("/").split("/") if part]
+
+def _check_key(key: str):
+    if any(char in FORBIDDEN_KEY_CHARS for char in key):
+        raise ValueError(f"Invalid key {key!r}: keys can't contain . # $ [ ]")
+
+def _check_value(value: Any):
+    """Reject nested keys the RTDB wouldn't store"""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            _check_key(key)
+            _check_value(child)
+    elif isinstance(value, list):
+        for child in value:
+            _check_value(child)
+
+def _check_write(path: str, value: Any):
+    for part in _split(path):
+        _check_key(part)
+    _check_value(value)
+
+def _prune(value: Any) -> Any:
+    """Drop nulls and empty objects, which the RTDB never stores"""
+    if isinstance(value, dict):
+        pruned = {key: _prune(child) for key, child in value.items()}
+        pruned = {key: child for key, child in pruned.items() if child is not None}
+        return pruned or None
+    return value
+
+class FirebaseEmulator:
+    """In-memory JSON tree answering RTDB REST requests"""
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.root: Dict[str, Any] = {}
+        self._random = random.Random(seed)
+
+        # Counters
+        self.requests = 0
+        self.failures = 0
+
+    def etag(self, path: str) -> str:
+        """Content hash of the value at `path` (changes whenever the value does)"""
+        value = json.dumps(self.get(path), sort_keys=True, separators=(",", ":"))
+        return hashlib.md5(value.encode("utf-8")).hexdigest()
+
+    def get(self, path: str) -> Any:
+        node: Any = self.root
+        for part in _split(path):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def set(self, path: str, value: Any):
+        parts = _split(path)
+        value = _prune(json.loads(json.dumps(value)))
+        if not parts:
+            self.root = value if isinstance(value, dict) else {}
+            return
+
+        # Walk down, creating parents; remember them to prune empties on delete
+        node = self.root
+        parents = []
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                if value is None:
+                    return
+                node[part] = {}
+            parents.append((node, part))
+            node = node[part]
+
+        if value is None:
+            node.pop(parts[-1], None)
+            for parent, part in reversed(parents):
+                if parent[part]:
+                    break
+                del parent[part]
+        else:
+            node[parts[-1]] = value
+
+    def update(self, path: str, changes: Dict[str, Any]):
+        """Multi-location update: each key is a path relative to `path`
+
+        All-or-nothing: every location is validated before anything is written.
+        """
+        for child_path, value in changes.items():
+            _check_write(f"{path}/{child_path}", value)
+        paths = sorted(tuple(_split(child_path)) for child_path in changes)
+        for parent, child in zip(paths, paths[1:]):
+            if child[:len(parent)] == parent:
+                raise ValueError(f"Path '{'/'.join(parent)}' is an ancestor of '{'/'.join(child)}' in the same update")
+
+        for child_path, value in changes.items():
+            self.set(f"{path}/{child_path}", value)
+
+    async def handle(self, method: str, path: str, payload: Any = None,
+                     params: Optional[Dict[str, str]] = None, headers: Optional[Dict[str, str]] = None) -> Any:
+        """Serve one REST request, honouring the injected latency and failure rate"""
+        self.requests += 1
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.failures += 1
+            raise EmulatedFailure("HTTP 503: injected emulator failure")
+
+        if_match = {key.lower(): value for key, value in (headers or {}).items()}.get("if-match")
+        if if_match is not None and method != "GET" and if_match != self.etag(path):
+            raise PreconditionFailed("HTTP 412: ETag does not match")
+
+        if method == "GET":
+            value = self.get(path)
+            if (params or {}).get("shallow") == "true" and isinstance(value, dict):
+                return {key: True if isinstance(child, dict) else child for key, child in value.items()}
+            return value
+        if method == "PUT":
+            _check_write(path, payload)
+            self.set(path, payload)
+            return payload
+        if method == "PATCH":
+            if not isinstance(payload, dict):
+                raise ValueError("PATCH payload must be an object")
+            self.update(path, payload)
+            return payload
+        if method == "DELETE":
+            self.set(path, None)
+            return None
+        raise ValueError(f"Unsupported method: {method}")
+
+    async def _handle_http(self, request: web.Request) -> web.Response:
+        payload = await request.json() if request.can_read_body else None
+        path = unquote(request.match_info["path"])
+        try:
+            result = await self.handle(request.method, path, payload, dict(request.query), dict(request.headers))
+        except EmulatedFailure as e:
+            return web.json_response({"error": str(e)}, status=503)
+        except PreconditionFailed as e:
+            return web.json_response({"error": str(e)}, status=412, headers={"ETag": self.etag(path)})
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        headers = {"ETag": self.etag(path)} if request.headers.get("X-Firebase-ETag") == "true" else None
+        return web.json_response(result, headers=headers)
+
+    def make_app(self) -> web.Application:
+        """aiohttp application serving /{path}.json"""
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}.json", self._handle_http)
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Firebase Realtime Database emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds, uniform in [0, jitter]")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    emulator = FirebaseEmulator(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate)
+    print(f"🔥 Firebase emulator on http://{args.host}:{args.port} "
+          f"(latency {args.latency}s, jitter {args.jitter}s, failure rate {args.failure_rate})")
+    web.run_app(emulator.make_app(), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
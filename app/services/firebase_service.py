@@ -1,22 +1,81 @@
-import firebase_admin
-from firebase_admin import credentials, db
+import asyncio
+import hashlib
+import uuid
+import aiohttp
+from datetime import datetime, timedelta
+from firebase_admin import credentials
 from app.core.config import settings
-from typing import Dict, Any, Optional
+from app.core.metrics import firebase_requests
+from app.services.firebase_emulator import FirebaseEmulator, EmulatedFailure, PreconditionFailed
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import quote, unquote
 import os
 
+# Content digests live at apps/{app_id}/digests/{bucket}/{digest_key(data_key)}, bucketed
+# by the first hex chars of md5(data_key) (256 buckets), for reconciliation against PostgreSQL.
+# apps/{app_id}/bucket_hashes/{bucket} caches the hash of a bucket's digests; every
+# write replaces it with a unique dirty marker until reconciliation recomputes it.
+DIGEST_BUCKET_CHARS = 2
+
+# Digest of a key written without one (never matches PostgreSQL)
+UNKNOWN_DIGEST = "?"
+
+DIRTY_BUCKET_PREFIX = "dirty:"
+
+def digest_bucket(data_key: str) -> str:
+    return hashlib.md5(data_key.encode("utf-8")).hexdigest()[:DIGEST_BUCKET_CHARS]
+
+def digest_key(data_key: str) -> str:
+    """A data_key as a single path segment under digests/{bucket} ("/" would nest it)"""
+    return data_key.replace("%", "%25").replace("/", "%2F")
+
+class FirebaseError(RuntimeError):
+    """A request the database answered with an HTTP error
+
+    400 means the payload itself was rejected (e.g. a key containing . # $ [ ] or
+    overlapping paths in one multi-location update); retrying it unchanged won't help.
+    """
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
 class FirebaseService:
+    """Firebase Realtime Database client over the REST API.
+    
+    All I/O is non-blocking: requests share a pooled aiohttp session with bounded
+    concurrency, and the (blocking) OAuth token refresh runs in a worker thread.
+    """
     def __init__(self):
         self.is_initialized = False
+        self.database_url = settings.FIREBASE_DATABASE_URL.rstrip("/")
+        self.max_connections = settings.FIREBASE_MAX_CONNECTIONS
+        self.timeout = settings.FIREBASE_TIMEOUT
+        self._credential = None
+        self._emulator: Optional[FirebaseEmulator] = None
+        self._access_token: Optional[str] = None
+        self._token_expiry: Optional[datetime] = None
+        # Event-loop bound objects are created lazily on first use
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._token_lock: Optional[asyncio.Lock] = None
         self._initialize()
     
     def _initialize(self):
-        """Initialize Firebase Admin SDK"""
+        """Load service account credentials (or set up the configured emulator)"""
         try:
-            if os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
-                cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
-                firebase_admin.initialize_app(cred, {
-                    'databaseURL': 'https://novrintech-data-fall-back-default-rtdb.firebaseio.com/'
-                })
+            if settings.FIREBASE_EMULATOR == "memory":
+                self._emulator = FirebaseEmulator(
+                    latency=settings.FIREBASE_EMULATOR_LATENCY,
+                    jitter=settings.FIREBASE_EMULATOR_JITTER,
+                    failure_rate=settings.FIREBASE_EMULATOR_FAILURE_RATE
+                )
+                self.is_initialized = True
+                print("🧪 Firebase emulator (in-process) initialized")
+            elif settings.FIREBASE_EMULATOR == "http":
+                self.is_initialized = True
+                print(f"🧪 Firebase emulator at {self.database_url}")
+            elif os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
+                self._credential = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
                 self.is_initialized = True
                 print("✅ Firebase initialized successfully")
             else:
@@ -28,28 +87,134 @@ class FirebaseService:
             print("🔄 Firebase features will be disabled, PostgreSQL will work normally")
             self.is_initialized = False
     
-    def save_data(self, app_id: str, data_key: str, data_value: Dict[str, Any]):
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+            self._token_lock = asyncio.Lock()
+        return self._session
+    
+    async def _get_access_token(self) -> str:
+        """Return a cached OAuth token, refreshing it in a thread shortly before expiry"""
+        async with self._token_lock:
+            if not self._access_token or datetime.utcnow() >= self._token_expiry:
+                token_info = await asyncio.to_thread(self._credential.get_access_token)
+                self._access_token = token_info.access_token
+                expiry = token_info.expiry or datetime.utcnow() + timedelta(minutes=30)
+                self._token_expiry = expiry - timedelta(minutes=5)
+            return self._access_token
+    
+    async def _request(self, method: str, path: str, payload: Any = None,
+                       params: Optional[Dict[str, str]] = None, headers: Optional[Dict[str, str]] = None,
+                       etag: bool = False) -> Any:
+        """Send one REST request to the database, raising on HTTP errors
+        
+        With etag=True returns (result, etag) for conditional writes (if-match).
+        """
+        if etag:
+            headers = {**(headers or {}), "X-Firebase-ETag": "true"}
+        try:
+            result, response_etag = await self._send(method, path, payload, params, headers or {})
+        except Exception:
+            firebase_requests.inc(method=method, result="error")
+            raise
+        firebase_requests.inc(method=method, result="ok")
+        return (result, response_etag) if etag else result
+    
+    async def _send(self, method: str, path: str, payload: Any, params: Optional[Dict[str, str]],
+                    headers: Dict[str, str]) -> Tuple[Any, Optional[str]]:
+        """_request without the metrics, returning (result, etag)"""
+        if self._emulator:
+            try:
+                result = await self._emulator.handle(method, path, payload, params, headers)
+            except EmulatedFailure as e:
+                raise FirebaseError(503, str(e))
+            except PreconditionFailed as e:
+                raise FirebaseError(412, str(e))
+            except ValueError as e:
+                raise FirebaseError(400, str(e))
+            return result, self._emulator.etag(path) if "X-Firebase-ETag" in headers else None
+        
+        session = self._get_session()
+        url = f"{self.database_url}/{quote(path)}.json"
+        async with self._semaphore:
+            # The HTTP emulator doesn't check credentials
+            if self._credential:
+                headers = {**headers, "Authorization": f"Bearer {await self._get_access_token()}"}
+            kwargs = {"json": payload} if method in ("PUT", "PATCH") else {}
+            async with session.request(method, url, headers=headers, params=params, **kwargs) as response:
+                if response.status >= 400:
+                    raise FirebaseError(response.status, await response.text())
+                return await response.json(), response.headers.get("ETag")
+    
+    async def save_data(self, app_id: str, data_key: str, data_value: Dict[str, Any]) -> bool:
         """Save data to Firebase Realtime Database"""
         if not self.is_initialized:
             print("⚠️ Firebase not initialized, skipping Firebase sync")
-            return
+            return False
         
         try:
-            ref = db.reference(f'apps/{app_id}/data/{data_key}')
-            ref.set(data_value)
+            await self._request("PUT", f"apps/{app_id}/data/{data_key}", data_value)
             print(f"✅ Data synced to Firebase: {data_key}")
+            return True
         except Exception as e:
             print(f"⚠️ Firebase save error: {e}")
+            return False
     
-    def get_data(self, app_id: str, data_key: str) -> Optional[Dict[str, Any]]:
+    async def write_batch(self, app_id: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                          digests: Optional[Dict[str, Optional[str]]] = None) -> bool:
+        """Apply many key writes/deletes with one multi-location update (see update_batch),
+        returning False instead of raising on errors"""
+        if not self.is_initialized:
+            print("⚠️ Firebase not initialized, skipping Firebase sync")
+            return False
+        
+        try:
+            await self.update_batch(app_id, changes, digests)
+            return True
+        except Exception as e:
+            print(f"⚠️ Firebase batch update error: {e}")
+            return False
+    
+    async def update_batch(self, app_id: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                           digests: Optional[Dict[str, Optional[str]]] = None):
+        """Apply many key writes/deletes with one multi-location update (PATCH) at apps/{app_id}
+        
+        A None value deletes the key. Repeated writes to a key must already be collapsed
+        into the latest value (the dict holds one entry per key). Each key's digest is
+        written alongside it (UNKNOWN_DIGEST when not given), and the touched buckets'
+        cached hashes are replaced by a dirty marker so reconciliation re-checks them.
+        The update is all-or-nothing; raises on errors (FirebaseError for HTTP errors).
+        """
+        if not self.is_initialized:
+            raise RuntimeError("Firebase not initialized")
+        if not changes:
+            return
+        
+        digests = digests or {}
+        dirty = f"{DIRTY_BUCKET_PREFIX}{uuid.uuid4().hex}"
+        updates = {}
+        for data_key, data_value in changes.items():
+            bucket = digest_bucket(data_key)
+            digest = None if data_value is None else (digests.get(data_key) or UNKNOWN_DIGEST)
+            updates[f"data/{data_key}"] = data_value
+            updates[f"digests/{bucket}/{digest_key(data_key)}"] = digest
+            updates[f"bucket_hashes/{bucket}"] = dirty
+        
+        await self._request("PATCH", f"apps/{app_id}", updates)
+        print(f"✅ Batch synced to Firebase: {len(changes)} keys for app {app_id}")
+    
+    async def get_data(self, app_id: str, data_key: str) -> Optional[Dict[str, Any]]:
         """Get data from Firebase Realtime Database"""
         if not self.is_initialized:
             print("⚠️ Firebase not initialized, cannot fallback to Firebase")
             return None
         
         try:
-            ref = db.reference(f'apps/{app_id}/data/{data_key}')
-            data = ref.get()
+            data = await self._request("GET", f"apps/{app_id}/data/{data_key}")
             if data:
                 print(f"✅ Data retrieved from Firebase: {data_key}")
             return data
@@ -57,18 +222,50 @@ class FirebaseService:
             print(f"⚠️ Firebase get error: {e}")
             return None
     
-    def delete_data(self, app_id: str, data_key: str):
+    async def delete_data(self, app_id: str, data_key: str) -> bool:
         """Delete data from Firebase Realtime Database"""
         if not self.is_initialized:
             print("⚠️ Firebase not initialized, skipping Firebase delete")
-            return
+            return False
         
         try:
-            ref = db.reference(f'apps/{app_id}/data/{data_key}')
-            ref.delete()
+            await self._request("DELETE", f"apps/{app_id}/data/{data_key}")
             print(f"✅ Data deleted from Firebase: {data_key}")
+            return True
         except Exception as e:
             print(f"⚠️ Firebase delete error: {e}")
+            return False
+    
+    async def get_bucket_hashes(self, app_id: str) -> Dict[str, str]:
+        """Get an app's cached bucket hashes as {bucket: hash or dirty marker}; raises on errors"""
+        return await self._request("GET", f"apps/{app_id}/bucket_hashes") or {}
+    
+    async def get_bucket_hash(self, app_id: str, bucket: str) -> Tuple[Optional[str], Optional[str]]:
+        """Get one bucket's cached hash and its ETag; raises on errors"""
+        return await self._request("GET", f"apps/{app_id}/bucket_hashes/{bucket}", etag=True)
+    
+    async def set_bucket_hash(self, app_id: str, bucket: str, bucket_hash: Optional[str], etag: str) -> bool:
+        """Store a bucket's hash unless it was written since `etag` was read; raises on other errors"""
+        try:
+            await self._request(
+                "PUT", f"apps/{app_id}/bucket_hashes/{bucket}", bucket_hash, headers={"if-match": etag}
+            )
+            return True
+        except FirebaseError as e:
+            if e.status == 412:
+                return False
+            raise
+    
+    async def get_bucket_digests(self, app_id: str, bucket: str) -> Dict[str, str]:
+        """Get one bucket's content digests as {data_key: digest}; raises on errors"""
+        digests = await self._request("GET", f"apps/{app_id}/digests/{bucket}") or {}
+        # digest_key only escapes % and /, so unquote restores the key exactly
+        return {unquote(key): digest for key, digest in digests.items()}
+    
+    async def close(self):
+        """Close the pooled HTTP session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
 
 # Singleton instance
 firebase_service = FirebaseService()
@@ -0,0 +1,202 @@
+"""
+Compile RFC 7386 merge patches, RFC 6902 JSON Patches and atomic field
+operations (increment, append) into PostgreSQL JSONB expressions, so
+documents are modified in place by a single statement instead of being
+re-sent and rewritten by the client.
+"""
+import json
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import and_, case, cast, func, literal, or_, Numeric, Text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+MERGE_PATCH = "merge-patch"
+JSON_PATCH = "json-patch"
+
+# Each missing parent level doubles the size of ensure_parents_expr
+MAX_FIELD_DEPTH = 8
+
+class PatchError(ValueError):
+    """Raised for malformed patch documents"""
+    pass
+
+def _jsonb(value: Any):
+    """Bind a Python value as a JSONB literal"""
+    return cast(literal(json.dumps(value), Text), JSONB)
+
+def _path(tokens: List[str]):
+    """Bind a key path as text[]"""
+    return literal(tokens, ARRAY(Text))
+
+def _get_path(target, tokens: List[str]):
+    return target.op("#>", return_type=JSONB)(_path(tokens))
+
+def _object_or_empty(target):
+    return case((func.jsonb_typeof(target) == "object", target), else_=_jsonb({}))
+
+def parse_pointer(pointer: Any) -> List[str]:
+    """Split an RFC 6901 JSON Pointer into path tokens"""
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON Pointer: {pointer!r} (the document root cannot be patched)")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+def parse_field(field: Any) -> List[str]:
+    """Split a dotted field name ("stats.uploads") into path tokens"""
+    if not isinstance(field, str) or not field or any(not token for token in field.split(".")):
+        raise PatchError(f"Invalid field: {field!r}")
+    tokens = field.split(".")
+    if len(tokens) > MAX_FIELD_DEPTH:
+        raise PatchError(f"Field nested too deeply: {field!r} (max depth {MAX_FIELD_DEPTH})")
+    return tokens
+
+def nested_document(tokens: List[str], value: Any) -> Dict[str, Any]:
+    """Build {"a": {"b": value}} for tokens ["a", "b"]"""
+    document = value
+    for token in reversed(tokens):
+        document = {token: document}
+    return document
+
+def ensure_parents_expr(document, tokens: List[str]):
+    """Create missing parent objects so jsonb_set can write at `tokens`"""
+    for depth in range(1, len(tokens)):
+        parent = tokens[:depth]
+        document = func.jsonb_set(
+            document, _path(parent),
+            func.coalesce(_get_path(document, parent), _jsonb({}), type_=JSONB),
+            True, type_=JSONB
+        )
+    return document
+
+def increment_expr(document, tokens: List[str], amount: Union[int, float]):
+    """JSONB expression adding `amount` to the number at `tokens` (missing counts as 0)
+
+    The sum is exact numeric arithmetic, so large integer counters stay exact integers.
+    """
+    current = cast(document.op("#>>")(_path(tokens)), Numeric)
+    total = func.coalesce(current, 0) + literal(Decimal(str(amount)), Numeric)
+    return func.jsonb_set(
+        ensure_parents_expr(document, tokens), _path(tokens), func.to_jsonb(total, type_=JSONB), True, type_=JSONB
+    )
+
+def append_expr(document, tokens: List[str], items: List[Any]):
+    """JSONB expression appending `items` to the array at `tokens` (missing or null counts as [])"""
+    value = _get_path(document, tokens)
+    current = case((func.jsonb_typeof(value) == "array", value), else_=_jsonb([]))
+    return func.jsonb_set(
+        ensure_parents_expr(document, tokens), _path(tokens),
+        current.op("||", return_type=JSONB)(_jsonb(items)), True, type_=JSONB
+    )
+
+def field_type_in(document, tokens: List[str], *types: str):
+    """Condition: the value at `tokens` is missing or has one of the given jsonb types,
+    and every parent on the way is missing or an object (jsonb_set can't write through
+    anything else and would silently leave the document unchanged)"""
+    value = _get_path(document, tokens)
+    conditions = [or_(value.is_(None), func.jsonb_typeof(value).in_(types))]
+    for depth in range(1, len(tokens)):
+        parent = _get_path(document, tokens[:depth])
+        conditions.append(or_(parent.is_(None), func.jsonb_typeof(parent) == "object"))
+    return and_(*conditions)
+
+def merge_patch_expr(column, patch: Dict[str, Any], tokens: Optional[List[str]] = None):
+    """JSONB expression applying an RFC 7386 merge patch to `column` at `tokens`
+
+    Null members delete keys, object members merge recursively and anything
+    else replaces the existing value.
+    """
+    if not isinstance(patch, dict):
+        raise PatchError("Merge patch must be a JSON object")
+
+    tokens = tokens or []
+    # Non-object targets are treated as {} (RFC 7386 section 2)
+    expr = _object_or_empty(_get_path(column, tokens)) if tokens else column
+
+    deleted = [key for key, value in patch.items() if value is None]
+    if deleted:
+        expr = expr.op("-", return_type=JSONB)(_path(deleted))
+
+    replaced = {
+        key: value for key, value in patch.items()
+        if value is not None and not isinstance(value, dict)
+    }
+    if replaced:
+        expr = expr.op("||", return_type=JSONB)(_jsonb(replaced))
+
+    for key, value in patch.items():
+        if isinstance(value, dict):
+            nested = merge_patch_expr(column, value, tokens + [key])
+            expr = func.jsonb_set(expr, _path([key]), nested, True, type_=JSONB)
+
+    return expr
+
+def _exists(document, tokens: List[str]):
+    """Condition: `document` has a value (possibly JSON null) at `tokens`"""
+    return _get_path(document, tokens).isnot(None)
+
+def _add(document, tokens: List[str], value) -> Tuple[Any, Optional[Any]]:
+    """RFC 6902 "add" of the JSONB expression `value` at `tokens`, as (new_document_expr, condition)
+
+    Arrays insert before the index ("-" appends), objects set the member; the
+    target's parent must exist (the document root always does).
+    """
+    parent = tokens[:-1]
+    if tokens[-1] == "-":
+        # Append to the end of an array
+        appended = _get_path(document, parent).op("||", return_type=JSONB)(
+            func.jsonb_build_array(value, type_=JSONB)
+        )
+        return (
+            func.jsonb_set(document, _path(parent), appended, False, type_=JSONB),
+            func.jsonb_typeof(_get_path(document, parent)) == "array"
+        )
+    return case(
+        (
+            func.jsonb_typeof(_get_path(document, parent)) == "array",
+            func.jsonb_insert(document, _path(tokens), value, type_=JSONB)
+        ),
+        else_=func.jsonb_set(document, _path(tokens), value, True, type_=JSONB)
+    ), _exists(document, parent) if parent else None
+
+def json_patch_step(document, operation: Dict[str, Any]) -> Tuple[Any, Optional[Any]]:
+    """Compile one RFC 6902 operation against `document`
+
+    Returns (new_document_expr, condition). `condition` must hold for the patch
+    to be applied: "test" operations compare values, and the other operations
+    require the locations they read or write into to exist (RFC 6902 section 4).
+    """
+    if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+        raise PatchError(f"Invalid JSON Patch operation: {operation!r}")
+
+    op = operation["op"]
+    tokens = parse_pointer(operation["path"])
+
+    if op in ("add", "replace", "test") and "value" not in operation:
+        raise PatchError(f"'{op}' operation requires a value")
+    if op in ("move", "copy") and "from" not in operation:
+        raise PatchError(f"'{op}' operation requires 'from'")
+
+    if op == "add":
+        return _add(document, tokens, _jsonb(operation["value"]))
+
+    if op == "remove":
+        return document.op("#-", return_type=JSONB)(_path(tokens)), _exists(document, tokens)
+
+    if op == "replace":
+        return (
+            func.jsonb_set(document, _path(tokens), _jsonb(operation["value"]), False, type_=JSONB),
+            _exists(document, tokens)
+        )
+
+    if op in ("move", "copy"):
+        # Remove (for move) from "from", then "add" the value at "path" (RFC 6902 4.4, 4.5)
+        source = parse_pointer(operation["from"])
+        value = _get_path(document, source)
+        target = document.op("#-", return_type=JSONB)(_path(source)) if op == "move" else document
+        new_document, condition = _add(target, tokens, value)
+        source_exists = _exists(document, source)
+        return new_document, source_exists if condition is None else and_(source_exists, condition)
+
+    if op == "test":
+        return document, _get_path(document, tokens) == _jsonb(operation["value"])
+
+    raise PatchError(f"Unsupported JSON Patch operation: {op!r}")
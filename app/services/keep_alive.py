@@ -1,7 +1,9 @@
 import asyncio
 import aiohttp
 import logging
+import time
 from app.core.config import settings
+from app.core.metrics import keep_alive_pings, keep_alive_ping_duration
 
 logger = logging.getLogger(__name__)
 
@@ -16,14 +18,19 @@ class KeepAliveService:
     
     async def ping_server(self):
         """Ping the server to keep it alive"""
+        start = time.perf_counter()
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.get(self.ping_url, timeout=3) as response:
+                    keep_alive_ping_duration.observe(time.perf_counter() - start)
                     if response.status == 200:
+                        keep_alive_pings.inc(result="success")
                         print(f"✅ Keep-alive ping successful: {response.status} at {asyncio.get_event_loop().time()}")
                     else:
+                        keep_alive_pings.inc(result="bad_status")
                         print(f"⚠️ Keep-alive ping returned: {response.status}")
         except Exception as e:
+            keep_alive_pings.inc(result="error")
             print(f"❌ Keep-alive ping failed: {e}")
     
     async def start_keep_alive(self):
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from app.core.config import settings
+
+PRIMARY = "primary"
+SECONDARY = "secondary"
+
+class ReadHedger:
+    """Races a slow primary read against a secondary one (hedged requests).
+
+    The primary (PostgreSQL) read starts immediately. If it hasn't answered
+    within a high percentile of recent primary latencies (p95 by default), the secondary (Firebase) read
+    is fired in parallel and the first useful answer wins. A secondary answer of
+    None is not useful and never wins.
+
+    A losing secondary is cancelled. A losing primary is left to finish in the
+    background: cancelling a query midway can leave its connection mid-protocol,
+    so the primary must not use a session anything else will reuse.
+    """
+    def __init__(self, enabled: bool, percentile: float, default_delay: float,
+                 min_delay: float, window: int, min_samples: int = 20):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies: deque = deque(maxlen=window)
+        self._delay = default_delay
+        self._samples_since_update = 0
+        # Primaries that lost the race and are still running
+        self._background: Set[asyncio.Task] = set()
+
+        # Counters
+        self.reads = 0
+        self.hedged = 0
+        self.primary_wins = 0
+        self.secondary_wins = 0
+
+    @property
+    def delay(self) -> float:
+        """Seconds to wait for the primary before hedging"""
+        return self._delay
+
+    def record(self, seconds: float):
+        """Record a primary read latency, refreshing the hedge delay every few samples"""
+        self._latencies.append(seconds)
+        self._samples_since_update += 1
+        if len(self._latencies) >= self.min_samples and self._samples_since_update >= self.min_samples:
+            ordered = sorted(self._latencies)
+            index = min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)
+            self._delay = max(ordered[index], self.min_delay)
+            self._samples_since_update = 0
+
+    async def race(self, primary: Awaitable[Any],
+                   secondary: Callable[[], Awaitable[Any]]) -> Tuple[str, Any]:
+        """Return (PRIMARY, result) or (SECONDARY, result) for whichever answered first
+
+        Primary errors are re-raised unless the secondary was already in flight,
+        in which case its result is returned instead (possibly None).
+        """
+        self.reads += 1
+        started = time.perf_counter()
+        primary_task = asyncio.ensure_future(primary)
+        secondary_task: Optional[asyncio.Task] = None
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=self._delay)
+            if not done:
+                # Primary is slower than usual: hedge with the secondary
+                self.hedged += 1
+                secondary_task = asyncio.ensure_future(secondary())
+                pending = {primary_task, secondary_task}
+                while pending:
+                    _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    if primary_task.done() and not primary_task.exception():
+                        break
+                    if secondary_task.done():
+                        secondary_result = self._result_or_none(secondary_task)
+                        if secondary_result or primary_task.done():
+                            self.secondary_wins += 1
+                            return SECONDARY, secondary_result
+
+            result = primary_task.result()
+            self.record(time.perf_counter() - started)
+            self.primary_wins += 1
+            return PRIMARY, result
+        finally:
+            if secondary_task and not secondary_task.done():
+                secondary_task.cancel()
+            if not primary_task.done():
+                self._background.add(primary_task)
+                primary_task.add_done_callback(lambda task: self._finish_background(task, started))
+
+    def _finish_background(self, task: asyncio.Task, started: float):
+        """Record the full latency of a primary that lost the race"""
+        self._background.discard(task)
+        if not task.cancelled() and not task.exception():
+            self.record(time.perf_counter() - started)
+
+    @staticmethod
+    def _result_or_none(task: asyncio.Task) -> Any:
+        """A failed secondary read counts as no answer"""
+        if task.exception():
+            print(f"⚠️ Hedged read error: {task.exception()}")
+            return None
+        return task.result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "delay_ms": round(self._delay * 1000, 2),
+            "samples": len(self._latencies),
+            "reads": self.reads,
+            "hedged": self.hedged,
+            "primary_wins": self.primary_wins,
+            "secondary_wins": self.secondary_wins,
+            "background_primaries": len(self._background)
+        }
+
+# Global instance
+read_hedger = ReadHedger(
+    enabled=settings.READ_HEDGING_ENABLED,
+    percentile=settings.READ_HEDGE_PERCENTILE,
+    default_delay=settings.READ_HEDGE_DEFAULT_DELAY,
+    min_delay=settings.READ_HEDGE_MIN_DELAY,
+    window=settings.READ_HEDGE_WINDOW
+)
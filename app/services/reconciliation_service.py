@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, func, cast, case, literal_column, Text
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from app.core.database import AsyncSessionLocal
+from app.models.app_model import App
+from app.models.data_model import DataStore
+from app.models.replication_model import ReplicationOutbox
+from app.services.firebase_service import firebase_service, digest_bucket, DIGEST_BUCKET_CHARS
+from app.services.replication_service import replication_worker
+from app.services.write_queue import write_queue
+
+# Keys listed per category in a report (counts are always complete)
+REPORT_KEY_LIMIT = 100
+
+def _hash_leaves(leaves: Dict[str, str]) -> str:
+    """Bucket hash over sorted "key:digest" leaves; must match postgres_bucket_hashes"""
+    joined = ",".join(f"{data_key}:{leaves[data_key]}" for data_key in sorted(leaves))
+    return hashlib.md5(joined.encode("utf-8")).hexdigest()
+
+def _hash_children(hashes: Dict[str, str]) -> str:
+    joined = ",".join(f"{name}:{hashes[name]}" for name in sorted(hashes))
+    return hashlib.md5(joined.encode("utf-8")).hexdigest()
+
+def build_tree(bucket_hashes: Dict[str, str]) -> Dict[str, Any]:
+    """Two-level hash tree: root -> 16 key ranges (first hex char) -> buckets"""
+    ranges: Dict[str, Dict[str, str]] = {}
+    for bucket, bucket_hash in bucket_hashes.items():
+        ranges.setdefault(bucket[0], {})[bucket] = bucket_hash
+    range_hashes = {name: _hash_children(buckets) for name, buckets in ranges.items()}
+    return {"root": _hash_children(range_hashes), "ranges": range_hashes, "buckets": ranges}
+
+def diff_trees(source: Dict[str, Any], replica: Dict[str, Any]) -> List[str]:
+    """Buckets whose hashes differ, descending only into ranges that differ"""
+    if source["root"] == replica["root"]:
+        return []
+    divergent = []
+    for name in set(source["ranges"]) | set(replica["ranges"]):
+        if source["ranges"].get(name) == replica["ranges"].get(name):
+            continue
+        source_buckets = source["buckets"].get(name, {})
+        replica_buckets = replica["buckets"].get(name, {})
+        divergent.extend(
+            bucket for bucket in set(source_buckets) | set(replica_buckets)
+            if source_buckets.get(bucket) != replica_buckets.get(bucket)
+        )
+    return sorted(divergent)
+
+class ReconciliationService:
+    """Finds and repairs keys where Firebase no longer matches PostgreSQL.
+
+    Both sides are summarised as a hash tree per app: keys are bucketed by
+    md5(data_key) and each bucket hashes its "key:md5(value)" leaves. PostgreSQL
+    computes bucket hashes in SQL; Firebase keeps them cached at
+    apps/{app_id}/bucket_hashes, next to the content digests replication writes
+    for each key, so a run starts with one small read per side and neither
+    side's values are downloaded. Only divergent buckets are expanded to
+    leaves (one digest read per bucket), and only differing keys are repaired
+    (PostgreSQL wins) by queueing them in replication_outbox: the replication
+    worker then pushes or deletes them under its claim like any other write, so
+    a repair never races a drain of the same key.
+
+    Every Firebase write replaces its bucket's cached hash with a unique dirty
+    marker. Expanding a bucket stores the hash of what was read, conditional
+    on the marker's ETag, so a write racing the read leaves the bucket dirty
+    rather than caching a stale hash. Dry runs refresh these cached hashes too:
+    they describe Firebase's contents, not whether it matches PostgreSQL.
+    """
+    def _bucket_expr(self):
+        # Inlined so SELECT and GROUP BY render the identical expression
+        return func.substr(func.md5(DataStore.data_key), literal_column("1"), literal_column(str(DIGEST_BUCKET_CHARS)))
+
+    def _leaf_expr(self):
+        return func.md5(cast(DataStore.data_value, Text))
+
+    async def postgres_bucket_hashes(self, db, app_id: str) -> Dict[str, str]:
+        """{bucket: hash} computed in PostgreSQL"""
+        bucket = self._bucket_expr()
+        leaf = DataStore.data_key + ":" + self._leaf_expr()
+        bucket_hash = func.md5(
+            func.string_agg(leaf, aggregate_order_by(literal_column("','"), DataStore.data_key.collate("C")))
+        )
+        result = await db.execute(
+            select(bucket, bucket_hash)
+            .where(DataStore.app_id == uuid.UUID(app_id))
+            .group_by(bucket)
+        )
+        return {row[0]: row[1] for row in result.all()}
+
+    async def postgres_leaves(self, db, app_id: str, buckets: List[str]) -> Dict[str, str]:
+        """{data_key: digest} for keys in the given buckets"""
+        result = await db.execute(
+            select(DataStore.data_key, self._leaf_expr())
+            .where(DataStore.app_id == uuid.UUID(app_id), self._bucket_expr().in_(buckets))
+        )
+        return {row[0]: row[1] for row in result.all()}
+
+    async def firebase_bucket_leaves(self, app_id: str, bucket: str) -> Tuple[Dict[str, str], bool]:
+        """{data_key: digest} for one bucket in Firebase, refreshing its cached hash
+
+        Returns (leaves, refreshed).
+        """
+        cached, etag = await firebase_service.get_bucket_hash(app_id, bucket)
+        leaves = await firebase_service.get_bucket_digests(app_id, bucket)
+        bucket_hash = _hash_leaves(leaves) if leaves else None
+        if bucket_hash == cached:
+            return leaves, False
+        return leaves, await firebase_service.set_bucket_hash(app_id, bucket, bucket_hash, etag)
+
+    async def reconcile_app(self, app_id: str, dry_run: bool = True) -> Dict[str, Any]:
+        """Compare one app and repair differing keys unless dry_run"""
+        async with AsyncSessionLocal() as db:
+            postgres_tree = build_tree(await self.postgres_bucket_hashes(db, app_id))
+            firebase_tree = build_tree(await firebase_service.get_bucket_hashes(app_id))
+
+            divergent = diff_trees(postgres_tree, firebase_tree)
+            expanded = await asyncio.gather(*(
+                self.firebase_bucket_leaves(app_id, bucket) for bucket in divergent
+            ))
+            firebase_buckets = {bucket: leaves for bucket, (leaves, _) in zip(divergent, expanded)}
+            postgres_leaves = await self.postgres_leaves(db, app_id, divergent) if divergent else {}
+
+            missing, mismatched, extra = [], [], []
+            for bucket in divergent:
+                firebase_bucket = firebase_buckets[bucket]
+                postgres_bucket = {
+                    data_key: digest for data_key, digest in postgres_leaves.items()
+                    if digest_bucket(data_key) == bucket
+                }
+                for data_key, digest in postgres_bucket.items():
+                    if data_key not in firebase_bucket:
+                        missing.append(data_key)
+                    elif firebase_bucket[data_key] != digest:
+                        mismatched.append(data_key)
+                extra.extend(data_key for data_key in firebase_bucket if data_key not in postgres_bucket)
+
+            repairs_queued = 0
+            if not dry_run and (missing or mismatched or extra):
+                repairs_queued = await self._repair(db, app_id, missing + mismatched + extra)
+
+        return {
+            "app_id": app_id,
+            "dry_run": dry_run,
+            # Divergent buckets can be dirty markers over identical contents
+            "in_sync": not (missing or mismatched or extra),
+            "postgres_root": postgres_tree["root"],
+            "firebase_root": firebase_tree["root"],
+            "divergent_buckets": len(divergent),
+            "firebase_keys_checked": sum(len(leaves) for leaves in firebase_buckets.values()),
+            "bucket_hashes_refreshed": sum(1 for _, refreshed in expanded if refreshed),
+            "missing_in_firebase": len(missing),
+            "mismatched": len(mismatched),
+            "extra_in_firebase": len(extra),
+            "repairs_queued": repairs_queued,
+            "keys": {
+                "missing_in_firebase": sorted(missing)[:REPORT_KEY_LIMIT],
+                "mismatched": sorted(mismatched)[:REPORT_KEY_LIMIT],
+                "extra_in_firebase": sorted(extra)[:REPORT_KEY_LIMIT]
+            }
+        }
+
+    async def _repair(self, db, app_id: str, data_keys: List[str]) -> int:
+        """Queue keys for replication, which pushes their current PostgreSQL value
+        (or deletes them from Firebase when PostgreSQL has no row)
+
+        Same upsert as the data_store_replication trigger: a claimed key keeps its
+        claim, and its drain finds the new enqueued_at and queues it again.
+        """
+        now = datetime.utcnow()
+        for offset in range(0, len(data_keys), 500):
+            stmt = pg_insert(ReplicationOutbox).values([
+                {
+                    "app_id": uuid.UUID(app_id),
+                    "data_key": data_key,
+                    "enqueued_at": now,
+                    "attempts": 0,
+                    "next_attempt_at": now
+                }
+                for data_key in data_keys[offset:offset + 500]
+            ])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[ReplicationOutbox.app_id, ReplicationOutbox.data_key],
+                set_={
+                    "enqueued_at": stmt.excluded.enqueued_at,
+                    "attempts": 0,
+                    "next_attempt_at": case(
+                        (ReplicationOutbox.claim_id.is_(None), stmt.excluded.next_attempt_at),
+                        else_=ReplicationOutbox.next_attempt_at
+                    )
+                }
+            ))
+        await db.commit()
+        replication_worker.notify()
+        print(f"✅ Reconciled app {app_id}: {len(data_keys)} keys queued for replication to Firebase")
+        return len(data_keys)
+    
+    async def reconcile_all(self, dry_run: bool = True, app_id: Optional[str] = None) -> Dict[str, Any]:
+        """Reconcile one app, or every app in PostgreSQL"""
+        if not firebase_service.is_initialized:
+            raise RuntimeError("Firebase is not initialized")
+        if write_queue.pending and not dry_run:
+            # Firebase holds writes PostgreSQL hasn't replayed yet; repairing would revert them
+            raise RuntimeError(f"{len(write_queue.pending)} queued writes not yet replayed to PostgreSQL")
+
+        if app_id:
+            app_ids = [app_id]
+        else:
+            async with AsyncSessionLocal() as db:
+                app_ids = [str(row[0]) for row in (await db.execute(select(App.id))).all()]
+
+        reports = []
+        for current_app_id in app_ids:
+            try:
+                reports.append(await self.reconcile_app(current_app_id, dry_run))
+            except Exception as e:
+                print(f"⚠️ Reconciliation failed for app {current_app_id}: {e}")
+                reports.append({"app_id": current_app_id, "error": str(e)})
+
+        return {
+            "dry_run": dry_run,
+            "apps": len(reports),
+            "in_sync": sum(1 for report in reports if report.get("in_sync")),
+            "reports": reports
+        }
+
+# Global instance
+reconciliation_service = ReconciliationService()
@@ -0,0 +1,345 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, delete, update, func, tuple_, cast, Text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.data_model import DataStore
+from app.models.replication_model import ReplicationOutbox, ReplicationDeadLetter
+from app.services.firebase_service import firebase_service, FirebaseError
+
+# Dead-lettered keys listed in the stats (the count is always complete)
+DEAD_LETTER_REPORT_LIMIT = 20
+
+class ReplicationWorker:
+    """Drains replication_outbox into Firebase off the request path.
+    
+    The outbox holds one row per changed key (written by a trigger in the same
+    transaction as the data write). Each drain claims a batch of due keys with
+    their *current* PostgreSQL value and commits, then flushes them as one
+    multi-location Firebase update per app (deleted keys written as null), so
+    repeated writes to a key are coalesced into one push and no transaction is
+    held open across network calls. A rejected update is retried key by key to
+    isolate bad keys. Pushed keys are then removed; failed keys back off
+    exponentially and move to replication_dead_letters after
+    REPLICATION_MAX_ATTEMPTS failures.
+    """
+    def __init__(self):
+        self.enabled = settings.REPLICATION_ENABLED
+        self.batch_size = settings.REPLICATION_BATCH_SIZE
+        self.poll_interval = settings.REPLICATION_POLL_INTERVAL
+        self.batch_window = settings.REPLICATION_BATCH_WINDOW
+        self.retry_delay = settings.REPLICATION_RETRY_DELAY
+        self.max_retry_delay = settings.REPLICATION_MAX_RETRY_DELAY
+        self.max_attempts = settings.REPLICATION_MAX_ATTEMPTS
+        self.claim_timeout = settings.REPLICATION_CLAIM_TIMEOUT
+        self.is_running = False
+        self.task = None
+        self._wakeup = asyncio.Event()
+        
+        # Counters
+        self.pushed = 0
+        self.deleted = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.firebase_calls = 0
+        self.last_error: Optional[str] = None
+        self.last_drain_at: Optional[float] = None
+    
+    def notify(self):
+        """Wake the worker after a write instead of waiting for the next poll"""
+        self._wakeup.set()
+    
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait before retrying a key that has failed `attempts` times"""
+        return min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+    
+    async def drain_once(self) -> int:
+        """Replicate one batch of due outbox keys, returning how many were processed
+        
+        Raises when every key in the batch failed (Firebase is likely down).
+        """
+        claim_id = uuid.uuid4()
+        rows = await self._claim(claim_id)
+        if not rows:
+            return 0
+        
+        failed = await self.push(rows)
+        await self._release(claim_id, rows, failed)
+        
+        self.last_drain_at = time.time()
+        if failed:
+            self.last_error = next(iter(failed.values()))
+            if len(failed) == len(rows):
+                raise RuntimeError(f"{len(failed)} keys failed to replicate: {self.last_error}")
+        return len(rows)
+    
+    async def _claim(self, claim_id: uuid.UUID) -> List[Any]:
+        """Claim a batch of due keys with their current value (NULL data_value means deleted)
+        
+        SKIP LOCKED lets several worker processes claim disjoint batches; the claim
+        pushes next_attempt_at past the claim timeout, so the keys stay ours after commit.
+        """
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            stmt = select(
+                ReplicationOutbox.app_id,
+                ReplicationOutbox.data_key,
+                ReplicationOutbox.enqueued_at,
+                ReplicationOutbox.attempts,
+                DataStore.data_value,
+                func.md5(cast(DataStore.data_value, Text)).label("digest")
+            ).outerjoin(
+                DataStore,
+                (DataStore.app_id == ReplicationOutbox.app_id) & (DataStore.data_key == ReplicationOutbox.data_key)
+            ).where(
+                ReplicationOutbox.next_attempt_at <= now
+            ).order_by(
+                ReplicationOutbox.next_attempt_at
+            ).limit(self.batch_size).with_for_update(of=ReplicationOutbox, skip_locked=True)
+            rows = (await db.execute(stmt)).all()
+            
+            if rows:
+                await db.execute(
+                    update(ReplicationOutbox).where(
+                        tuple_(ReplicationOutbox.app_id, ReplicationOutbox.data_key).in_(
+                            [(row.app_id, row.data_key) for row in rows]
+                        )
+                    ).values(claim_id=claim_id, next_attempt_at=now + timedelta(seconds=self.claim_timeout))
+                )
+            await db.commit()
+        return rows
+    
+    async def push(self, rows: List[Any]) -> Dict[Tuple[Any, str], str]:
+        """Push claimed rows to Firebase, one multi-location update per app
+        
+        Returns {(app_id, data_key): error} for the keys that failed.
+        """
+        by_app: Dict[Any, Dict[str, Any]] = {}
+        for row in rows:
+            by_app.setdefault(row.app_id, {})[row.data_key] = row
+        
+        failed: Dict[Tuple[Any, str], str] = {}
+        for app_id, app_rows in by_app.items():
+            changes = {key: row.data_value for key, row in app_rows.items()}
+            digests = {key: row.digest for key, row in app_rows.items()}
+            for key, error in (await self._replicate(str(app_id), changes, digests)).items():
+                failed[(app_id, key)] = error
+        return failed
+    
+    async def _release(self, claim_id: uuid.UUID, rows: List[Any], failed: Dict[Tuple[Any, str], str]):
+        """Remove pushed keys, schedule retries or dead-letter failed keys, and release the claim
+        
+        Statements match on enqueued_at, so keys rewritten during the push are kept
+        and become due again right away.
+        """
+        now = datetime.utcnow()
+        outbox_row = tuple_(ReplicationOutbox.app_id, ReplicationOutbox.data_key, ReplicationOutbox.enqueued_at)
+        ours = ReplicationOutbox.claim_id == claim_id
+        done = [row for row in rows if (row.app_id, row.data_key) not in failed]
+        failed_rows = [row for row in rows if (row.app_id, row.data_key) in failed]
+        retry = [row for row in failed_rows if row.attempts + 1 < self.max_attempts]
+        dead = [row for row in failed_rows if row.attempts + 1 >= self.max_attempts]
+        
+        async with AsyncSessionLocal() as db:
+            if done:
+                await db.execute(delete(ReplicationOutbox).where(
+                    outbox_row.in_([(row.app_id, row.data_key, row.enqueued_at) for row in done]), ours
+                ))
+                # A key that replicates again is no longer dead
+                await db.execute(delete(ReplicationDeadLetter).where(
+                    tuple_(ReplicationDeadLetter.app_id, ReplicationDeadLetter.data_key).in_(
+                        [(row.app_id, row.data_key) for row in done]
+                    )
+                ))
+            
+            # One UPDATE per attempt count, since that decides the backoff
+            retry.sort(key=lambda row: row.attempts)
+            for attempts, group in groupby(retry, key=lambda row: row.attempts):
+                await db.execute(update(ReplicationOutbox).where(
+                    outbox_row.in_([(row.app_id, row.data_key, row.enqueued_at) for row in group]), ours
+                ).values(
+                    attempts=attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=self.backoff(attempts + 1)),
+                    claim_id=None
+                ))
+            
+            if dead:
+                result = await db.execute(delete(ReplicationOutbox).where(
+                    outbox_row.in_([(row.app_id, row.data_key, row.enqueued_at) for row in dead]), ours
+                ).returning(ReplicationOutbox.app_id, ReplicationOutbox.data_key, ReplicationOutbox.enqueued_at))
+                dead_rows = [
+                    {
+                        "app_id": row.app_id,
+                        "data_key": row.data_key,
+                        "enqueued_at": row.enqueued_at,
+                        "attempts": self.max_attempts,
+                        "last_error": failed[(row.app_id, row.data_key)],
+                        "failed_at": now
+                    }
+                    for row in result.all()
+                ]
+                if dead_rows:
+                    stmt = pg_insert(ReplicationDeadLetter).values(dead_rows)
+                    await db.execute(stmt.on_conflict_do_update(
+                        index_elements=[ReplicationDeadLetter.app_id, ReplicationDeadLetter.data_key],
+                        set_={
+                            "enqueued_at": stmt.excluded.enqueued_at,
+                            "attempts": stmt.excluded.attempts,
+                            "last_error": stmt.excluded.last_error,
+                            "failed_at": stmt.excluded.failed_at
+                        }
+                    ))
+                    self.dead_lettered += len(dead_rows)
+                    print(f"☠️ {len(dead_rows)} keys dead-lettered after {self.max_attempts} failed attempts")
+            
+            # Whatever is still claimed was rewritten meanwhile: due now, with its new value
+            await db.execute(update(ReplicationOutbox).where(ours).values(claim_id=None, next_attempt_at=now))
+            await db.commit()
+    
+    async def _replicate(self, app_id: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                         digests: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """Push one app's changes (and their content digests) to Firebase
+        
+        Returns {data_key: error} for the keys that failed. When Firebase rejects the
+        update itself (HTTP 400: a key with . # $ [ ] or conflicting paths) the keys
+        are retried one at a time, so one bad key doesn't hold back the others.
+        """
+        try:
+            await self._update(app_id, changes, digests)
+            return {}
+        except FirebaseError as e:
+            if e.status != 400 or len(changes) == 1:
+                return {data_key: str(e) for data_key in changes}
+            print(f"⚠️ Firebase rejected a batch of {len(changes)} keys for app {app_id}, retrying them one by one")
+        except Exception as e:
+            return {data_key: str(e) for data_key in changes}
+        
+        failed: Dict[str, str] = {}
+        remaining = list(changes)
+        while remaining:
+            data_key = remaining.pop(0)
+            try:
+                await self._update(app_id, {data_key: changes[data_key]}, {data_key: digests.get(data_key)})
+            except FirebaseError as e:
+                failed[data_key] = str(e)
+                if e.status != 400:
+                    # Not this key's fault: leave the rest for the next attempt
+                    failed.update({key: str(e) for key in remaining})
+                    break
+            except Exception as e:
+                failed[data_key] = str(e)
+                failed.update({key: str(e) for key in remaining})
+                break
+        return failed
+    
+    async def _update(self, app_id: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                      digests: Dict[str, Optional[str]]):
+        """One multi-location update, counted; raises on errors"""
+        self.firebase_calls += 1
+        deletes = sum(1 for value in changes.values() if value is None)
+        try:
+            await firebase_service.update_batch(app_id, changes, digests)
+        except Exception:
+            self.failed += len(changes)
+            raise
+        self.pushed += len(changes) - deletes
+        self.deleted += deletes
+    
+    async def run(self):
+        """Drain the outbox until stopped"""
+        self.is_running = True
+        print(f"🔄 Starting Firebase replication worker (batch {self.batch_size}, poll {self.poll_interval}s)")
+        
+        while self.is_running:
+            self._wakeup.clear()
+            try:
+                # Let a burst of writes accumulate so it flushes as one update
+                await asyncio.sleep(self.batch_window)
+                processed = await self.drain_once()
+                if processed >= self.batch_size:
+                    continue  # more work is waiting
+                delay = self.poll_interval
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ Replication error, retrying in {self.retry_delay}s: {e}")
+                delay = self.retry_delay
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, replication lag, retries and dead letters"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(
+                func.count(),
+                func.min(ReplicationOutbox.enqueued_at),
+                func.count().filter(ReplicationOutbox.attempts > 0)
+            ))
+            depth, oldest, retrying = result.one()
+            
+            result = await db.execute(select(func.count()).select_from(ReplicationDeadLetter))
+            dead_letters = result.scalar()
+            result = await db.execute(
+                select(ReplicationDeadLetter)
+                .order_by(ReplicationDeadLetter.failed_at.desc())
+                .limit(DEAD_LETTER_REPORT_LIMIT)
+            )
+            recent_dead_letters = [
+                {
+                    "app_id": str(entry.app_id),
+                    "data_key": entry.data_key,
+                    "attempts": entry.attempts,
+                    "last_error": entry.last_error,
+                    "failed_at": entry.failed_at.isoformat()
+                }
+                for entry in result.scalars().all()
+            ]
+        
+        lag_seconds = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+        return {
+            "enabled": self.enabled,
+            "running": self.is_running,
+            "queue_depth": depth,
+            "retrying": retrying,
+            "lag_seconds": round(max(lag_seconds, 0.0), 3),
+            "pushed": self.pushed,
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+            "firebase_calls": self.firebase_calls,
+            "max_attempts": self.max_attempts,
+            "dead_letters": dead_letters,
+            "recent_dead_letters": recent_dead_letters,
+            "last_error": self.last_error,
+            "last_drain_at": self.last_drain_at
+        }
+    
+    def start(self):
+        """Start the worker as a background task"""
+        if not self.enabled:
+            print("⚠️ Firebase replication worker is disabled")
+            return
+        if not firebase_service.is_initialized:
+            print("⚠️ Firebase not initialized, changes stay queued in replication_outbox")
+            return
+        
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run())
+            print("🚀 Firebase replication worker started")
+    
+    def stop(self):
+        """Stop the worker"""
+        self.is_running = False
+        if self.task and not self.task.done():
+            self.task.cancel()
+            print("⏹️ Firebase replication worker stopped")
+
+# Global instance
+replication_worker = ReplicationWorker()
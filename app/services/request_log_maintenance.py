@@ -0,0 +1,248 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import settings
+from app.core.database import async_engine
+
+# pg_try_advisory_xact_lock key, so only one worker process maintains request_logs at a time
+REQUEST_LOG_MAINTENANCE_LOCK_ID = 724012
+
+PARTITION_PREFIX = "request_logs_p"
+
+# Catches rows for days without a partition (e.g. maintenance stopped for longer than
+# REQUEST_LOG_PARTITIONS_AHEAD), so writer batches never fail with "no partition found"
+DEFAULT_PARTITION = "request_logs_default"
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+async def list_partitions(conn: AsyncConnection) -> List[date]:
+    """Days that have a request_logs partition, oldest first"""
+    result = await conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'request_logs'::regclass
+    """))
+    days = []
+    for name in result.scalars():
+        if name.startswith(PARTITION_PREFIX):
+            days.append(datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date())
+    return sorted(days)
+
+async def _relation_exists(conn: AsyncConnection, name: str) -> bool:
+    result = await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})
+    return result.scalar() is not None
+
+async def create_default_partition(conn: AsyncConnection):
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF request_logs DEFAULT"))
+
+async def create_partition(conn: AsyncConnection, day: date):
+    """Create the partition for `day`, moving any of its rows out of the DEFAULT partition
+    (a new partition can't be added while the DEFAULT partition holds rows in its range)"""
+    # Names and bounds come from dates, so inlining them is safe
+    name = partition_name(day)
+    bounds = f"FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+    range_sql = "timestamp >= :start AND timestamp < :end"
+    params = {"start": day, "end": day + timedelta(days=1)}
+    
+    stranded = False
+    if await _relation_exists(conn, DEFAULT_PARTITION):
+        result = await conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {range_sql})"), params)
+        stranded = result.scalar()
+    if not stranded:
+        await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF request_logs FOR VALUES {bounds}"))
+        return
+    
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE request_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    result = await conn.execute(text(f"""
+        WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {range_sql} RETURNING *)
+        INSERT INTO {name} SELECT * FROM moved
+    """), params)
+    await conn.execute(text(f"ALTER TABLE request_logs ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    print(f"🗄️ Moved {result.rowcount} request logs from {DEFAULT_PARTITION} into {name}")
+
+async def create_partitions(conn: AsyncConnection, first_day: date, last_day: date) -> int:
+    """Create the daily partitions from first_day to last_day (inclusive) that don't exist yet"""
+    existing = set(await list_partitions(conn))
+    created = 0
+    day = first_day
+    while day <= last_day:
+        if day not in existing:
+            await create_partition(conn, day)
+            created += 1
+        day += timedelta(days=1)
+    return created
+
+# Rebuilds the rollups of every hour in [start, end) from the raw logs; each logged
+# row stands for 1 / sample_rate requests
+ROLLUP_SQL = text("""
+    INSERT INTO request_log_rollups (
+        hour, app_id, endpoint, method, status_code, request_count, duration_avg_ms,
+        duration_p50_ms, duration_p95_ms, duration_p99_ms, duration_max_ms
+    )
+    SELECT
+        date_trunc('hour', timestamp), app_id, endpoint, method, status_code,
+        round(sum(1.0 / coalesce(NULLIF(sample_rate, 0), 1))),
+        avg(duration_ms),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms),
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms),
+        percentile_cont(0.99) WITHIN GROUP (ORDER BY duration_ms),
+        max(duration_ms)
+    FROM request_logs
+    WHERE timestamp >= :start AND timestamp < :end
+    GROUP BY 1, 2, 3, 4, 5
+""")
+
+class RequestLogMaintenance:
+    """Keeps request_logs partitioned, bounded and summarised.
+
+    Every REQUEST_LOG_MAINTENANCE_INTERVAL seconds it creates the daily partitions
+    for the next REQUEST_LOG_PARTITIONS_AHEAD days, drops partitions older than
+    REQUEST_LOG_RETENTION_DAYS (and expired rows in the DEFAULT partition) and rebuilds the hourly rollups from the last
+    rolled-up hour onwards. The previous hour is always rebuilt once more, for
+    logs that were still buffered when it ended.
+    """
+    def __init__(self):
+        self.retention_days = settings.REQUEST_LOG_RETENTION_DAYS
+        self.partitions_ahead = settings.REQUEST_LOG_PARTITIONS_AHEAD
+        self.rollup_retention_days = settings.REQUEST_LOG_ROLLUP_RETENTION_DAYS
+        self.interval = settings.REQUEST_LOG_MAINTENANCE_INTERVAL
+        self.is_running = False
+        self.task = None
+
+        # Counters
+        self.runs = 0
+        self.partitions_created = 0
+        self.partitions_dropped = 0
+        self.default_rows = 0
+        self.rollup_rows = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_run_at: Optional[float] = None
+
+    async def _try_lock(self, conn: AsyncConnection) -> bool:
+        result = await conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": REQUEST_LOG_MAINTENANCE_LOCK_ID}
+        )
+        return result.scalar()
+
+    async def maintain_partitions(self):
+        """Create upcoming partitions and drop expired ones"""
+        today = datetime.utcnow().date()
+        cutoff = today - timedelta(days=self.retention_days)
+        async with async_engine.begin() as conn:
+            if not await self._try_lock(conn):
+                return
+
+            self.partitions_created += await create_partitions(
+                conn, today, today + timedelta(days=self.partitions_ahead)
+            )
+            for day in await list_partitions(conn):
+                if day < cutoff:
+                    result = await conn.execute(text(f"SELECT count(*) FROM {partition_name(day)}"))
+                    await conn.execute(
+                        text("SELECT table_counters_add('request_logs', :delta)"), {"delta": -result.scalar()}
+                    )
+                    await conn.execute(text(f"DROP TABLE IF EXISTS {partition_name(day)}"))
+                    self.partitions_dropped += 1
+                    print(f"🗑️ Dropped request log partition {partition_name(day)}")
+            
+            # Rows for days that had no partition when they were written
+            await create_default_partition(conn)
+            result = await conn.execute(
+                text(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < :cutoff"), {"cutoff": cutoff}
+            )
+            await conn.execute(
+                text("SELECT table_counters_add('request_logs', :delta)"), {"delta": -result.rowcount}
+            )
+            result = await conn.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}"))
+            self.default_rows = result.scalar()
+            if self.default_rows:
+                print(f"⚠️ {self.default_rows} request logs are in {DEFAULT_PARTITION} (days without a partition)")
+
+    async def rollup(self) -> int:
+        """Rebuild the hourly rollups that may have changed, returning the rows written"""
+        now = datetime.utcnow()
+        end = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        async with async_engine.begin() as conn:
+            if not await self._try_lock(conn):
+                return 0
+
+            result = await conn.execute(text("SELECT max(hour) FROM request_log_rollups"))
+            last_hour = result.scalar()
+            if last_hour is not None:
+                start = last_hour - timedelta(hours=1)
+            else:
+                # First run: everything still retained, starting at the oldest partition
+                partitions = await list_partitions(conn)
+                if not partitions:
+                    return 0
+                start = datetime.combine(partitions[0], datetime.min.time())
+
+            await conn.execute(
+                text("DELETE FROM request_log_rollups WHERE hour >= :start AND hour < :end"),
+                {"start": start, "end": end}
+            )
+            result = await conn.execute(ROLLUP_SQL, {"start": start, "end": end})
+            await conn.execute(
+                text("DELETE FROM request_log_rollups WHERE hour < :cutoff"),
+                {"cutoff": now - timedelta(days=self.rollup_retention_days)}
+            )
+
+        self.rollup_rows += result.rowcount
+        return result.rowcount
+
+    async def run_once(self):
+        await self.maintain_partitions()
+        await self.rollup()
+        self.runs += 1
+        self.last_run_at = time.time()
+
+    async def run(self):
+        """Maintain request_logs every `interval` seconds"""
+        self.is_running = True
+        print(f"🔄 Starting request log maintenance (every {self.interval}s, keeping {self.retention_days} days)")
+        while self.is_running:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"⚠️ Request log maintenance error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "retention_days": self.retention_days,
+            "rollup_retention_days": self.rollup_retention_days,
+            "runs": self.runs,
+            "partitions_created": self.partitions_created,
+            "partitions_dropped": self.partitions_dropped,
+            "default_rows": self.default_rows,
+            "rollup_rows": self.rollup_rows,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_run_at": self.last_run_at
+        }
+
+    def start(self):
+        """Start maintenance as a background task"""
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run())
+            print("🚀 Request log maintenance started")
+
+    def stop(self):
+        """Stop maintenance"""
+        self.is_running = False
+        if self.task and not self.task.done():
+            self.task.cancel()
+            print("⏹️ Request log maintenance stopped")
+
+# Global instance
+request_log_maintenance = RequestLogMaintenance()
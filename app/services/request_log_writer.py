@@ -0,0 +1,131 @@
+import asyncio
+import random
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+from sqlalchemy import insert, text
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.file_model import RequestLog
+
+class RequestLogWriter:
+    """Buffers request log rows in memory and writes them in bulk off the request path.
+
+    Rows are sampled (REQUEST_LOG_SAMPLE_RATE), held in a bounded buffer and
+    flushed with one multi-row INSERT every REQUEST_LOG_FLUSH_INTERVAL seconds,
+    or as soon as REQUEST_LOG_BATCH_SIZE rows are waiting. When the buffer is
+    full new rows are dropped and counted rather than slowing requests down.
+    """
+    def __init__(self):
+        self.sample_rate = settings.REQUEST_LOG_SAMPLE_RATE
+        self.buffer_size = settings.REQUEST_LOG_BUFFER_SIZE
+        self.batch_size = settings.REQUEST_LOG_BATCH_SIZE
+        self.flush_interval = settings.REQUEST_LOG_FLUSH_INTERVAL
+        self.buffer: Deque[Dict[str, Any]] = deque()
+        self.is_running = False
+        self.task = None
+        self._wakeup = asyncio.Event()
+
+        # Counters
+        self.logged = 0
+        self.written = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_error: Optional[str] = None
+
+    def log(self, app_id: Optional[str], endpoint: str, method: str, status_code: int, duration_ms: float):
+        """Queue one request log row (never blocks)"""
+        self.logged += 1
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        if len(self.buffer) >= self.buffer_size:
+            self.dropped += 1
+            return
+
+        self.buffer.append({
+            "id": uuid.uuid4(),
+            "app_id": uuid.UUID(app_id) if app_id else None,
+            "endpoint": endpoint,
+            "method": method,
+            "status_code": str(status_code),
+            "duration_ms": duration_ms,
+            "sample_rate": self.sample_rate,
+            "timestamp": datetime.utcnow()
+        })
+        if len(self.buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write up to one batch of buffered rows, returning how many were written"""
+        rows = [self.buffer.popleft() for _ in range(min(len(self.buffer), self.batch_size))]
+        if not rows:
+            return 0
+
+        try:
+            async with AsyncSessionLocal() as db:
+                # executemany is sent as multi-row INSERT ... VALUES statements
+                await db.execute(insert(RequestLog), rows)
+                # Keeps the admin /stats request count current (see TableCounter)
+                await db.execute(text("SELECT table_counters_add('request_logs', :delta)"), {"delta": len(rows)})
+                await db.commit()
+        except Exception as e:
+            # Logs are best effort: count the lost rows instead of retrying forever
+            self.failed += len(rows)
+            self.last_error = str(e)
+            print(f"⚠️ Request log flush error, {len(rows)} rows lost: {e}")
+            return 0
+
+        self.written += len(rows)
+        self.flushes += 1
+        return len(rows)
+
+    async def run(self):
+        """Flush on an interval, or early when a full batch is waiting"""
+        self.is_running = True
+        while self.is_running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self.buffer and await self.flush() >= self.batch_size:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "buffered": len(self.buffer),
+            "buffer_size": self.buffer_size,
+            "sample_rate": self.sample_rate,
+            "logged": self.logged,
+            "written": self.written,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_error": self.last_error
+        }
+
+    def start(self):
+        """Start the writer as a background task"""
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run())
+            print("🚀 Request log writer started")
+
+    async def stop(self):
+        """Stop the writer and flush what is still buffered"""
+        self.is_running = False
+        if self.task and not self.task.done():
+            # Let the loop finish the batch it is writing rather than cancelling it mid-INSERT
+            self._wakeup.set()
+            await self.task
+        while self.buffer and await self.flush():
+            pass
+        print("⏹️ Request log writer stopped")
+
+# Global instance
+request_log_writer = RequestLogWriter()
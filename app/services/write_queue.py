@@ -0,0 +1,162 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, postgres_circuit
+from app.services.async_postgres_service import AsyncPostgresService
+
+class PendingWrite(NamedTuple):
+    op: str  # "save", "update" or "delete"
+    app_id: str
+    data_key: str
+    data_value: Optional[Dict[str, Any]] = None
+
+# Writes that failed replay for good, kept for /admin/circuit/stats
+FAILED_WRITES_KEPT = 100
+
+def is_connection_error(error: Exception) -> bool:
+    """Whether a replay failed because PostgreSQL is unreachable (worth retrying later)"""
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError))
+
+class WriteQueue:
+    """Holds data writes accepted while the PostgreSQL circuit is open.
+
+    Writes are replayed in order once the database answers again. The replay loop
+    is what probes the open circuit (requests only check it): with writes queued
+    the first replayed write is the probe, otherwise a SELECT 1. Replay
+    stops at connection errors only: a write PostgreSQL rejects (e.g. an FK
+    violation for a deleted app) is dropped and recorded, so it can't hold the
+    queue, and with it Firebase failover, open forever.
+
+    The queue lives in memory and is bounded. Writes are also applied to Firebase
+    when queued, but that copy is not durable: PostgreSQL is the source of truth,
+    so after a restart replication and reconciliation revert Firebase to it, and
+    anything not yet replayed is lost.
+    """
+    def __init__(self, max_size: int, replay_interval: float = 1.0):
+        self.max_size = max_size
+        self.replay_interval = replay_interval
+        self.pending: Deque[PendingWrite] = deque()
+        self.is_running = False
+        self.task = None
+
+        self.failed_writes: Deque[Dict[str, Any]] = deque(maxlen=FAILED_WRITES_KEPT)
+
+        # Counters
+        self.queued = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    def should_queue(self) -> bool:
+        """Queue while the circuit is open, and while older writes are still waiting (keeps order)"""
+        return bool(self.pending) or postgres_circuit.is_open
+
+    def enqueue(self, op: str, app_id: str, data_key: str, data_value: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue a write, returning False when the queue is full"""
+        if len(self.pending) >= self.max_size:
+            self.rejected += 1
+            return False
+        self.pending.append(PendingWrite(op, app_id, data_key, data_value))
+        self.queued += 1
+        return True
+
+    async def replay_once(self) -> int:
+        """Apply queued writes to PostgreSQL in order, stopping at the first connection error
+
+        Writes that fail for any other reason are dropped (see failed_writes).
+        """
+        replayed = 0
+        async with AsyncSessionLocal() as db:
+            postgres_service = AsyncPostgresService(db)
+            while self.pending:
+                write = self.pending[0]
+                try:
+                    if write.op == "save":
+                        await postgres_service.save_data(write.app_id, write.data_key, write.data_value)
+                    elif write.op == "update":
+                        if not await postgres_service.update_data(write.app_id, write.data_key, write.data_value):
+                            self._drop(write, LookupError(f"Data with key '{write.data_key}' not found"))
+                            continue
+                    else:
+                        await postgres_service.delete_data(write.app_id, write.data_key)
+                except Exception as e:
+                    if is_connection_error(e):
+                        raise
+                    await db.rollback()
+                    self._drop(write, e)
+                    continue
+                self.pending.popleft()
+                self.replayed += 1
+                replayed += 1
+        return replayed
+
+    def _drop(self, write: PendingWrite, error: Exception):
+        """Give up on the write at the head of the queue"""
+        self.pending.popleft()
+        self.dropped += 1
+        self.failed_writes.append({
+            "op": write.op,
+            "app_id": write.app_id,
+            "data_key": write.data_key,
+            "error": str(error),
+            "failed_at": time.time()
+        })
+        print(f"⚠️ Dropped queued {write.op} of '{write.data_key}' that PostgreSQL rejected: {error}")
+
+    async def probe(self):
+        """Run the half-open probe when there is nothing to replay"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+
+    async def run(self):
+        """Replay queued writes, and probe the open circuit, whenever it lets a call through"""
+        self.is_running = True
+        while self.is_running:
+            await asyncio.sleep(self.replay_interval)
+            if not self.pending and not postgres_circuit.is_open:
+                continue
+            if not postgres_circuit.try_acquire_probe():
+                continue
+            if not self.pending:
+                try:
+                    await self.probe()
+                    print("✅ PostgreSQL answered the circuit probe")
+                except Exception as e:
+                    print(f"⚠️ PostgreSQL circuit probe failed: {e}")
+                continue
+            try:
+                replayed = await self.replay_once()
+                print(f"✅ Replayed {replayed} queued writes to PostgreSQL")
+            except Exception as e:
+                print(f"⚠️ Write replay failed, {len(self.pending)} writes still queued: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "max_size": self.max_size,
+            "queued": self.queued,
+            "replayed": self.replayed,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "failed_writes": list(self.failed_writes)
+        }
+
+    def start(self):
+        """Start the replay loop as a background task"""
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        """Stop the replay loop"""
+        self.is_running = False
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+# Global instance
+write_queue = WriteQueue(max_size=settings.DB_WRITE_QUEUE_MAX)
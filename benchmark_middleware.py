@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark requests/sec through the middleware stack
+
+Compares the BaseHTTPMiddleware versions of the error handler, request logger, rate
+limiter and API key auth against the current pure ASGI ones, calling the ASGI app
+directly (no network) for a trivial route. The API key is served from the auth cache
+and request logs are only buffered (the writer isn't started), so only middleware
+overhead is measured.
+
+Usage: python benchmark_middleware.py [requests] [concurrency]
+"""
+import asyncio
+import sys
+import time
+from fastapi import FastAPI, Request, HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.middleware.api_key_auth import APIKeyMiddleware, PUBLIC_ENDPOINTS
+from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.rate_limiter import RateLimiter, RateLimitMiddleware
+from app.middleware.request_logger import RequestLoggerMiddleware
+from app.models.app_model import AppStatus
+from app.services.api_key_cache import api_key_cache, CachedApp
+
+DEFAULT_APP_ID = "00000000-0000-0000-0000-000000000000"
+API_KEY = "benchmark_api_key"
+
+class LegacyErrorHandlerMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await call_next(request)
+        except HTTPException as e:
+            raise e
+        except Exception:
+            return JSONResponse(status_code=500, content={"success": False, "error": "Internal server error"})
+
+class LegacyRequestLoggerMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        app_id = getattr(request.state, 'app_id', None)
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(time.time() - start_time)
+        return response
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, max_requests: int = 100, window_seconds: int = 60):
+        super().__init__(app)
+        self.rate_limiter = RateLimiter(max_requests, window_seconds)
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path in ["/health", "/", "/docs", "/redoc", "/openapi.json"]:
+            return await call_next(request)
+        client_id = request.headers.get("X-API-KEY", request.client.host)
+        if not self.rate_limiter.is_allowed(client_id):
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
+        return await call_next(request)
+
+class LegacyAPIKeyMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path in PUBLIC_ENDPOINTS:
+            return await call_next(request)
+        api_key = request.headers.get("X-API-KEY")
+        found, app = api_key_cache.get(api_key)
+        if not app or app.status != AppStatus.active.value:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or revoked API key")
+        request.state.app_id = app.app_id
+        request.state.app_name = app.app_name
+        return await call_next(request)
+
+def build_app(stack) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping(request: Request):
+        return {"success": True, "app_id": getattr(request.state, "app_id", None)}
+
+    # add_middleware wraps the app, so add innermost first
+    for middleware, options in reversed(stack):
+        app.add_middleware(middleware, **options)
+    return app
+
+STACKS = {
+    "none": [],
+    "base_http": [
+        (LegacyErrorHandlerMiddleware, {}),
+        (LegacyRequestLoggerMiddleware, {}),
+        (LegacyRateLimitMiddleware, {"max_requests": 10 ** 9}),
+        (LegacyAPIKeyMiddleware, {})
+    ],
+    "pure_asgi": [
+        (ErrorHandlerMiddleware, {}),
+        (RequestLoggerMiddleware, {}),
+        (RateLimitMiddleware, {"max_requests": 10 ** 9}),
+        (APIKeyMiddleware, {})
+    ]
+}
+
+async def call(app) -> int:
+    """Send one GET /ping straight to the ASGI app, returning the status code"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/ping", "raw_path": b"/ping",
+        "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"x-api-key", API_KEY.encode())],
+        "client": ("127.0.0.1", 50000), "server": ("benchmark", 80)
+    }
+    status_code = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+async def measure(app, requests: int, concurrency: int) -> float:
+    """Requests per second with `concurrency` requests in flight"""
+    for _ in range(200):
+        assert await call(app) == 200
+    per_worker = requests // concurrency
+
+    async def worker():
+        for _ in range(per_worker):
+            await call(app)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return per_worker * concurrency / (time.perf_counter() - start)
+
+async def run_benchmark(requests: int, concurrency: int):
+    print("⏱️ Middleware stack requests/sec benchmark")
+    print("=" * 60)
+    api_key_cache.put(API_KEY, CachedApp(DEFAULT_APP_ID, "Benchmark App", AppStatus.active.value))
+
+    print(f"{'stack':<15}{'requests/sec':>15}{'vs none':>12}")
+    baseline = None
+    for name, stack in STACKS.items():
+        rate = await measure(build_app(stack), requests, concurrency)
+        baseline = baseline or rate
+        print(f"{name:<15}{rate:>15.0f}{rate / baseline:>11.2f}x")
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(run_benchmark(requests, concurrency))
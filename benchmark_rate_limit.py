@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request overhead of the rate limiter backends
+
+Calls RateLimiter.acquire for a spread of keys (an app limit plus a route limit per
+request, as the middleware does) and reports the mean cost per request. The postgres
+backend needs DATABASE_URL; its flushes run concurrently on the event loop and their
+count and mean duration are reported separately.
+
+Usage: python benchmark_rate_limit.py [requests] [keys]
+"""
+import asyncio
+import sys
+import time
+import uuid
+from multiprocessing import resource_tracker
+from app.core.database import async_engine, init_db
+from app.middleware.rate_limit_backends import MemoryBackend, SharedMemoryBackend, PostgresBackend
+from app.middleware.rate_limiter import RateLimiter
+
+async def measure(backend, requests: int, keys: int) -> float:
+    """Mean microseconds per acquire"""
+    limiter = RateLimiter(10 ** 6, 60, backend)
+    elapsed = 0.0
+    for i in range(requests):
+        client_id = f"benchmark-{i % keys}"
+        start = time.perf_counter()
+        limiter.acquire([(client_id, 10 ** 6, 60), (f"{client_id} /data", 10 ** 6, 60)])
+        elapsed += time.perf_counter() - start
+        if i % 100 == 0:
+            # Let background flushes run, as they would between requests
+            await asyncio.sleep(0)
+    return elapsed / requests * 1e6
+
+async def run_benchmark(requests: int, keys: int):
+    print("⏱️ Rate limiter backend overhead benchmark")
+    print("=" * 60)
+    print(f"{'backend':<15}{'us/request':>12}")
+
+    print(f"{'memory':<15}{await measure(MemoryBackend(), requests, keys):>12.2f}")
+
+    segment_name = f"benchmark_rate_limit_{uuid.uuid4().hex[:8]}"
+    shared = SharedMemoryBackend(segment_name, 65536)
+    try:
+        print(f"{'shared_memory':<15}{await measure(shared, requests, keys):>12.2f}")
+    finally:
+        # The backend unregistered the segment from the resource tracker; unlink() expects it
+        resource_tracker.register(shared.segment._name, "shared_memory")
+        shared.segment.close()
+        shared.segment.unlink()
+
+    try:
+        await init_db()
+    except Exception as e:
+        print(f"{'postgres':<15}{'skipped':>12} (database unavailable: {e})")
+        return
+    postgres = PostgresBackend(sync_interval=0.25)
+    original_flush = postgres.flush
+    flush_times = []
+
+    async def timed_flush():
+        start = time.perf_counter()
+        await original_flush()
+        flush_times.append(time.perf_counter() - start)
+
+    postgres.flush = timed_flush
+    try:
+        overhead = await measure(postgres, requests, keys)
+        while postgres.pending:
+            await asyncio.sleep(postgres.sync_interval)
+        mean_flush = sum(flush_times) / len(flush_times) * 1000 if flush_times else 0.0
+        print(f"{'postgres':<15}{overhead:>12.2f}  ({len(flush_times)} flushes, {mean_flush:.1f} ms each)")
+    finally:
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    keys = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    asyncio.run(run_benchmark(requests, keys))
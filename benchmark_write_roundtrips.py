@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark database round trips and latency for AsyncPostgresService writes
+
+Compares the legacy write path (INSERT/commit + refresh, SELECT + UPDATE/commit + refresh)
+against the current single-statement RETURNING path. Every BEGIN, statement and COMMIT
+sent to PostgreSQL is counted as one round trip.
+
+Usage: python benchmark_write_roundtrips.py [iterations]
+"""
+import asyncio
+import sys
+import time
+import uuid
+from statistics import median
+from sqlalchemy import event, delete
+from app.core.database import async_engine, AsyncSessionLocal, init_db
+from app.models.data_model import DataStore
+from app.models.file_model import FileStore
+from app.services.async_postgres_service import AsyncPostgresService
+from create_default_app import create_default_app
+
+DEFAULT_APP_ID = "00000000-0000-0000-0000-000000000000"
+
+class RoundTripCounter:
+    """Counts BEGIN, statements and COMMIT sent through the engine"""
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "begin", self._increment)
+        event.listen(engine, "commit", self._increment)
+        event.listen(engine, "before_cursor_execute", self._increment)
+
+    def _increment(self, *args, **kwargs):
+        self.count += 1
+
+class LegacyAsyncPostgresService(AsyncPostgresService):
+    """Write path before the RETURNING rework, kept for comparison"""
+    async def save_data(self, app_id, data_key, data_value):
+        data_record = DataStore(app_id=uuid.UUID(app_id), data_key=data_key, data_value=data_value)
+        self.db.add(data_record)
+        await self.db.commit()
+        await self.db.refresh(data_record)
+        return data_record
+
+    async def update_data(self, app_id, data_key, data_value):
+        data_record = await self.get_data(app_id, data_key)
+        if data_record:
+            data_record.data_value = data_value
+            await self.db.commit()
+            await self.db.refresh(data_record)
+        return data_record
+
+    async def save_file_metadata(self, app_id, file_name, file_path, file_type):
+        file_record = FileStore(app_id=uuid.UUID(app_id), file_name=file_name, file_path=file_path, file_type=file_type)
+        self.db.add(file_record)
+        await self.db.commit()
+        await self.db.refresh(file_record)
+        return file_record
+
+async def measure(counter, service_class, operation, iterations):
+    """Run one operation repeatedly, returning (round trips per call, median ms)"""
+    round_trips = []
+    timings = []
+    for i in range(iterations):
+        key = f"benchmark_{service_class.__name__}_{operation}_{i}"
+        async with AsyncSessionLocal() as db:
+            service = service_class(db)
+            if operation == "update_data":
+                await service.save_data(DEFAULT_APP_ID, key, {"value": 0})
+
+            start_count = counter.count
+            start = time.perf_counter()
+            if operation == "save_data":
+                await service.save_data(DEFAULT_APP_ID, key, {"value": i})
+            elif operation == "update_data":
+                await service.update_data(DEFAULT_APP_ID, key, {"value": i})
+            else:
+                await service.save_file_metadata(DEFAULT_APP_ID, key, f"benchmark/{key}", "text/plain")
+            timings.append((time.perf_counter() - start) * 1000)
+            round_trips.append(counter.count - start_count)
+    return median(round_trips), median(timings)
+
+async def cleanup():
+    """Remove rows created by the benchmark"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(DataStore).where(DataStore.data_key.like("benchmark_%")))
+        await db.execute(delete(FileStore).where(FileStore.file_name.like("benchmark_%")))
+        await db.commit()
+
+async def run_benchmark(iterations: int):
+    print("⏱️ AsyncPostgresService write round-trip benchmark")
+    print("=" * 60)
+
+    await init_db()
+    await create_default_app()
+    counter = RoundTripCounter(async_engine.sync_engine)
+
+    try:
+        print(f"{'operation':<20}{'path':<10}{'round trips':>12}{'median ms':>12}")
+        for operation in ["save_data", "update_data", "save_file_metadata"]:
+            for label, service_class in [("before", LegacyAsyncPostgresService), ("after", AsyncPostgresService)]:
+                trips, ms = await measure(counter, service_class, operation, iterations)
+                print(f"{operation:<20}{label:<10}{trips:>12}{ms:>12.1f}")
+    finally:
+        await cleanup()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    asyncio.run(run_benchmark(iterations))
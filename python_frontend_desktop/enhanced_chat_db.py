@@ -169,14 +169,48 @@ class ChatDatabaseManager:
             self.sync_in_progress = False
     
     def load_chat_from_db(self, user_name="Unknown", date_filter=None):
-        """Load chat messages from database"""
+        """Load chat messages from database
+
+        date_filter narrows the batch keys by date, e.g. "20241222" or "202412"
+        """
         try:
-            # This would require a search endpoint on the backend
-            # For now, we'll return a placeholder
+            headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
+            prefix = f"chat_batch_{user_name}_{date_filter or ''}"
+            
+            # Page through matching batch keys with the keyset cursor
+            batch_keys = []
+            cursor = None
+            while True:
+                params = {"prefix": prefix, "limit": 1000}
+                if cursor:
+                    params["after"] = cursor
+                response = requests.get(f"{self.api_base_url}/data/keys", headers=headers, params=params, timeout=30)
+                if response.status_code != 200:
+                    return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
+                page = response.json()
+                batch_keys.extend(item["data_key"] for item in page["keys"])
+                cursor = page["next_cursor"]
+                if not page["has_more"]:
+                    break
+            
+            # Fetch batches in chunks with the multi-key read
+            messages = []
+            for i in range(0, len(batch_keys), 1000):
+                chunk = batch_keys[i:i + 1000]
+                response = requests.post(f"{self.api_base_url}/data/read-many", headers=headers,
+                                         json={"data_keys": chunk}, timeout=60)
+                if response.status_code != 200:
+                    return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
+                found = response.json()["data"]
+                for key in chunk:
+                    if key in found:
+                        messages.extend(found[key]["data_value"].get("messages", []))
+            
             return {
                 "success": True,
-                "message": "Chat loading from database not yet implemented",
-                "messages": []
+                "message": f"Loaded {len(messages)} messages from {len(batch_keys)} batches",
+                "batch_keys": batch_keys,
+                "messages": messages
             }
             
         except Exception as e:
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Reconcile Firebase against PostgreSQL using per-app hash trees
+
+Reports keys that are missing, stale or extra in Firebase. Pass --repair to push
+PostgreSQL's values for those keys (the default is a dry run).
+
+Usage: python reconcile_firebase.py [--repair] [app_id]
+"""
+import asyncio
+import json
+import sys
+from app.core.database import async_engine
+from app.services.firebase_service import firebase_service
+from app.services.reconciliation_service import reconciliation_service
+
+async def main(dry_run: bool, app_id: str = None):
+    print(f"🔍 Reconciling Firebase against PostgreSQL ({'dry run' if dry_run else 'repair'})")
+    print("=" * 60)
+    try:
+        summary = await reconciliation_service.reconcile_all(dry_run=dry_run, app_id=app_id)
+        for report in summary["reports"]:
+            if "error" in report:
+                print(f"❌ {report['app_id']}: {report['error']}")
+            elif report["in_sync"]:
+                print(f"✅ {report['app_id']}: in sync ({report['divergent_buckets']} buckets re-checked)")
+            else:
+                print(f"⚠️ {report['app_id']}: {report['divergent_buckets']} divergent buckets, "
+                      f"{report['missing_in_firebase']} missing, {report['mismatched']} stale, "
+                      f"{report['extra_in_firebase']} extra, {report['repaired']} repaired")
+                print(json.dumps(report["keys"], indent=2))
+        print(f"\n{summary['in_sync']}/{summary['apps']} apps in sync")
+    finally:
+        await firebase_service.close()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--repair"]
+    asyncio.run(main(dry_run="--repair" not in sys.argv, app_id=args[0] if args else None))
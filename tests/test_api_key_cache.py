@@ -0,0 +1,64 @@
+import pytest
+from app.services import api_key_cache as api_key_cache_module
+from app.services.api_key_cache import APIKeyCache, CachedApp
+from tests.conftest import APP_ID
+
+APP = CachedApp(APP_ID, "Test App", "active")
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    monkeypatch.setattr(api_key_cache_module, "time", clock)
+    return APIKeyCache(max_entries=2, ttl_seconds=60, negative_ttl_seconds=5)
+
+def test_known_key_is_served_from_the_cache(cache):
+    assert cache.get("key") == (False, None)
+
+    cache.put("key", APP)
+
+    assert cache.get("key") == (True, APP)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_unknown_key_is_cached_as_a_negative_entry(cache):
+    cache.put("bogus", None)
+
+    assert cache.get("bogus") == (True, None)
+    assert cache.negative_hits == 1
+
+def test_negative_entries_expire_sooner(cache, clock):
+    cache.put("key", APP)
+    cache.put("bogus", None)
+
+    clock.advance(5.0)
+
+    assert cache.get("bogus") == (False, None)
+    assert cache.get("key") == (True, APP)
+    clock.advance(55.0)
+    assert cache.get("key") == (False, None)
+
+def test_invalidate_app_drops_its_keys(cache):
+    cache.put("key", APP)
+    cache.put("other", CachedApp("22222222-2222-2222-2222-222222222222", "Other", "active"))
+
+    cache.invalidate_app(APP_ID)
+
+    assert cache.get("key") == (False, None)
+    assert cache.get("other")[0]
+    assert cache.invalidations == 1
+
+def test_lookup_started_before_an_invalidation_is_not_cached(cache):
+    epoch = cache.epoch
+    cache.invalidate_app(APP_ID)
+
+    cache.put("key", APP, epoch=epoch)
+
+    assert cache.get("key") == (False, None)
+
+def test_least_recently_used_key_is_evicted(cache):
+    cache.put("a", APP)
+    cache.put("b", None)
+    cache.get("a")
+
+    cache.put("c", APP)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] and cache.get("c")[0]
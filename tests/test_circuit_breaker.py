@@ -0,0 +1,84 @@
+import pytest
+from app.core import circuit_breaker as circuit_breaker_module
+from app.core.circuit_breaker import CircuitBreaker
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    monkeypatch.setattr(circuit_breaker_module, "time", clock)
+    return CircuitBreaker("test", failure_threshold=3, reset_timeout=10.0)
+
+def test_opens_after_consecutive_failures(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.try_acquire_probe()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.try_acquire_probe()
+    assert (breaker.times_opened, breaker.rejected) == (1, 1)
+
+def test_success_resets_the_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.advance(10.0)
+
+    assert breaker.try_acquire_probe()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.try_acquire_probe()
+
+def test_successful_probe_closes(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(10.0)
+    breaker.try_acquire_probe()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.try_acquire_probe()
+
+def test_failed_probe_reopens_for_another_timeout(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(10.0)
+    breaker.try_acquire_probe()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.advance(9.0)
+    assert not breaker.try_acquire_probe()
+    clock.advance(1.0)
+    assert breaker.try_acquire_probe()
+
+def test_lost_probe_is_replaced_after_the_timeout(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(10.0)
+    assert breaker.try_acquire_probe()
+
+    clock.advance(10.0)
+
+    assert breaker.try_acquire_probe()
+
+def test_observers_do_not_use_up_the_probe(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(10.0)
+
+    for _ in range(5):
+        assert breaker.is_open
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.try_acquire_probe()
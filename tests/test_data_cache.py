@@ -0,0 +1,74 @@
+from datetime import datetime
+import pytest
+from app.services import data_cache as data_cache_module
+from app.services.data_cache import DataCache
+from tests.conftest import APP_ID
+
+UPDATED_AT = datetime(2024, 1, 1)
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    monkeypatch.setattr(data_cache_module, "time", clock)
+    return DataCache(max_entries=3, max_bytes=1000, ttl_seconds=10)
+
+def test_hit_after_put(cache):
+    cache.put(APP_ID, "a", {"n": 1}, UPDATED_AT)
+
+    assert cache.get(APP_ID, "a") == ({"n": 1}, UPDATED_AT)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.put(APP_ID, "a", {"n": 1}, UPDATED_AT)
+
+    clock.advance(9.9)
+    assert cache.get(APP_ID, "a") is not None
+    clock.advance(0.1)
+    assert cache.get(APP_ID, "a") is None
+    assert cache.expirations == 1
+    assert cache.get_stats()["entries"] == 0
+
+def test_least_recently_used_entry_is_evicted(cache):
+    for data_key in ("a", "b", "c"):
+        cache.put(APP_ID, data_key, {"key": data_key}, UPDATED_AT)
+    cache.get(APP_ID, "a")
+
+    cache.put(APP_ID, "d", {"key": "d"}, UPDATED_AT)
+
+    assert cache.get(APP_ID, "b") is None
+    assert all(cache.get(APP_ID, data_key) for data_key in ("a", "c", "d"))
+    assert cache.evictions == 1
+
+def test_byte_budget_evicts_and_skips_oversized_values(cache):
+    cache.put(APP_ID, "a", {"blob": "x" * 600}, UPDATED_AT)
+    cache.put(APP_ID, "b", {"blob": "y" * 600}, UPDATED_AT)
+
+    assert cache.get(APP_ID, "a") is None
+    assert cache.get(APP_ID, "b") is not None
+
+    cache.put(APP_ID, "huge", {"blob": "z" * 2000}, UPDATED_AT)
+    assert cache.get(APP_ID, "huge") is None
+    assert cache.get_stats()["bytes"] <= cache.max_bytes
+
+def test_invalidate_drops_the_key(cache):
+    cache.put(APP_ID, "a", {"n": 1}, UPDATED_AT)
+
+    cache.invalidate(APP_ID, "a")
+
+    assert cache.get(APP_ID, "a") is None
+    assert cache.invalidations == 1
+
+def test_read_started_before_a_write_is_not_cached(cache):
+    epoch = cache.epoch
+    cache.invalidate(APP_ID, "a")
+
+    cache.put(APP_ID, "a", {"n": "stale"}, UPDATED_AT, epoch=epoch)
+
+    assert cache.get(APP_ID, "a") is None
+
+def test_disabled_cache_never_hits(clock, monkeypatch):
+    monkeypatch.setattr(data_cache_module, "time", clock)
+    cache = DataCache(max_entries=3, max_bytes=1000, ttl_seconds=10, enabled=False)
+
+    cache.put(APP_ID, "a", {"n": 1}, UPDATED_AT)
+
+    assert cache.get(APP_ID, "a") is None
@@ -0,0 +1,138 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import column
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+from app.services.json_patch import (
+    MAX_FIELD_DEPTH, PatchError, field_type_in, increment_expr, json_patch_step, merge_patch_expr,
+    nested_document, parse_field, parse_pointer
+)
+
+# Expressions are compiled, not run: these tests check which conditions guard each
+# operation; applying them needs PostgreSQL
+document = column("document", JSONB)
+
+def compiled(expression):
+    """(SQL, bound parameters) for the PostgreSQL dialect"""
+    statement = expression.compile(dialect=postgresql.dialect())
+    return str(statement), statement.params
+
+def test_pointer_tokens_are_unescaped():
+    assert parse_pointer("/a~1b/m~0n/0") == ["a/b", "m~n", "0"]
+    assert parse_pointer("/") == [""]
+
+@pytest.mark.parametrize("pointer", ["", "a/b", None, 5])
+def test_invalid_pointers_are_rejected(pointer):
+    with pytest.raises(PatchError):
+        parse_pointer(pointer)
+
+def test_fields_are_dotted_paths_of_bounded_depth():
+    assert parse_field("stats.uploads") == ["stats", "uploads"]
+    assert nested_document(["stats", "uploads"], 1) == {"stats": {"uploads": 1}}
+    for field in ("", "stats..uploads", ".stats", None, ".".join(["a"] * (MAX_FIELD_DEPTH + 1))):
+        with pytest.raises(PatchError):
+            parse_field(field)
+
+@pytest.mark.parametrize("operation", [
+    {"op": "add", "path": "/a"},
+    {"op": "replace", "path": "/a"},
+    {"op": "test", "path": "/a"},
+    {"op": "move", "path": "/a"},
+    {"op": "copy", "path": "/a"},
+    {"op": "frobnicate", "path": "/a", "value": 1},
+    {"path": "/a", "value": 1},
+    {"op": "add", "value": 1},
+    {"op": "add", "path": "", "value": 1},
+    "add /a",
+])
+def test_malformed_operations_are_rejected(operation):
+    with pytest.raises(PatchError):
+        json_patch_step(document, operation)
+
+def test_add_to_a_top_level_member_needs_no_condition():
+    _, condition = json_patch_step(document, {"op": "add", "path": "/a", "value": 1})
+
+    assert condition is None
+
+def test_add_requires_the_parent_to_exist():
+    _, condition = json_patch_step(document, {"op": "add", "path": "/a/b", "value": 1})
+
+    sql, params = compiled(condition)
+    assert sql == "(document #> %(param_1)s::TEXT[]) IS NOT NULL"
+    assert params["param_1"] == ["a"]
+
+def test_append_requires_an_array():
+    _, condition = json_patch_step(document, {"op": "add", "path": "/items/-", "value": 1})
+
+    sql, params = compiled(condition)
+    assert "jsonb_typeof" in sql
+    assert params["param_1"] == ["items"] and "array" in params.values()
+
+@pytest.mark.parametrize("op", ["remove", "replace"])
+def test_remove_and_replace_require_the_target_to_exist(op):
+    operation = {"op": op, "path": "/a/b", "value": 1}
+
+    _, condition = json_patch_step(document, operation)
+
+    sql, params = compiled(condition)
+    assert sql == "(document #> %(param_1)s::TEXT[]) IS NOT NULL"
+    assert params["param_1"] == ["a", "b"]
+
+@pytest.mark.parametrize("op", ["move", "copy"])
+def test_move_and_copy_require_source_and_target_parent(op):
+    _, condition = json_patch_step(document, {"op": op, "from": "/a", "path": "/b/c"})
+
+    sql, params = compiled(condition)
+    assert sql.count("IS NOT NULL") == 2
+    assert ["a"] in params.values() and ["b"] in params.values()
+
+@pytest.mark.parametrize("op", ["move", "copy"])
+def test_move_and_copy_into_an_array_insert_before_the_index(op):
+    new_document, _ = json_patch_step(document, {"op": op, "from": "/a", "path": "/items/1"})
+
+    sql, params = compiled(new_document)
+    # Like "add": jsonb_insert when the parent is an array, jsonb_set otherwise
+    assert "jsonb_insert" in sql
+    assert ["items", "1"] in params.values() and "array" in params.values()
+
+@pytest.mark.parametrize("op", ["move", "copy"])
+def test_move_and_copy_to_dash_append_to_the_array(op):
+    new_document, condition = json_patch_step(document, {"op": op, "from": "/a", "path": "/items/-"})
+
+    sql, params = compiled(new_document)
+    assert "jsonb_build_array" in sql
+    assert ["items", "-"] not in params.values()
+    condition_sql, condition_params = compiled(condition)
+    assert "jsonb_typeof" in condition_sql and "array" in condition_params.values()
+
+def test_test_compares_the_json_value():
+    new_document, condition = json_patch_step(document, {"op": "test", "path": "/a", "value": [1, "x"]})
+
+    sql, params = compiled(condition)
+    assert new_document is document
+    assert sql == "(document #> %(param_1)s::TEXT[]) = CAST(%(param_2)s AS JSONB)"
+    assert params["param_2"] == '[1, "x"]'
+
+def test_merge_patch_deletes_nulls_and_merges_objects():
+    sql, params = compiled(merge_patch_expr(document, {"gone": None, "name": "Ada", "stats": {"n": 1}}))
+
+    assert ["gone"] in params.values()
+    assert '{"name": "Ada"}' in params.values()
+    assert "jsonb_set" in sql
+
+def test_merge_patch_must_be_an_object():
+    with pytest.raises(PatchError):
+        merge_patch_expr(document, ["not", "an", "object"])
+
+def test_increment_keeps_integer_amounts_exact():
+    _, params = compiled(increment_expr(document, ["count"], 2 ** 60 + 1))
+
+    assert Decimal(2 ** 60 + 1) in params.values()
+
+def test_field_type_guard_rejects_non_object_parents():
+    sql, params = compiled(field_type_in(document, ["stats", "uploads"], "number"))
+
+    # The value itself, then every parent must be missing or an object
+    assert sql.count("IS NULL") == 2
+    assert params["param_2"] == ["stats"]
+    assert "object" in params.values()
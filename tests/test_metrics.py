@@ -0,0 +1,85 @@
+import math
+import pytest
+from app.core.metrics import MetricsRegistry
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+def test_counter_renders_help_type_and_labelled_samples(registry):
+    requests = registry.counter("requests_total", "Requests by method", ("method",))
+    requests.inc(method="GET")
+    requests.inc(2, method="POST")
+    requests.inc(method="GET")
+
+    assert registry.render() == (
+        "# HELP requests_total Requests by method\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{method="GET"} 2\n'
+        'requests_total{method="POST"} 2\n'
+    )
+
+def test_gauge_goes_up_and_down(registry):
+    in_flight = registry.gauge("in_flight", "Requests in flight")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    assert "in_flight 1\n" in registry.render()
+
+def test_non_integer_values_keep_their_precision(registry):
+    registry.gauge("lag_seconds", "Lag").set(0.25)
+
+    assert "lag_seconds 0.25\n" in registry.render()
+
+def test_label_values_are_escaped(registry):
+    registry.counter("paths_total", "Paths", ("path",)).inc(path='a"b\\c\nd')
+
+    assert 'paths_total{path="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, route="/data")
+
+    lines = registry.render().splitlines()
+
+    assert lines[1] == "# TYPE latency_seconds histogram"
+    assert lines[2:] == [
+        'latency_seconds_bucket{route="/data",le="0.1"} 1',
+        'latency_seconds_bucket{route="/data",le="1"} 3',
+        'latency_seconds_bucket{route="/data",le="+Inf"} 4',
+        'latency_seconds_sum{route="/data"} 4.05',
+        'latency_seconds_count{route="/data"} 4',
+    ]
+    assert latency.buckets[-1] == math.inf
+
+def test_wrong_labels_are_rejected(registry):
+    requests = registry.counter("requests_total", "Requests by method", ("method",))
+
+    with pytest.raises(ValueError):
+        requests.inc(route="/data")
+
+def test_names_are_unique(registry):
+    registry.counter("requests_total", "Requests")
+
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests again")
+
+async def test_collectors_refresh_gauges_and_failures_keep_old_values(registry):
+    depth = registry.gauge("queue_depth", "Queue depth")
+    depth.set(7)
+
+    async def broken():
+        raise RuntimeError("database unavailable")
+
+    async def refresh():
+        depth.set(3)
+
+    registry.add_collector(broken)
+    await registry.collect()
+    assert "queue_depth 7\n" in registry.render()
+
+    registry.add_collector(refresh)
+    await registry.collect()
+    assert "queue_depth 3\n" in registry.render()
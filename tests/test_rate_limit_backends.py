@@ -0,0 +1,96 @@
+import uuid
+from multiprocessing import resource_tracker
+import pytest
+from app.middleware import rate_limit_backends
+from app.middleware.rate_limit_backends import PostgresBackend, SharedMemoryBackend
+
+class FailingSession:
+    """A session whose database is unreachable"""
+    async def __aenter__(self):
+        raise ConnectionRefusedError("PostgreSQL is down")
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class RecordingSession:
+    """Answers FLUSH_SQL as if no other worker had admitted anything"""
+    flushed = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement, params=None):
+        RecordingSession.flushed.append(params)
+        rows = [(key, params["now"] + delta) for key, delta in zip(params["keys"], params["deltas"])]
+        return type("Result", (), {"all": lambda self: rows})()
+
+    async def commit(self):
+        pass
+
+@pytest.fixture
+def backend():
+    backend = PostgresBackend(sync_interval=3600)
+    yield backend
+    if backend.task:
+        backend.task.cancel()
+
+async def test_failed_flushes_keep_at_most_one_window_per_key(backend, monkeypatch):
+    monkeypatch.setattr(rate_limit_backends, "AsyncSessionLocal", FailingSession)
+    now = 1000.0
+    for _ in range(20):
+        # A full bucket of requests, then a failed sync
+        for _ in range(10):
+            assert backend.acquire([("client", 10, 60)], now) == 0.0
+        await backend.flush()
+        now += 60
+
+    assert backend.flush_errors == 20
+    assert backend.pending == {"client": 60.0}
+
+    RecordingSession.flushed = []
+    monkeypatch.setattr(rate_limit_backends, "AsyncSessionLocal", RecordingSession)
+    await backend.flush()
+
+    assert RecordingSession.flushed[0]["deltas"] == [60.0]
+    assert backend.pending == {}
+
+async def test_successful_flush_adopts_the_shared_tat(backend, monkeypatch):
+    RecordingSession.flushed = []
+    monkeypatch.setattr(rate_limit_backends, "AsyncSessionLocal", RecordingSession)
+    backend.acquire([("client", 10, 60)], 1000.0)
+
+    await backend.flush()
+
+    params = RecordingSession.flushed[0]
+    assert (params["keys"], params["deltas"]) == (["client"], [6.0])
+    assert backend.tats["client"] == params["now"] + 6.0
+    assert backend.flushes == 1
+
+@pytest.fixture
+def segment_name():
+    name = f"test_rate_limit_{uuid.uuid4().hex[:8]}"
+    yield name
+    backend = SharedMemoryBackend(name, 1024)
+    # The backend unregistered the segment from the resource tracker; unlink() expects it
+    resource_tracker.register(backend.segment._name, "shared_memory")
+    backend.segment.close()
+    backend.segment.unlink()
+
+def test_shared_memory_limits_are_shared_between_attached_backends(segment_name):
+    first = SharedMemoryBackend(segment_name, 1024)
+    second = SharedMemoryBackend(segment_name, 1024)
+
+    assert first.acquire([("client", 2, 60)], 1000.0) == 0.0
+    assert second.acquire([("client", 2, 60)], 1000.0) == 0.0
+    assert first.acquire([("client", 2, 60)], 1000.0) == 30.0
+    assert second.acquire([("other", 2, 60)], 1000.0) == 0.0
+
+def test_shared_memory_slots_are_reused_once_the_bucket_refills(segment_name):
+    backend = SharedMemoryBackend(segment_name, 1024)
+    for i in range(5000):
+        assert backend.acquire([(f"client-{i}", 1, 1)], 1000.0 + i) == 0.0
+
+    assert backend.overflows == 0
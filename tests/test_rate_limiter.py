@@ -0,0 +1,70 @@
+import pytest
+from app.middleware import rate_limiter as rate_limiter_module
+from app.middleware.rate_limit_backends import MemoryBackend, gcra
+from app.middleware.rate_limiter import RateLimiter
+
+@pytest.fixture
+def limiter(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter_module, "time", clock)
+    return RateLimiter(max_requests=3, window_seconds=60, backend=MemoryBackend())
+
+def test_gcra_allows_a_burst_of_max_requests():
+    tat = None
+    for _ in range(3):
+        tat, retry_after = gcra(tat, 0.0, 3, 60)
+        assert retry_after == 0.0
+
+    _, retry_after = gcra(tat, 0.0, 3, 60)
+    assert retry_after == 20.0
+
+def test_burst_then_rejected_until_a_token_refills(limiter, clock):
+    limit = [("client", 3, 60)]
+    assert [limiter.acquire(limit) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    assert limiter.acquire(limit) == 20.0
+    assert limiter.rejected == 1
+
+    clock.advance(19.0)
+    assert limiter.acquire(limit) == pytest.approx(1.0)
+    clock.advance(1.0)
+    assert limiter.acquire(limit) == 0.0
+
+def test_rejected_requests_consume_nothing(limiter, clock):
+    limit = [("client", 3, 60)]
+    for _ in range(3):
+        limiter.acquire(limit)
+    for _ in range(10):
+        limiter.acquire(limit)
+
+    clock.advance(20.0)
+
+    assert limiter.acquire(limit) == 0.0
+
+def test_every_limit_must_allow_the_request(limiter, clock):
+    client = ("client", 10, 60)
+    route = ("client /file/upload", 1, 60)
+    assert limiter.acquire([client, route]) == 0.0
+
+    assert limiter.acquire([client, route]) == 60.0
+    # The client limit wasn't charged for the rejected request
+    assert limiter.acquire([client]) == 0.0
+    assert limiter.backend.tats["client"] == clock.now + 2 * 6.0
+
+def test_keys_are_limited_independently(limiter):
+    for _ in range(3):
+        limiter.acquire([("a", 3, 60)])
+
+    assert limiter.acquire([("a", 3, 60)]) > 0.0
+    assert limiter.acquire([("b", 3, 60)]) == 0.0
+
+def test_is_allowed_uses_the_default_limit(limiter):
+    assert [limiter.is_allowed("client") for _ in range(4)] == [True, True, True, False]
+
+def test_sweep_evicts_refilled_keys(clock):
+    backend = MemoryBackend(sweep_interval=60.0)
+    backend.acquire([("idle", 3, 60)], clock.now)
+
+    backend.sweep(clock.now + 20.0)
+
+    assert backend.tats == {}
+    assert backend.evicted == 1
@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from app.services.firebase_service import firebase_service
+from app.services.read_hedging import PRIMARY, SECONDARY, ReadHedger
+from tests.conftest import APP_ID
+
+async def slow(value, seconds):
+    await asyncio.sleep(seconds)
+    return value
+
+async def failing(seconds):
+    await asyncio.sleep(seconds)
+    raise ConnectionError("PostgreSQL went away")
+
+@pytest.fixture
+def hedger():
+    return ReadHedger(enabled=True, percentile=95, default_delay=0.02, min_delay=0.001, window=100, min_samples=5)
+
+@pytest.fixture
+def firebase_copy(firebase):
+    firebase.set(f"apps/{APP_ID}/data/profile", {"name": "from firebase"})
+    return lambda: firebase_service.get_data(APP_ID, "profile")
+
+async def test_fast_primary_wins_without_hedging(hedger, firebase, firebase_copy):
+    winner, result = await hedger.race(slow("from postgres", 0), firebase_copy)
+
+    assert (winner, result) == (PRIMARY, "from postgres")
+    assert hedger.hedged == 0
+    assert firebase.requests == 0
+
+async def test_slow_primary_is_hedged_with_firebase(hedger, firebase_copy):
+    winner, result = await hedger.race(slow("from postgres", 0.1), firebase_copy)
+
+    assert (winner, result) == (SECONDARY, {"name": "from firebase"})
+    assert (hedger.hedged, hedger.secondary_wins) == (1, 1)
+
+async def test_losing_primary_finishes_in_the_background(hedger, firebase_copy):
+    finished = []
+
+    async def primary():
+        await asyncio.sleep(0.1)
+        finished.append(True)
+        return "from postgres"
+
+    winner, _ = await hedger.race(primary(), firebase_copy)
+
+    # Cancelling could leave the query's connection mid-protocol
+    assert winner == SECONDARY
+    assert hedger.get_stats()["background_primaries"] == 1
+    await asyncio.sleep(0.2)
+    assert finished == [True]
+    assert hedger.get_stats()["background_primaries"] == 0
+    assert hedger.get_stats()["samples"] == 1
+
+async def test_missing_secondary_value_waits_for_the_primary(hedger, firebase):
+    winner, result = await hedger.race(
+        slow("from postgres", 0.1), lambda: firebase_service.get_data(APP_ID, "missing")
+    )
+
+    assert (winner, result) == (PRIMARY, "from postgres")
+    assert hedger.hedged == 1
+
+async def test_failing_secondary_waits_for_the_primary(hedger, firebase, firebase_copy):
+    firebase.failure_rate = 1.0
+
+    winner, result = await hedger.race(slow("from postgres", 0.1), firebase_copy)
+
+    assert (winner, result) == (PRIMARY, "from postgres")
+
+async def test_primary_error_after_hedging_returns_the_secondary_answer(hedger, firebase_copy):
+    winner, result = await hedger.race(failing(0.1), firebase_copy)
+
+    assert (winner, result) == (SECONDARY, {"name": "from firebase"})
+
+async def test_primary_error_before_hedging_is_raised(hedger, firebase_copy):
+    with pytest.raises(ConnectionError):
+        await hedger.race(failing(0), firebase_copy)
+
+async def test_slow_firebase_does_not_delay_a_primary_that_answers(hedger, firebase, firebase_copy):
+    firebase.latency = 1.0
+
+    winner, result = await asyncio.wait_for(hedger.race(slow("from postgres", 0.05), firebase_copy), timeout=0.5)
+
+    assert (winner, result) == (PRIMARY, "from postgres")
+    assert hedger.hedged == 1
+
+def test_delay_tracks_the_latency_percentile(hedger):
+    assert hedger.delay == hedger.default_delay
+
+    for latency in (0.01, 0.02, 0.03, 0.04, 0.5):
+        hedger.record(latency)
+
+    assert hedger.delay == 0.5
+
+def test_delay_never_drops_below_the_minimum(hedger):
+    for _ in range(hedger.min_samples):
+        hedger.record(0.0)
+
+    assert hedger.delay == hedger.min_delay
@@ -0,0 +1,94 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from app.services.firebase_service import UNKNOWN_DIGEST, DIRTY_BUCKET_PREFIX, digest_bucket, firebase_service
+from app.services.replication_service import ReplicationWorker
+from tests.conftest import APP_ID
+
+def outbox_row(data_key, data_value, attempts=0):
+    """A claimed outbox row as returned by ReplicationWorker._claim"""
+    return SimpleNamespace(
+        app_id=uuid.UUID(APP_ID), data_key=data_key, data_value=data_value,
+        digest=None if data_value is None else f"digest-{data_key}",
+        attempts=attempts, enqueued_at=datetime(2024, 1, 1)
+    )
+
+@pytest.fixture
+def worker(monkeypatch):
+    """A worker whose claim and release steps record what they were given instead of using PostgreSQL"""
+    worker = ReplicationWorker()
+    worker.claimed = []
+    worker.released = []
+
+    async def claim(claim_id):
+        rows, worker.claimed = worker.claimed, []
+        return rows
+
+    async def release(claim_id, rows, failed):
+        worker.released.append((rows, failed))
+
+    monkeypatch.setattr(worker, "_claim", claim)
+    monkeypatch.setattr(worker, "_release", release)
+    return worker
+
+async def test_drain_pushes_values_digests_and_deletes(worker, firebase):
+    firebase.set(f"apps/{APP_ID}/data/gone", {"n": 0})
+    worker.claimed = [outbox_row("a", {"n": 1}), outbox_row("b", {"n": 2}), outbox_row("gone", None)]
+
+    assert await worker.drain_once() == 3
+
+    app_tree = firebase.get(f"apps/{APP_ID}")
+    assert app_tree["data"] == {"a": {"n": 1}, "b": {"n": 2}}
+    assert app_tree["digests"][digest_bucket("a")]["a"] == "digest-a"
+    assert app_tree["bucket_hashes"][digest_bucket("a")].startswith(DIRTY_BUCKET_PREFIX)
+    assert worker.released[0][1] == {}
+    assert (worker.pushed, worker.deleted, worker.firebase_calls) == (2, 1, 1)
+
+async def test_drain_isolates_a_key_firebase_rejects(worker, firebase):
+    worker.claimed = [outbox_row("a", {"n": 1}), outbox_row("bad.key", {"n": 2}), outbox_row("c", {"n": 3})]
+
+    assert await worker.drain_once() == 3
+
+    assert firebase.get(f"apps/{APP_ID}/data") == {"a": {"n": 1}, "c": {"n": 3}}
+    _, failed = worker.released[0]
+    assert list(failed) == [(uuid.UUID(APP_ID), "bad.key")]
+    assert "HTTP 400" in failed[(uuid.UUID(APP_ID), "bad.key")]
+    # One rejected batch, then one update per key
+    assert worker.firebase_calls == 4
+
+async def test_drain_raises_when_every_key_fails(worker, firebase):
+    firebase.failure_rate = 1.0
+    worker.claimed = [outbox_row("a", {"n": 1}), outbox_row("b", {"n": 2})]
+
+    with pytest.raises(RuntimeError, match="2 keys failed"):
+        await worker.drain_once()
+
+    _, failed = worker.released[0]
+    assert len(failed) == 2
+    # An unavailable database isn't a bad key: no key-by-key retry
+    assert worker.firebase_calls == 1
+
+async def test_drain_with_nothing_due_does_not_call_firebase(worker, firebase):
+    assert await worker.drain_once() == 0
+    assert firebase.requests == 0
+    assert not worker.released
+
+def test_backoff_doubles_up_to_the_maximum():
+    worker = ReplicationWorker()
+    worker.retry_delay = 1.0
+    worker.max_retry_delay = 10.0
+
+    assert [worker.backoff(attempts) for attempts in range(1, 6)] == [1.0, 2.0, 4.0, 8.0, 10.0]
+
+async def test_unknown_digest_is_written_when_none_is_given(firebase):
+    await firebase_service.update_batch(APP_ID, {"a": {"n": 1}})
+
+    assert firebase.get(f"apps/{APP_ID}/digests/{digest_bucket('a')}/a") == UNKNOWN_DIGEST
+
+async def test_digest_of_a_key_with_a_slash_stays_one_segment(firebase):
+    await firebase_service.update_batch(APP_ID, {"a/b": {"n": 1}, "c%2F": {"n": 2}}, {"a/b": "x", "c%2F": "y"})
+
+    assert firebase.get(f"apps/{APP_ID}/digests/{digest_bucket('a/b')}/a%2Fb") == "x"
+    assert await firebase_service.get_bucket_digests(APP_ID, digest_bucket("a/b")) == {"a/b": "x"}
+    assert await firebase_service.get_bucket_digests(APP_ID, digest_bucket("c%2F")) == {"c%2F": "y"}
@@ -0,0 +1,165 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.core.circuit_breaker import CircuitBreaker
+from app.main import app
+from app.services import write_queue as write_queue_module
+from app.services.write_queue import WriteQueue, write_queue
+from tests.conftest import APP_ID
+
+# Routes act as the default app while API key auth is disabled
+DEFAULT_APP_ID = "00000000-0000-0000-0000-000000000000"
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def rollback(self):
+        pass
+
+class FakePostgresService:
+    """Applies writes to `rows`, failing the keys listed in `errors`"""
+    rows = {}
+    errors = {}
+
+    def __init__(self, db):
+        pass
+
+    async def save_data(self, app_id, data_key, data_value):
+        self._check(data_key)
+        self.rows[data_key] = data_value
+
+    async def update_data(self, app_id, data_key, data_value):
+        self._check(data_key)
+        if data_key not in self.rows:
+            return None
+        self.rows[data_key] = data_value
+        return data_value
+
+    async def delete_data(self, app_id, data_key):
+        self._check(data_key)
+        self.rows.pop(data_key, None)
+
+    def _check(self, data_key):
+        if data_key in self.errors:
+            raise self.errors[data_key]
+
+@pytest.fixture
+def fake_postgres(monkeypatch):
+    monkeypatch.setattr(write_queue_module, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(write_queue_module, "AsyncPostgresService", FakePostgresService)
+    FakePostgresService.rows = {}
+    FakePostgresService.errors = {}
+    return FakePostgresService
+
+@pytest.fixture
+def client():
+    write_queue.pending.clear()
+    yield TestClient(app)
+    write_queue.pending.clear()
+
+def test_writes_are_queued_and_sent_to_firebase_while_postgres_is_down(client, firebase, postgres_down):
+    response = client.post("/data/save", json={"data_key": "profile", "data_value": {"name": "Ada"}})
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["queued"] is True
+    assert body["firebase_synced"] is True
+    assert firebase.get(f"apps/{DEFAULT_APP_ID}/data/profile") == {"name": "Ada"}
+    assert [(write.op, write.data_key) for write in write_queue.pending] == [("save", "profile")]
+
+def test_queued_write_reports_when_firebase_did_not_take_it(client, firebase, postgres_down):
+    firebase.failure_rate = 1.0
+
+    response = client.post("/data/save", json={"data_key": "profile", "data_value": {"name": "Ada"}})
+
+    assert response.status_code == 202
+    assert response.json()["firebase_synced"] is False
+    assert "memory only" in response.json()["message"]
+
+async def test_replay_applies_writes_in_order(fake_postgres):
+    queue = WriteQueue(max_size=10)
+    queue.enqueue("save", APP_ID, "a", {"n": 1})
+    queue.enqueue("update", APP_ID, "a", {"m": 2})
+    queue.enqueue("save", APP_ID, "b", {"n": 3})
+    queue.enqueue("delete", APP_ID, "b")
+
+    assert await queue.replay_once() == 4
+    assert fake_postgres.rows == {"a": {"m": 2}}
+    assert not queue.pending
+    assert queue.replayed == 4
+
+async def test_replay_drops_writes_postgres_rejects(fake_postgres):
+    fake_postgres.errors["orphan"] = IntegrityError("INSERT", {}, Exception("violates foreign key constraint"))
+    queue = WriteQueue(max_size=10)
+    queue.enqueue("save", APP_ID, "orphan", {"n": 1})
+    queue.enqueue("save", APP_ID, "a", {"n": 2})
+
+    assert await queue.replay_once() == 1
+    assert fake_postgres.rows == {"a": {"n": 2}}
+    assert queue.dropped == 1
+    assert queue.failed_writes[0]["data_key"] == "orphan"
+
+async def test_replay_stops_at_connection_errors_and_keeps_the_rest(fake_postgres):
+    fake_postgres.errors["b"] = OperationalError("INSERT", {}, ConnectionRefusedError())
+    queue = WriteQueue(max_size=10)
+    for data_key in ("a", "b", "c"):
+        queue.enqueue("save", APP_ID, data_key, {"key": data_key})
+
+    with pytest.raises(OperationalError):
+        await queue.replay_once()
+    assert fake_postgres.rows == {"a": {"key": "a"}}
+    assert [write.data_key for write in queue.pending] == ["b", "c"]
+    assert queue.dropped == 0
+
+    del fake_postgres.errors["b"]
+    assert await queue.replay_once() == 2
+    assert not queue.pending
+
+async def test_replay_drops_updates_of_keys_missing_in_postgres(fake_postgres):
+    queue = WriteQueue(max_size=10)
+    queue.enqueue("update", APP_ID, "missing", {"n": 1})
+    queue.enqueue("save", APP_ID, "a", {"n": 2})
+
+    assert await queue.replay_once() == 1
+    assert fake_postgres.rows == {"a": {"n": 2}}
+    assert queue.failed_writes[0]["data_key"] == "missing"
+    assert "not found" in queue.failed_writes[0]["error"]
+
+def test_should_queue_does_not_use_up_the_probe(postgres_down, monkeypatch):
+    monkeypatch.setattr(postgres_down, "opened_at", postgres_down.opened_at - postgres_down.reset_timeout)
+    queue = WriteQueue(max_size=10)
+
+    assert queue.should_queue()
+    assert queue.should_queue()
+
+    assert postgres_down.try_acquire_probe()
+
+async def test_replay_loop_probes_the_open_circuit_without_queued_writes(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    monkeypatch.setattr(write_queue_module, "postgres_circuit", breaker)
+    queue = WriteQueue(max_size=10, replay_interval=0.01)
+    probes = []
+
+    async def probe():
+        probes.append(True)
+        breaker.record_success()
+
+    monkeypatch.setattr(queue, "probe", probe)
+    queue.start()
+    await asyncio.sleep(0.05)
+    queue.stop()
+
+    assert probes == [True]
+    assert not breaker.is_open
+
+def test_enqueue_refuses_writes_beyond_max_size():
+    queue = WriteQueue(max_size=1)
+    assert queue.enqueue("save", APP_ID, "a", {})
+    assert not queue.enqueue("save", APP_ID, "b", {})
+    assert queue.rejected == 1